@@ -0,0 +1,464 @@
+# app/assets.py
+# Camada de arquivos estáticos com fingerprint por conteúdo.
+#
+#   - manifest.json mapeia "css/dossier.css" -> hash do conteúdo
+#   - os templates geram URLs "/static/css/dossier.<hash>.css"
+#   - URLs com hash são servidas com Cache-Control: immutable (1 ano)
+#   - ETag forte (hash do conteúdo), 304 condicional e requisições Range
+#   - variantes pré-comprimidas (.br / .gz) para CSS/JS/SVG/JSON
+#
+# Gerar/atualizar manifest e variantes comprimidas (também roda no import_cards.py):
+#   python -m app.assets
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import stat
+import threading
+import time
+from email.utils import formatdate, parsedate
+from mimetypes import guess_type
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+STATIC_DIR = os.path.join("app", "static")
+MANIFEST_PATH = os.path.join(STATIC_DIR, "manifest.json")
+STATIC_URL_PREFIX = "/static/"
+
+HASH_LEN = 12
+
+# Extensões que valem a pena pré-comprimir (imagens já são comprimidas)
+COMPRESSIBLE_EXTS = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+
+# encoding -> sufixo do arquivo pré-comprimido (ordem = preferência)
+PRECOMPRESSED = [("br", ".br"), ("gzip", ".gz")]
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# nome.<hash>.ext
+_FINGERPRINT_RE = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$" % HASH_LEN)
+
+# Com que frequência (s) checar se o manifest.json foi regravado
+MANIFEST_RELOAD_INTERVAL = 2.0
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()[:HASH_LEN]
+
+
+def fingerprinted_name(rel_path: str, digest: str) -> str:
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest}{ext}"
+
+
+def _is_variant(rel_path: str) -> bool:
+    return rel_path.endswith((".br", ".gz")) or rel_path == "manifest.json"
+
+
+class AssetManifest:
+    """
+    rel_path -> {"hash", "size", "mtime"}.
+
+    Entradas que vêm do manifest.json são confiáveis (geradas no build):
+    static_url() não faz stat. Arquivos fora do manifest (ex: CSS novo em
+    DEV) são hasheados sob demanda e revalidados por (size, mtime) a cada
+    uso; só valem caminhos dentro de static_dir. Arquivo editado depois do
+    build é pego na hora de servir (AssetStaticFiles confere o stat).
+    """
+
+    def __init__(self, static_dir: str = STATIC_DIR, manifest_path: str = MANIFEST_PATH):
+        self.static_dir = static_dir
+        self._static_root = os.path.realpath(static_dir)
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+        self._built: dict[str, dict] = {}
+        self._lazy: dict[str, dict] = {}
+        self._manifest_mtime: float | None = None
+        self._last_check = 0.0
+        self._load()
+
+    # ---------- carga ----------
+    def _load(self) -> None:
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            mtime = None
+
+        if mtime == self._manifest_mtime:
+            return
+
+        files: dict[str, dict] = {}
+        if mtime is not None:
+            try:
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    files = json.load(f).get("files", {})
+            except (OSError, ValueError):
+                files = {}
+
+        with self._lock:
+            self._built = files
+            self._lazy = {}
+            self._manifest_mtime = mtime
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._last_check < MANIFEST_RELOAD_INTERVAL:
+            return
+        self._last_check = now
+        self._load()
+
+    # ---------- consulta ----------
+    def _full_path(self, rel_path: str) -> str | None:
+        # "../" ou link simbólico para fora de static_dir: nem stat nem hash
+        full_path = os.path.realpath(os.path.join(self.static_dir, rel_path))
+        if os.path.commonpath([full_path, self._static_root]) != self._static_root:
+            return None
+        return full_path
+
+    def entry(self, rel_path: str) -> dict | None:
+        self._maybe_reload()
+
+        built = self._built.get(rel_path)
+        if built is not None:
+            return built
+
+        full_path = self._full_path(rel_path)
+        if full_path is None:
+            return None
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        cached = self._lazy.get(rel_path)
+        if cached and cached["size"] == st.st_size and cached["mtime"] == st.st_mtime:
+            return cached
+
+        entry = {"hash": _hash_file(full_path), "size": st.st_size, "mtime": st.st_mtime}
+        with self._lock:
+            self._lazy[rel_path] = entry
+        return entry
+
+    def url(self, path: str | None) -> str | None:
+        """
+        "css/dossier.css" ou "/static/css/dossier.css" -> "/static/css/dossier.<hash>.css".
+        Caminhos fora de /static ou inexistentes voltam sem alteração.
+        """
+        if not path:
+            return path
+
+        if path.startswith(STATIC_URL_PREFIX):
+            rel_path = path[len(STATIC_URL_PREFIX):]
+        elif path.startswith("/"):
+            return path
+        else:
+            rel_path = path
+
+        entry = self.entry(rel_path)
+        if entry is None:
+            return STATIC_URL_PREFIX + rel_path
+        return STATIC_URL_PREFIX + fingerprinted_name(rel_path, entry["hash"])
+
+    def srcset(self, value: str | None) -> str | None:
+        """
+        Reescreve cada URL de um atributo srcset ("url 180w, url 360w").
+        """
+        if not value:
+            return value
+        parts = []
+        for candidate in value.split(","):
+            pieces = candidate.strip().split(" ", 1)
+            pieces[0] = self.url(pieces[0])
+            parts.append(" ".join(pieces))
+        return ", ".join(parts)
+
+    def resolve(self, rel_path: str) -> tuple[str, dict | None, bool]:
+        """
+        Caminho requisitado -> (caminho real, entrada do manifest, é URL com hash atual?).
+        """
+        m = _FINGERPRINT_RE.match(rel_path)
+        if m:
+            original = m.group("stem") + m.group("ext")
+            entry = self.entry(original)
+            if entry is not None:
+                return original, entry, entry["hash"] == m.group("hash")
+
+        return rel_path, self.entry(rel_path), False
+
+
+manifest = AssetManifest()
+
+
+def static_url(path: str | None) -> str | None:
+    """Global dos templates: {{ static_url('css/dossier.css') }} / {{ c.image_path|static_url }}"""
+    return manifest.url(path)
+
+
+def static_srcset(value: str | None) -> str | None:
+    """Filtro dos templates: {{ c.srcset_webp|static_srcset }}"""
+    return manifest.srcset(value)
+
+
+def register_template_helpers(env) -> None:
+    env.globals["static_url"] = static_url
+    env.filters["static_url"] = static_url
+    env.filters["static_srcset"] = static_srcset
+
+
+# =========================
+# Resposta com suporte a Range
+# =========================
+class RangeFileResponse(FileResponse):
+    """
+    FileResponse que envia apenas [start, end] do arquivo (206 Partial Content).
+    O Starlette desta versão não implementa Range no FileResponse.
+    """
+
+    def __init__(self, path: str, start: int, end: int, size: int, **kwargs):
+        super().__init__(path, status_code=206, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+
+        if remaining > 0:
+            # arquivo encolheu no meio do envio: fecha o corpo mesmo assim
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Suporta um único intervalo: "bytes=a-b", "bytes=a-" ou "bytes=-n".
+    Retorna None se o header for inválido ou tiver múltiplos intervalos
+    (nesse caso servimos o arquivo inteiro, como permite a RFC 9110).
+    Levanta 416 se o intervalo não for satisfatível.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            length = int(last)
+            if length <= 0:
+                raise HTTPException(status_code=416, headers={"content-range": f"bytes */{size}"})
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, headers={"content-range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+
+# =========================
+# StaticFiles com fingerprint
+# =========================
+class AssetStaticFiles(StaticFiles):
+    def __init__(self, *args, asset_manifest: AssetManifest = manifest, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.asset_manifest = asset_manifest
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+
+        rel_path = path.replace(os.sep, "/")
+        real_path, entry, is_current = await anyio.to_thread.run_sync(self.asset_manifest.resolve, rel_path)
+
+        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, real_path)
+        if not stat_result or not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=404)
+
+        if entry is not None and (entry.get("size"), entry.get("mtime")) != (stat_result.st_size, stat_result.st_mtime):
+            # editado depois do build: o hash do manifest não descreve mais
+            # esses bytes (sem immutable nem ETag até rodar o build de novo)
+            entry, is_current = None, False
+
+        cache_control = IMMUTABLE_CACHE if is_current else REVALIDATE_CACHE
+        return await self._asset_response(full_path, stat_result, entry, cache_control, scope)
+
+    async def _asset_response(self, full_path: str, stat_result: os.stat_result,
+                              entry: dict | None, cache_control: str, scope: Scope) -> Response:
+        request_headers = Headers(scope=scope)
+        digest = entry["hash"] if entry else None
+
+        headers = {
+            "cache-control": cache_control,
+            "accept-ranges": "bytes",
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        }
+
+        ext = os.path.splitext(full_path)[1].lower()
+        compressible = ext in COMPRESSIBLE_EXTS
+        if compressible:
+            headers["vary"] = "Accept-Encoding"
+
+        range_header = request_headers.get("range")
+
+        # Variante pré-comprimida (não combinamos com Range)
+        if compressible and not range_header:
+            accepted = request_headers.get("accept-encoding", "").lower()
+            for encoding, suffix in PRECOMPRESSED:
+                if encoding not in accepted:
+                    continue
+                variant_path = full_path + suffix
+                try:
+                    variant_stat = await anyio.to_thread.run_sync(os.stat, variant_path)
+                except OSError:
+                    continue
+                if variant_stat.st_mtime < stat_result.st_mtime:
+                    # variante velha (CSS editado sem rodar o build)
+                    continue
+
+                if digest:
+                    headers["etag"] = f'"{digest}-{encoding}"'
+                headers["content-encoding"] = encoding
+                if self._not_modified(headers, request_headers):
+                    return NotModifiedResponse(Headers(headers))
+                media_type = guess_type(full_path)[0] or "application/octet-stream"
+                return FileResponse(variant_path, stat_result=variant_stat,
+                                    headers=headers, media_type=media_type)
+
+        if digest:
+            headers["etag"] = f'"{digest}"'
+
+        if self._not_modified(headers, request_headers):
+            return NotModifiedResponse(Headers(headers))
+
+        if range_header and self._if_range_matches(headers, request_headers):
+            byte_range = _parse_range(range_header, stat_result.st_size)
+            if byte_range is not None:
+                start, end = byte_range
+                return RangeFileResponse(full_path, start, end, stat_result.st_size, headers=headers)
+
+        return FileResponse(full_path, stat_result=stat_result, headers=headers)
+
+    @staticmethod
+    def _not_modified(response_headers: dict, request_headers: Headers) -> bool:
+        etag = response_headers.get("etag")
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-None-Match tem precedência sobre If-Modified-Since
+            if not etag:
+                return False
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return etag in tags or "*" in tags
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since is None:
+            return False
+        since = parsedate(if_modified_since)
+        last_modified = parsedate(response_headers["last-modified"])
+        return since is not None and last_modified is not None and since >= last_modified
+
+    @staticmethod
+    def _if_range_matches(response_headers: dict, request_headers: Headers) -> bool:
+        if_range = request_headers.get("if-range")
+        if if_range is None:
+            return True
+        return if_range in (response_headers.get("etag"), response_headers.get("last-modified"))
+
+
+# =========================
+# Build: manifest + variantes comprimidas
+# =========================
+def _compress_variants(full_path: str) -> None:
+    with open(full_path, "rb") as f:
+        data = f.read()
+
+    src_mtime = os.path.getmtime(full_path)
+
+    gz_path = full_path + ".gz"
+    if not (os.path.exists(gz_path) and os.path.getmtime(gz_path) >= src_mtime):
+        with open(gz_path, "wb") as f:
+            # mtime=0 -> bytes determinísticos entre builds
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+
+    try:
+        import brotli
+    except ImportError:
+        return
+
+    br_path = full_path + ".br"
+    if not (os.path.exists(br_path) and os.path.getmtime(br_path) >= src_mtime):
+        with open(br_path, "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build_manifest(static_dir: str = STATIC_DIR, manifest_path: str = MANIFEST_PATH) -> dict:
+    """
+    Varre static_dir, hasheia cada arquivo (reaproveitando entradas cujo
+    size/mtime não mudaram) e grava manifest.json + variantes .gz/.br.
+    """
+    previous: dict[str, dict] = {}
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            previous = json.load(f).get("files", {})
+    except (OSError, ValueError):
+        pass
+
+    files: dict[str, dict] = {}
+    for root, _dirs, names in os.walk(static_dir):
+        for name in names:
+            full_path = os.path.join(root, name)
+            rel_path = os.path.relpath(full_path, static_dir).replace(os.sep, "/")
+            if _is_variant(rel_path):
+                continue
+
+            st = os.stat(full_path)
+            old = previous.get(rel_path)
+            if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime:
+                files[rel_path] = old
+            else:
+                files[rel_path] = {"hash": _hash_file(full_path), "size": st.st_size, "mtime": st.st_mtime}
+
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTS:
+                _compress_variants(full_path)
+
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"files": files}, f, indent=0, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    return files
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    built = build_manifest()
+    print(f"[OK] manifest.json: {len(built)} arquivos em {time.perf_counter() - started:.2f}s")
@@ -1,24 +1,36 @@
-from passlib.context import CryptContext
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
 from itsdangerous import URLSafeTimedSerializer, BadSignature
 from fastapi import Request, Response
-from .config import APP_SECRET
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-pwd = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    deprecated="auto"
-)
+from .config import APP_SECRET
+from .models import User
+from .passwords import hash_password, verify_password  # noqa: F401  (reexport)
 
 serializer = URLSafeTimedSerializer(APP_SECRET, salt="rpg-session")
 
 COOKIE_NAME = "rpg_session"
-
-
-def hash_password(password: str) -> str:
-    return pwd.hash(password)
-
-
-def verify_password(password: str, password_hash: str) -> bool:
-    return pwd.verify(password, password_hash)
+SESSION_MAX_AGE = 60 * 60 * 24 * 14
+
+# Cache de tokens já verificados (por processo/worker).
+# Dentro do TTL a autorização não toca no banco; passado o TTL, o token é
+# reconferido contra users.session_version (1 SELECT por token a cada TTL).
+# Reset de senha / exclusão incrementam session_version: no worker que fez a
+# alteração o efeito é imediato; nos demais, em no máximo SESSION_CACHE_TTL.
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "4096"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "60"))
+
+# O que fica assinado no cookie (id/username/role são usados pelas rotas sem SELECT)
+SessionUser = namedtuple(
+    "SessionUser",
+    ["id", "username", "role", "force_password_change", "session_version"],
+)
 
 
 def _is_https(request: Request) -> bool:
@@ -31,8 +43,14 @@ def _is_https(request: Request) -> bool:
     return request.url.scheme.lower() == "https"
 
 
-def set_session(request: Request, response: Response, user_id: int):
-    token = serializer.dumps({"user_id": user_id})
+def set_session(request: Request, response: Response, user: User):
+    token = serializer.dumps({
+        "user_id": user.id,
+        "u": user.username,
+        "r": (user.role or "").strip().lower(),
+        "pc": bool(user.force_password_change),
+        "sv": user.session_version or 1,
+    })
 
     secure_cookie = _is_https(request)
 
@@ -42,7 +60,7 @@ def set_session(request: Request, response: Response, user_id: int):
         httponly=True,
         samesite="lax",
         secure=secure_cookie,         # ✅ Render: True | Local: False
-        max_age=60 * 60 * 24 * 14,
+        max_age=SESSION_MAX_AGE,
         path="/",
     )
 
@@ -51,7 +69,7 @@ def clear_session(response: Response):
     response.delete_cookie(COOKIE_NAME, path="/")
 
 
-def read_session(request: Request, max_age_seconds: int = 60 * 60 * 24 * 14):
+def read_session(request: Request, max_age_seconds: int = SESSION_MAX_AGE):
     token = request.cookies.get(COOKIE_NAME)
     if not token:
         return None
@@ -60,3 +78,141 @@ def read_session(request: Request, max_age_seconds: int = 60 * 60 * 24 * 14):
         return data.get("user_id")
     except BadSignature:
         return None
+
+
+class _SessionCache:
+    """
+    LRU limitado com TTL: token -> (SessionUser, expira_em).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[SessionUser, float]] = OrderedDict()
+        # user_id -> menor session_version aceita (revogações feitas neste processo)
+        self._min_version: dict[int, int] = {}
+
+    def get(self, token: str) -> SessionUser | None:
+        with self._lock:
+            item = self._entries.get(token)
+            if item is None:
+                return None
+            info, expires_at = item
+            if expires_at <= time.monotonic() or info.session_version < self._min_version.get(info.id, 0):
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return info
+
+    def put(self, token: str, info: SessionUser, ttl: float) -> None:
+        with self._lock:
+            self._entries[token] = (info, time.monotonic() + ttl)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def revoke(self, user_id: int, min_version: int) -> None:
+        with self._lock:
+            self._min_version[user_id] = min_version
+            stale = [t for t, (info, _) in self._entries.items() if info.id == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._min_version.clear()
+
+
+session_cache = _SessionCache(SESSION_CACHE_SIZE, SESSION_CACHE_TTL)
+
+
+def _decode_session(token: str) -> tuple[SessionUser, float] | None:
+    """
+    (usuário, timestamp da assinatura) do cookie, ainda sem conferir no banco.
+    """
+    try:
+        data, signed_at = serializer.loads(token, max_age=SESSION_MAX_AGE, return_timestamp=True)
+    except BadSignature:
+        return None
+
+    # Cookies emitidos antes do session_version não têm "sv": exigem novo login
+    if "sv" not in data:
+        return None
+
+    info = SessionUser(
+        id=data["user_id"],
+        username=data.get("u") or "",
+        role=data.get("r") or "",
+        force_password_change=bool(data.get("pc")),
+        session_version=data["sv"],
+    )
+    return info, signed_at.timestamp()
+
+
+def _session_row_query(user_id: int):
+    return select(User.session_version, User.role).where(User.id == user_id)
+
+
+def _accept_session(token: str, info: SessionUser, signed_at: float, row) -> SessionUser | None:
+    if row is None or row.session_version != info.session_version:
+        return None
+    if (row.role or "").strip().lower() != info.role:
+        return None
+
+    # não guarda além da validade do próprio token
+    remaining = SESSION_MAX_AGE - (time.time() - signed_at)
+    session_cache.put(token, info, min(session_cache.ttl, max(0.0, remaining)))
+    return info
+
+
+def read_session_user(request: Request, db: Session) -> SessionUser | None:
+    """
+    Usuário logado a partir do cookie. Caminho quente: cache em memória, sem
+    banco e sem reverificar a assinatura. Cache miss: verifica a assinatura e
+    confere session_version/role no banco (uma query leve por token por TTL).
+    """
+    token = request.cookies.get(COOKIE_NAME)
+    if not token:
+        return None
+
+    info = session_cache.get(token)
+    if info is not None:
+        return info
+
+    decoded = _decode_session(token)
+    if decoded is None:
+        return None
+
+    row = db.execute(_session_row_query(decoded[0].id)).first()
+    return _accept_session(token, *decoded, row)
+
+
+async def read_session_user_async(request: Request, db: AsyncSession) -> SessionUser | None:
+    """
+    Igual a read_session_user, para rotas async (app.db.get_async_db).
+    """
+    token = request.cookies.get(COOKIE_NAME)
+    if not token:
+        return None
+
+    info = session_cache.get(token)
+    if info is not None:
+        return info
+
+    decoded = _decode_session(token)
+    if decoded is None:
+        return None
+
+    row = (await db.execute(_session_row_query(decoded[0].id))).first()
+    return _accept_session(token, *decoded, row)
+
+
+def invalidate_user_sessions(user: User) -> None:
+    """
+    Derruba todas as sessões do usuário (reset de senha, troca de senha, exclusão).
+    O chamador faz o commit.
+    """
+    user.session_version = (user.session_version or 1) + 1
+    session_cache.revoke(user.id, user.session_version)
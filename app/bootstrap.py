@@ -0,0 +1,192 @@
+# app/bootstrap.py
+# Criação/migração do schema e seed FORA do import do app.
+#
+# Antes, app/main.py rodava create_all + run_migrations + seed_users no import:
+# cada worker do uvicorn (e cada reload) refazia a reflexão do schema e o KDF
+# do seed, e vários workers disputavam o mesmo arquivo SQLite.
+#
+# Agora:
+#   - "python -m app.cli init" (ou "migrate"/"seed") faz o trabalho uma vez,
+#     ex: no release/build do deploy
+#   - o lifespan do app chama ensure_database(): um SELECT no carimbo
+#     (schema_state); se estiver atual, o worker só serve. Se não, o primeiro
+#     worker pega um lock entre processos, migra/semeia e carimba; os demais
+#     esperam o lock, relêem o carimbo e seguem sem refazer nada.
+
+import hashlib
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from .db import Base
+from . import search
+from .migrations import ADDED_COLUMNS, DROPPED_COLUMNS, DROPPED_INDEXES, run_migrations
+from .models import SchemaState
+from .seed import seed_digest, seed_users
+
+log = logging.getLogger(__name__)
+
+# chave do pg_advisory_lock (qualquer bigint fixo do app)
+PG_LOCK_KEY = 0x525047494E4954  # "RPGINIT"
+
+
+def schema_fingerprint() -> str:
+    """
+    sha256 do schema declarado (tabelas, colunas, índices) + lista de migrações.
+    Muda sozinho quando um model ou app/migrations.py muda.
+    """
+    h = hashlib.sha256()
+    for table in Base.metadata.sorted_tables:
+        h.update(f"T {table.name}\n".encode())
+        for col in table.columns:
+            h.update(f"C {col.name} {col.type!r} {col.nullable} {col.primary_key}\n".encode())
+        for index in sorted(table.indexes, key=lambda ix: ix.name or ""):
+            cols = ",".join(c.name for c in index.columns)
+            h.update(f"I {index.name} {cols} {index.unique}\n".encode())
+    for table, column, sql_type in ADDED_COLUMNS:
+        h.update(f"A {table} {column} {sql_type}\n".encode())
+    for name in DROPPED_INDEXES:
+        h.update(f"D {name}\n".encode())
+    for table, column in DROPPED_COLUMNS:
+        h.update(f"X {table} {column}\n".encode())
+    for ddl in search.SQLITE_DDL + search.POSTGRES_DDL:
+        h.update(f"S {ddl}\n".encode())
+    return h.hexdigest()
+
+
+def read_stamp(engine: Engine) -> tuple[str, str] | None:
+    """
+    (schema_version, seed_digest) gravados, ou None se o banco ainda não foi
+    inicializado (tabela ou linha inexistente).
+    """
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(
+                select(SchemaState.schema_version, SchemaState.seed_digest).where(SchemaState.id == 1)
+            ).first()
+    except (OperationalError, ProgrammingError):
+        return None
+    return (row[0], row[1]) if row else None
+
+
+def _write_stamp(engine: Engine, **values) -> None:
+    with Session(engine) as db:
+        state = db.get(SchemaState, 1)
+        if state is None:
+            state = SchemaState(id=1, schema_version="", seed_digest="")
+            db.add(state)
+        for key, value in values.items():
+            setattr(state, key, value)
+        db.commit()
+
+
+def _lock_path(engine: Engine) -> str:
+    override = os.getenv("DB_INIT_LOCK")
+    if override:
+        return override
+    database = engine.url.database
+    if engine.dialect.name == "sqlite" and database and database != ":memory:":
+        return os.path.abspath(database) + ".init-lock"
+    digest = hashlib.sha1(str(engine.url).encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"rpg-init-{digest}.lock")
+
+
+@contextmanager
+def init_lock(engine: Engine):
+    """
+    Lock exclusivo entre processos para migrar/semear.
+    Postgres: advisory lock (vale entre máquinas). Demais: lock de arquivo
+    ao lado do banco (vale entre workers da mesma máquina; ver _file_lock).
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": PG_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": PG_LOCK_KEY})
+                conn.commit()
+        return
+
+    with open(_lock_path(engine), "a+") as fh, _file_lock(fh):
+        yield
+
+
+@contextmanager
+def _file_lock(fh):
+    """
+    Lock exclusivo (bloqueante) no arquivo aberto: flock no POSIX,
+    msvcrt.locking no Windows (sem fcntl).
+    """
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+
+    if fcntl is not None:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+        return
+
+    import msvcrt
+
+    # trava o 1º byte; LK_LOCK desiste depois de ~10 s com OSError: tenta de novo
+    fh.seek(0)
+    while True:
+        try:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            break
+        except OSError:
+            continue
+    try:
+        yield
+    finally:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def migrate_database(engine: Engine) -> None:
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    _write_stamp(engine, schema_version=schema_fingerprint())
+
+
+def seed_database(engine: Engine) -> None:
+    with Session(engine) as db:
+        seed_users(db)
+        db.commit()
+    _write_stamp(engine, seed_digest=seed_digest())
+
+
+def ensure_database(engine: Engine) -> list[str]:
+    """
+    Chamado no startup de cada worker. Devolve o que precisou ser feito
+    ([] no caminho comum: carimbo atual, um SELECT e nada mais).
+    """
+    want = (schema_fingerprint(), seed_digest())
+    if read_stamp(engine) == want:
+        return []
+
+    done: list[str] = []
+    with init_lock(engine):
+        # outro worker pode ter terminado enquanto esperávamos o lock
+        stamp = read_stamp(engine)
+        if stamp is None or stamp[0] != want[0]:
+            migrate_database(engine)
+            done.append("migrate")
+        if stamp is None or stamp[1] != want[1]:
+            seed_database(engine)
+            done.append("seed")
+
+    if done:
+        log.info("banco inicializado no startup: %s", ", ".join(done))
+    return done
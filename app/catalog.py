@@ -0,0 +1,197 @@
+# app/catalog.py
+# Cache em memória do catálogo de cartas (/cards).
+#
+# As cartas só mudam quando o import_cards.py roda. Guardamos o resultado de
+# cada combinação de filtros como tupla de CardView (namedtuple imutável) em vez
+# de objetos ORM. O import incrementa catalog_state.version; o cache confere a
+# versão no banco no máximo a cada VERSION_CHECK_INTERVAL segundos e se esvazia
+# quando ela muda. Fora isso, o catálogo não toca no banco.
+
+import base64
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Callable
+
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.orm import Session
+
+from .models import Card, CatalogState
+from .metrics import Gauge
+
+VERSION_CHECK_INTERVAL = float(os.getenv("CATALOG_VERSION_CHECK_INTERVAL", "5"))
+
+# Teto de entradas (páginas x filtros); estourou, começa de novo
+MAX_ENTRIES = 2048
+
+# Só o que os templates usam
+CardView = namedtuple(
+    "CardView",
+    [
+        "id", "type", "rarity", "class_type", "name", "order_name", "image_path",
+        "thumb_path", "srcset_webp", "srcset_avif", "image_width", "image_height",
+    ],
+)
+
+_CARD_COLUMNS = [getattr(Card, field) for field in CardView._fields]
+
+
+def get_catalog_version(db: Session) -> int:
+    version = db.execute(select(CatalogState.version).where(CatalogState.id == 1)).scalar()
+    return version or 0
+
+
+def bump_catalog_version(db: Session) -> None:
+    """
+    Chamado pelo import na mesma transação das alterações em cards.
+    """
+    result = db.execute(
+        update(CatalogState).where(CatalogState.id == 1).values(version=CatalogState.version + 1)
+    )
+    if result.rowcount == 0:
+        db.add(CatalogState(id=1, version=1))
+
+
+def build_cards_query(*, card_type: str | None, rarity: str | None,
+                      class_type: str | None, sort: str,
+                      after: tuple[str, int] | None = None, limit: int | None = None):
+    """
+    after = (order_name, id) da última carta da página anterior (keyset).
+    """
+    q = select(*_CARD_COLUMNS)
+
+    if card_type:
+        q = q.where(Card.type == card_type)
+    if rarity:
+        q = q.where(Card.rarity == rarity)
+    if class_type:
+        q = q.where(Card.class_type == class_type)
+
+    key = tuple_(Card.order_name, Card.id)
+    if after is not None:
+        q = q.where(key < tuple_(*after) if sort == "za" else key > tuple_(*after))
+
+    # Ordenação (id desempata nomes iguais e fecha a chave do cursor)
+    if sort == "za":
+        q = q.order_by(Card.order_name.desc(), Card.id.desc())
+    else:
+        q = q.order_by(Card.order_name.asc(), Card.id.asc())
+
+    if limit is not None:
+        q = q.limit(limit)
+
+    return q
+
+
+def query_cards(db: Session, **filters) -> tuple[CardView, ...]:
+    return tuple(CardView(*row) for row in db.execute(build_cards_query(**filters)))
+
+
+def encode_cursor(card: CardView) -> str:
+    raw = json.dumps([card.order_name, card.id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> tuple[str, int] | None:
+    """
+    Cursor inválido = começa do início (None).
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        order_name, card_id = json.loads(raw)
+        if isinstance(order_name, str) and isinstance(card_id, int):
+            return order_name, card_id
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+class CatalogCache:
+    def __init__(self, check_interval: float = VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, object] = {}
+        self._version: int | None = None
+        self._checked_at = 0.0
+
+    def _sync_version(self, db: Session) -> None:
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+
+        version = get_catalog_version(db)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._checked_at = now
+
+    def get_or_load(self, db: Session, key: tuple, loader: Callable[[], object]) -> object:
+        """
+        Read-through: devolve o valor em cache ou chama loader() e guarda.
+        """
+        self._sync_version(db)
+
+        value = self._entries.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        version = self._version
+        value = loader()
+        with self._lock:
+            # se a versão mudou durante o loader, não guarda dado velho
+            if version == self._version:
+                if len(self._entries) >= MAX_ENTRIES:
+                    self._entries.clear()
+                self._entries[key] = value
+        return value
+
+    def get_page(self, db: Session, *, card_type: str | None, rarity: str | None,
+                 class_type: str | None, sort: str, after: tuple[str, int] | None,
+                 limit: int) -> tuple[tuple[CardView, ...], str | None]:
+        """
+        Uma página do catálogo + cursor da próxima (None na última).
+        """
+        key = ("page", card_type, rarity, class_type, sort, after, limit)
+
+        def load():
+            # limit + 1 para saber se existe próxima página sem COUNT(*)
+            rows = query_cards(db, card_type=card_type, rarity=rarity, class_type=class_type,
+                               sort=sort, after=after, limit=limit + 1)
+            items = rows[:limit]
+            next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+            return items, next_cursor
+
+        return self.get_or_load(db, key, load)
+
+    def current_version(self, db: Session) -> int:
+        self._sync_version(db)
+        return self._version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "version": self._version,
+        }
+
+
+catalog_cache = CatalogCache()
+
+Gauge("rpg_catalog_cache_hits", "Acertos do cache do catálogo neste worker.", lambda: catalog_cache.hits)
+Gauge("rpg_catalog_cache_misses", "Faltas do cache do catálogo neste worker.", lambda: catalog_cache.misses)
+Gauge("rpg_catalog_cache_entries", "Páginas do catálogo em cache neste worker.", lambda: len(catalog_cache._entries))
@@ -0,0 +1,105 @@
+# app/cli.py
+# Executar: python -m app.cli {init,migrate,seed,status,provision,reindex}
+#
+#   init       cria/migra o schema e roda o seed (uma vez por deploy)
+#   migrate    só schema (create_all + app/migrations.py)
+#   seed       só usuários do seed (SEED_* do ambiente)
+#   status     mostra se o carimbo do banco está atual (exit 1 se não)
+#   provision  cria jogadores em massa a partir de CSV/JSON (ver app/provisioning.py)
+#   reindex    recria o índice da busca (app/search.py) a partir das tabelas
+#
+# Com o banco já inicializado, os workers do uvicorn não fazem DDL nem KDF no
+# startup (ver app/bootstrap.py).
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .db import engine, SessionLocal
+from .passwords import hash_password
+from . import bootstrap, provisioning, search
+
+
+def provision(path: str, out: str | None, workers: int | None) -> int:
+    with open(path, "rb") as fh:
+        try:
+            entries = provisioning.parse_roster(fh.read(), path)
+        except provisioning.RosterError as e:
+            print(f"[ERRO] {e}", file=sys.stderr)
+            return 1
+
+    db = SessionLocal()
+    try:
+        valid, rejected = provisioning.validate_roster(db, entries)
+        valid = provisioning.with_passwords(valid)
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            hashes = list(pool.map(hash_password, [e.password for e in valid], chunksize=4))
+        print(f"[INFO] {len(hashes)} hashes em {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+        created = provisioning.insert_roster(db, valid, hashes)
+        db.commit()
+    finally:
+        db.close()
+
+    report = provisioning.report_csv(provisioning.build_report(created, rejected))
+    if out:
+        with open(out, "w", encoding="utf-8", newline="") as fh:
+            fh.write(report)
+        print(f"[OK] relatório (com senhas temporárias) em {out}", file=sys.stderr)
+    else:
+        sys.stdout.write(report)
+
+    print(f"[OK] {len(created)} criados, {len(rejected)} com erro", file=sys.stderr)
+    return 0 if not rejected else 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Administração do banco do RPG")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("init", help="cria/migra o schema e roda o seed")
+    sub.add_parser("migrate", help="cria/migra o schema")
+    sub.add_parser("seed", help="roda o seed de usuários")
+    sub.add_parser("status", help="confere o carimbo do banco")
+    sub.add_parser("reindex", help="recria o índice da busca")
+    prov = sub.add_parser("provision", help="cria jogadores em massa a partir de CSV/JSON")
+    prov.add_argument("file", help="CSV (username,password,character_name) ou JSON")
+    prov.add_argument("--out", default=None, help="grava o relatório CSV aqui (padrão: stdout)")
+    prov.add_argument("--workers", type=int, default=None, help="processos para o hash (padrão: nº de CPUs)")
+    args = parser.parse_args(argv)
+
+    if args.command == "provision":
+        return provision(args.file, args.out, args.workers)
+
+    started = time.perf_counter()
+
+    if args.command == "status":
+        stamp = bootstrap.read_stamp(engine)
+        schema_ok = stamp is not None and stamp[0] == bootstrap.schema_fingerprint()
+        seed_ok = stamp is not None and stamp[1] == bootstrap.seed_digest()
+        print(f"[{'OK' if schema_ok else 'PENDENTE'}] schema")
+        print(f"[{'OK' if seed_ok else 'PENDENTE'}] seed")
+        return 0 if schema_ok and seed_ok else 1
+
+    with bootstrap.init_lock(engine):
+        if args.command in ("init", "migrate"):
+            bootstrap.migrate_database(engine)
+            print("[OK] schema atualizado")
+        if args.command in ("init", "seed"):
+            bootstrap.seed_database(engine)
+            print("[OK] seed aplicado")
+        if args.command == "reindex":
+            with engine.begin() as conn:
+                search.drop_search_index(conn)
+                search.ensure_search_index(conn)
+            print("[OK] índice da busca recriado")
+
+    print(f"[INFO] {args.command} em {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
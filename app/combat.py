@@ -0,0 +1,106 @@
+# app/combat.py
+# Núcleo do simulador de encontros (app/simulator.py): lutas inteiras em
+# arrays NumPy, sem ORM, para rodar nos processos do pool.
+#
+# Estado = matriz de HP (lutas x combatentes). A cada rodada, na ordem fixa
+# (grupo primeiro, depois inimigos), cada combatente vivo ataca um oponente
+# vivo sorteado — em todas as lutas de uma vez:
+#   - acerto: d100 <= attack; crítico (<= attack/5) dobra o dano
+#   - dano: 1d(damage_sides) + damage_bonus - soak do alvo (mínimo 0)
+# Lutas decididas saem da matriz ao fim da rodada; as que passam de
+# MAX_ROUNDS contam como empate (fora do histograma de rodadas).
+#
+# Este módulo só importa NumPy: é o que os workers (spawn) carregam.
+
+from collections import namedtuple
+
+import numpy as np
+
+PARTY, ENEMY = 0, 1
+MAX_ROUNDS = 50
+CHECK_DIE = 100
+
+# arrays 1-D, um elemento por combatente
+Combatants = namedtuple("Combatants", ["side", "hp", "attack", "damage_sides", "damage_bonus", "soak"])
+
+# somas de um pedaço de lutas (somáveis entre pedaços, em qualquer ordem):
+#   outcomes[PARTY_WINS | ENEMY_WINS | DRAWS]
+#   rounds[r]      lutas decididas na rodada r (empates não entram)
+#   hp_loss[p]     lutas em que o grupo perdeu p% do HP somado (0–100)
+#   deaths[i]      lutas em que o combatente i caiu
+#   damage[i]      HP perdido pelo combatente i, somado
+ChunkStats = namedtuple("ChunkStats", ["sims", "outcomes", "rounds", "hp_loss", "deaths", "damage"])
+PARTY_WINS, ENEMY_WINS, DRAWS = 0, 1, 2
+
+
+def empty_stats(size: int) -> ChunkStats:
+    return ChunkStats(
+        0,
+        np.zeros(3, dtype=np.int64),
+        np.zeros(MAX_ROUNDS + 1, dtype=np.int64),
+        np.zeros(CHECK_DIE + 1, dtype=np.int64),
+        np.zeros(size, dtype=np.int64),
+        np.zeros(size, dtype=np.int64),
+    )
+
+
+def merge(a: ChunkStats, b: ChunkStats) -> ChunkStats:
+    return ChunkStats(a.sims + b.sims, *(x + y for x, y in zip(a[1:], b[1:])))
+
+
+def _record(stats: ChunkStats, c: Combatants, hp: np.ndarray, outcome, rounds: int | None) -> None:
+    party = c.side == PARTY
+    start = c.hp.astype(np.int64)
+    lost = start - np.clip(hp, 0, None)
+    party_lost = lost[:, party].sum(axis=1) * 100 // max(1, int(start[party].sum()))
+
+    np.add.at(stats.outcomes, outcome, 1)
+    if rounds is not None:
+        stats.rounds[rounds] += len(hp)
+    stats.hp_loss[:] += np.bincount(party_lost, minlength=CHECK_DIE + 1)
+    stats.deaths[:] += (hp <= 0).sum(axis=0)
+    stats.damage[:] += lost.sum(axis=0)
+
+
+def fight(c: Combatants, sims: int, seed) -> ChunkStats:
+    """
+    sims lutas do mesmo encontro. seed: int ou np.random.SeedSequence; a
+    mesma seed dá exatamente as mesmas somas.
+    """
+    rng = np.random.default_rng(seed)
+    size = len(c.hp)
+    stats = empty_stats(size)._replace(sims=sims)
+    party = c.side == PARTY
+    # opponents[i] = máscara de quem o combatente i pode atacar
+    opponents = c.side[None, :] != c.side[:, None]
+    order = np.argsort(c.side, kind="stable")
+    critical = np.maximum(1, c.attack // 5)
+
+    hp = np.tile(c.hp.astype(np.int64), (sims, 1))
+    for round_number in range(1, MAX_ROUNDS + 1):
+        rows = np.arange(len(hp))
+        for i in order:
+            targets = (hp > 0) & opponents[i]
+            # alvo = oponente vivo com o maior sorteio
+            target = np.argmax(rng.random(hp.shape) * targets, axis=1)
+            roll = rng.integers(1, CHECK_DIE + 1, size=len(hp))
+            damage = rng.integers(1, c.damage_sides[i] + 1, size=len(hp)) + c.damage_bonus[i]
+            damage = np.where(roll <= critical[i], damage * 2, damage)
+            damage = np.maximum(0, damage - c.soak[target])
+            hits = (hp[:, i] > 0) & targets.any(axis=1) & (roll <= c.attack[i])
+            hp[rows, target] -= damage * hits
+
+        party_up = (hp[:, party] > 0).any(axis=1)
+        enemies_up = (hp[:, ~party] > 0).any(axis=1)
+        done = ~(party_up & enemies_up)
+        if done.any():
+            # ataques em sequência: os dois lados nunca caem na mesma rodada
+            outcome = np.where(party_up[done], PARTY_WINS, ENEMY_WINS)
+            _record(stats, c, hp[done], outcome, round_number)
+            hp = hp[~done]
+        if not len(hp):
+            break
+
+    if len(hp):
+        _record(stats, c, hp, np.full(len(hp), DRAWS), None)
+    return stats
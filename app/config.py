@@ -1,13 +1,204 @@
+# app/config.py
+# Configuração do app num lugar só: lida do ambiente (e do .env) uma vez,
+# validada e usada por app/db.py para montar os engines.
+#
+# Produção (APP_ENV=production, ou RENDER definido) nunca cai num SQLite
+# local por engano: sem DATABASE_URL só vale o disco persistente do Render
+# (/var/data), e SQLite com caminho relativo é erro.
+#
+# O .env (versionado, valores de DEV) só é aplicado fora de produção: lá tudo
+# vem das variáveis do serviço.
+
 import os
+from dataclasses import dataclass
+
 from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+
+
+def _production_env(env) -> bool:
+    app_env = (env.get("APP_ENV") or "").strip().lower()
+    return app_env == "production" or (not app_env and bool(env.get("RENDER")))
+
+
+if not _production_env(os.environ):
+    load_dotenv()
+
+DEV_DATABASE_URL = "sqlite:///./rpg.db"
+RENDER_DISK = "/var/data"
+RENDER_DATABASE_URL = f"sqlite:///{RENDER_DISK}/rpg.db"
+
+
+class ConfigError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Settings:
+    app_env: str
+    app_secret: str
+
+    database_url: str
+    # réplica só de leitura (opcional); sem ela, leituras usam o primário
+    # (SQLite: um pool separado, query_only, no mesmo arquivo em WAL)
+    database_read_url: str | None
+    # depois de uma escrita, GETs do mesmo navegador vão ao primário por N s
+    read_your_writes_seconds: float
+    # driver async; vazio = derivado de database_url (ver app/db.py)
+    database_async_url: str | None
+    # de onde veio database_url: "env", "render-disk" ou "dev-default"
+    database_source: str
+
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    # Postgres: statement_timeout por conexão (0 = sem limite)
+    statement_timeout_ms: int
+
+    sqlite_busy_timeout_ms: int
+    sqlite_mmap_size: int
+    sqlite_synchronous: str
+    sqlite_journal_mode: str
+
+    @property
+    def is_production(self) -> bool:
+        return self.app_env == "production"
+
+    def describe(self) -> dict:
+        """
+        Configuração efetiva do banco para log/health (sem senhas).
+        """
+        def safe(url):
+            return make_url(url).render_as_string(hide_password=True) if url else None
+
+        info = {
+            "env": self.app_env,
+            "database": safe(self.database_url),
+            "database_source": self.database_source,
+            "read_replica": safe(self.database_read_url),
+            "read_your_writes_seconds": self.read_your_writes_seconds,
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+        }
+        if make_url(self.database_url).get_backend_name() == "sqlite":
+            info.update(
+                sqlite_journal_mode=self.sqlite_journal_mode,
+                sqlite_synchronous=self.sqlite_synchronous,
+                sqlite_busy_timeout_ms=self.sqlite_busy_timeout_ms,
+                sqlite_mmap_size=self.sqlite_mmap_size,
+            )
+        else:
+            info["statement_timeout_ms"] = self.statement_timeout_ms
+        return info
+
+
+def _int(env, name: str, default: int) -> int:
+    raw = env.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise ConfigError(f"{name} deve ser um inteiro (recebido {raw!r})")
 
-load_dotenv()
 
-APP_SECRET = os.getenv("APP_SECRET")
-if not APP_SECRET:
-    raise RuntimeError("APP_SECRET não definido")
+def _float(env, name: str, default: float) -> float:
+    raw = env.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        raise ConfigError(f"{name} deve ser um número (recebido {raw!r})")
+
+
+def _choice(env, name: str, default: str, choices: tuple[str, ...]) -> str:
+    value = (env.get(name) or default).strip().upper()
+    if value not in choices:
+        raise ConfigError(f"{name} deve ser um de {', '.join(choices)} (recebido {value!r})")
+    return value
+
+
+def _check_url(name: str, url: str) -> None:
+    try:
+        make_url(url)
+    except Exception:
+        raise ConfigError(f"{name} inválida")
+
+
+def _database_url(env, production: bool) -> tuple[str, str]:
+    url = (env.get("DATABASE_URL") or "").strip()
+    if url:
+        _check_url("DATABASE_URL", url)
+        parsed = make_url(url)
+        if production and parsed.get_backend_name() == "sqlite":
+            path = parsed.database or ""
+            if path in ("", ":memory:") or not os.path.isabs(path):
+                raise ConfigError(
+                    "DATABASE_URL aponta para um SQLite em memória/caminho relativo em produção; "
+                    "use um caminho absoluto em disco persistente ou um Postgres"
+                )
+        return url, "env"
+
+    if env.get("RENDER"):
+        if os.path.isdir(RENDER_DISK):
+            return RENDER_DATABASE_URL, "render-disk"
+        raise ConfigError(f"DATABASE_URL não definida e o disco persistente {RENDER_DISK} não está montado")
+
+    if production:
+        raise ConfigError("DATABASE_URL não definida (obrigatória com APP_ENV=production)")
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
     # fallback apenas para DEV local
-    DATABASE_URL = "sqlite:///./rpg.db"
+    return DEV_DATABASE_URL, "dev-default"
+
+
+def load_settings(env=None) -> Settings:
+    env = os.environ if env is None else env
+
+    app_secret = env.get("APP_SECRET")
+    if not app_secret:
+        raise ConfigError("APP_SECRET não definido")
+
+    app_env = (env.get("APP_ENV") or ("production" if env.get("RENDER") else "development")).strip().lower()
+    if app_env not in ("production", "development"):
+        raise ConfigError(f"APP_ENV deve ser production ou development (recebido {app_env!r})")
+
+    database_url, source = _database_url(env, app_env == "production")
+
+    read_url = (env.get("DATABASE_READ_URL") or "").strip() or None
+    if read_url:
+        _check_url("DATABASE_READ_URL", read_url)
+    async_url = (env.get("DATABASE_ASYNC_URL") or "").strip() or None
+    if async_url:
+        _check_url("DATABASE_ASYNC_URL", async_url)
+
+    return Settings(
+        app_env=app_env,
+        app_secret=app_secret,
+        database_url=database_url,
+        database_read_url=read_url,
+        read_your_writes_seconds=_float(env, "READ_YOUR_WRITES_SECONDS", 5.0),
+        database_async_url=async_url,
+        database_source=source,
+        # size + overflow = 40, o tamanho do threadpool do AnyIO: rota
+        # síncrona não fica esperando conexão
+        pool_size=_int(env, "DB_POOL_SIZE", 10),
+        max_overflow=_int(env, "DB_MAX_OVERFLOW", 30),
+        pool_timeout=_float(env, "DB_POOL_TIMEOUT", 10.0),
+        pool_recycle=_int(env, "DB_POOL_RECYCLE", 1800),
+        statement_timeout_ms=_int(env, "DB_STATEMENT_TIMEOUT_MS", 15000),
+        sqlite_busy_timeout_ms=_int(env, "SQLITE_BUSY_TIMEOUT_MS", 5000),
+        sqlite_mmap_size=_int(env, "SQLITE_MMAP_SIZE", 64 * 1024 * 1024),
+        sqlite_synchronous=_choice(env, "SQLITE_SYNCHRONOUS", "NORMAL", ("OFF", "NORMAL", "FULL", "EXTRA")),
+        sqlite_journal_mode=_choice(env, "SQLITE_JOURNAL_MODE", "WAL", ("WAL", "DELETE", "TRUNCATE", "PERSIST")),
+    )
+
+
+settings = load_settings()
+
+# nomes antigos, usados pelo resto do app
+APP_SECRET = settings.app_secret
+DATABASE_URL = settings.database_url
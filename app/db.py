@@ -1,26 +1,113 @@
-import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
-# Se DATABASE_URL existir (ex: produção), usa ela
-# Caso contrário, usa SQLite local (dev)
-DATABASE_URL = os.getenv(
-    "DATABASE_URL",
-    "sqlite:///./rpg.db"
-)
+from .config import settings, Settings
+
+# URL efetiva (validada em app/config.py; produção nunca cai em SQLite local)
+DATABASE_URL = settings.database_url
+
+
+def _is_sqlite_memory(url) -> bool:
+    if url.get_backend_name() != "sqlite":
+        return False
+    # ":memory:" ou URI "file:nome?mode=memory&cache=shared&uri=true"
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def engine_options(url: str, cfg: Settings = settings) -> dict:
+    """
+    kwargs do create_engine/create_async_engine para a URL.
+    pre_ping descarta conexões mortas (ex: Postgres reiniciado) antes de
+    entregar para a rota.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        # timeout: espera pelo lock em vez de "database is locked" imediato
+        options = {"connect_args": {"check_same_thread": False, "timeout": cfg.sqlite_busy_timeout_ms / 1000}}
+        if _is_sqlite_memory(parsed):
+            # banco em memória: pool padrão (uma conexão por thread)
+            return options
+    elif backend == "postgresql" and cfg.statement_timeout_ms:
+        if parsed.get_driver_name() == "asyncpg":
+            options = {"connect_args": {"server_settings": {"statement_timeout": str(cfg.statement_timeout_ms)}}}
+        else:
+            options = {"connect_args": {"options": f"-c statement_timeout={cfg.statement_timeout_ms}"}}
+    else:
+        options = {}
+
+    options.update(
+        pool_size=cfg.pool_size,
+        max_overflow=cfg.max_overflow,
+        pool_timeout=cfg.pool_timeout,
+        pool_recycle=cfg.pool_recycle,
+        pool_pre_ping=True,
+    )
+    return options
+
+
+def sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Em toda conexão nova do SQLite (padrões em app/config.py):
+      - WAL: leituras não bloqueiam a escrita (e vice-versa)
+      - synchronous=NORMAL: seguro com WAL, sem fsync a cada commit
+      - busy_timeout: espera o lock de escrita em vez de falhar na hora
+      - mmap: leituras sem cópia
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+    finally:
+        cursor.close()
+
 
-# Força SQLite no Disk do Render
-if DATABASE_URL.startswith("sqlite"):
-    if os.getenv("RENDER"):
-        DATABASE_URL = "sqlite:////var/data/rpg.db"
+def sqlite_read_pragmas(dbapi_connection, connection_record) -> None:
+    # pool de leitura: mesmas pragmas + query_only (qualquer escrita vira erro)
+    sqlite_pragmas(dbapi_connection, connection_record)
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine, *, read_only: bool = False) -> None:
+    # engines async: os eventos de conexão ficam no sync_engine
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if sync_engine.dialect.name == "sqlite" and not _is_sqlite_memory(sync_engine.url):
+        event.listen(sync_engine, "connect", sqlite_read_pragmas if read_only else sqlite_pragmas)
+
+
+def pool_status(engine) -> dict | None:
+    """
+    Ocupação do pool (para /healthz e /metrics). None se o pool não é
+    um QueuePool (ex: SQLite em memória).
+    """
+    pool = getattr(engine, "sync_engine", engine).pool
+    if not hasattr(pool, "checkedout"):
+        return None
+    capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "capacity": capacity,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "saturation": round(checked_out / capacity, 3) if capacity else None,
+    }
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 
 engine = create_engine(
     DATABASE_URL,
-    connect_args=connect_args,
-    future=True
+    future=True,
+    **engine_options(DATABASE_URL),
 )
+configure_engine(engine)
 
 SessionLocal = sessionmaker(
     bind=engine,
@@ -29,6 +116,41 @@ SessionLocal = sessionmaker(
     future=True
 )
 
+
+# =========================
+# Engine de leitura (páginas GET; ver app/replica.py)
+# =========================
+# DATABASE_READ_URL -> réplica. Sem ela: SQLite em arquivo ganha um pool
+# próprio só de leitura no mesmo arquivo (WAL: leitores não esperam o
+# escritor); outros bancos leem do primário.
+def _build_read_engine():
+    if settings.database_read_url:
+        read = create_engine(
+            settings.database_read_url,
+            future=True,
+            **engine_options(settings.database_read_url),
+        )
+        configure_engine(read, read_only=True)
+        return read
+
+    parsed = make_url(DATABASE_URL)
+    if parsed.get_backend_name() == "sqlite" and not _is_sqlite_memory(parsed):
+        read = create_engine(DATABASE_URL, future=True, **engine_options(DATABASE_URL))
+        configure_engine(read, read_only=True)
+        return read
+
+    return engine
+
+
+read_engine = _build_read_engine()
+
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    autoflush=False,
+    autocommit=False,
+    future=True
+)
+
 class Base(DeclarativeBase):
     pass
 
@@ -38,3 +160,74 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# =========================
+# Engine async (rotas quentes: PATCH da ficha, SSE)
+# =========================
+# Mesmo banco, driver async: sqlite -> aiosqlite, postgresql -> asyncpg
+# (instale asyncpg junto com o driver do Postgres). DATABASE_ASYNC_URL
+# (settings.database_async_url) sobrescreve a conversão. Criado só no
+# primeiro uso.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    if settings.database_async_url:
+        return settings.database_async_url
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"Sem driver async conhecido para {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+_async_engine = None
+_async_sessionmaker = None
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+        url = async_database_url()
+        options = engine_options(url)
+        if "pool_size" in options:
+            # aiosqlite usa NullPool por padrão; aqui o pool é explícito
+            options["poolclass"] = AsyncAdaptedQueuePool
+        # aiosqlite roda a conexão na própria thread dele
+        options.get("connect_args", {}).pop("check_same_thread", None)
+        _async_engine = create_async_engine(url, **options)
+        configure_engine(_async_engine)
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_sessionmaker = async_sessionmaker(
+            bind=get_async_engine(),
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _async_sessionmaker()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_sessionmaker = None
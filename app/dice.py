@@ -0,0 +1,265 @@
+# app/dice.py
+# Dados e testes de atributo.
+#
+#   - expressões: "d20", "2d6+1", "4d6kh3" (3 maiores), "2d20kl1" (menor),
+#     "d%" (= d100), termos somados/subtraídos e constantes
+#   - teste percentual: d100 contra o atributo da ficha (1–100) + modificador;
+#     crítico <= alvo/5, sucesso <= alvo, desastre em 96–100 quando falha
+#     (o 100 é sempre desastre)
+#   - tudo vetorizado com NumPy: N rolagens de uma expressão = uma chamada ao
+#     gerador por termo; um teste do grupo inteiro = uma chamada só
+#   - gerador com seed (make_rng): a mesma seed com o mesmo pedido repete os
+#     mesmos resultados (a seed usada volta na resposta de /api/roll)
+#
+# Distribuições exatas (convolução das faces, ou enumeração para kh/kl)
+# ficam em cache por expressão canônica; warm_cache() calcula as comuns no
+# startup, então as chances aparecem sem custo na hora.
+
+import re
+import secrets
+from collections import namedtuple
+from functools import lru_cache
+from itertools import product
+
+import numpy as np
+
+from .party import ATTRIBUTES
+
+MAX_TERMS = 10
+MAX_DICE = 100  # por termo
+MAX_SIDES = 1000
+MAX_TIMES = 1000  # rolagens de uma expressão por pedido
+MAX_DICE_PER_BATCH = 100_000
+# distribuição exata: tamanho máximo do suporte e das enumerações de kh/kl
+MAX_SUPPORT = 5001
+MAX_ENUMERATION = 300_000
+
+CHECK_DIE = 100
+FUMBLE_FROM = 96
+# índice = código devolvido por resolve_checks
+OUTCOMES = ("fumble", "failure", "success", "critical")
+
+COMMON_EXPRESSIONS = (
+    "d4", "d6", "d8", "d10", "d12", "d20", "d100",
+    "2d6", "3d6", "4d6kh3", "2d20kh1", "2d20kl1",
+)
+
+Dice = namedtuple("Dice", ["sign", "count", "sides", "keep", "keep_count"])
+DiceExpr = namedtuple("DiceExpr", ["text", "dice", "constant"])
+Distribution = namedtuple("Distribution", ["expr", "minimum", "pmf", "at_least", "mean", "stdev"])
+CheckResult = namedtuple("CheckResult", ["target", "roll", "outcome"])
+
+_TERM = re.compile(r"\s*([+-])?\s*(?:(\d*)\s*d\s*(\d+|%)(?:\s*(kh|kl)\s*(\d+))?|(\d+))\s*", re.IGNORECASE)
+
+
+class DiceError(ValueError):
+    pass
+
+
+# =========================
+# Parser
+# =========================
+def _canonical(dice: list[Dice], constant: int) -> str:
+    parts = []
+    for d in dice:
+        term = f"{d.count}d{d.sides}" + (f"{d.keep}{d.keep_count}" if d.keep else "")
+        parts.append(("-" if d.sign < 0 else "+") + term)
+    if constant or not parts:
+        parts.append(f"{constant:+d}")
+    return "".join(parts).lstrip("+")
+
+
+def parse(text: str) -> DiceExpr:
+    """
+    "2d6 + 1" -> DiceExpr("2d6+1", ...). DiceError se inválida ou grande demais.
+    """
+    text = (text or "").strip()
+    if not text:
+        raise DiceError("Expressão vazia.")
+
+    dice, constant, pos, terms = [], 0, 0, 0
+    while pos < len(text):
+        match = _TERM.match(text, pos)
+        if not match or match.end() == pos:
+            raise DiceError(f"Expressão inválida perto de {text[pos:pos + 10]!r}.")
+        sign_text, count, sides, keep, keep_count, number = match.groups()
+        if terms and not sign_text:
+            raise DiceError("Separe os termos com + ou -.")
+        sign = -1 if sign_text == "-" else 1
+        terms += 1
+        if terms > MAX_TERMS:
+            raise DiceError(f"No máximo {MAX_TERMS} termos.")
+        pos = match.end()
+
+        if number is not None:
+            constant += sign * int(number)
+            continue
+
+        count = int(count) if count else 1
+        sides = CHECK_DIE if sides == "%" else int(sides)
+        if not 1 <= count <= MAX_DICE:
+            raise DiceError(f"De 1 a {MAX_DICE} dados por termo.")
+        if not 1 <= sides <= MAX_SIDES:
+            raise DiceError(f"Dados de 1 a {MAX_SIDES} faces.")
+        keep = keep.lower() if keep else None
+        keep_count = int(keep_count) if keep else 0
+        if keep and not 1 <= keep_count <= count:
+            raise DiceError(f"{keep}{keep_count}: mantenha de 1 a {count} dados.")
+        if keep_count == count:
+            keep, keep_count = None, 0
+        dice.append(Dice(sign, count, sides, keep, keep_count))
+
+    return DiceExpr(_canonical(dice, constant), tuple(dice), constant)
+
+
+# =========================
+# Rolagens
+# =========================
+def make_rng(seed: int | None = None) -> tuple[np.random.Generator, int]:
+    """
+    Gerador + a seed usada (sorteada se não vier uma), para repetir a rolagem.
+    """
+    if seed is None:
+        seed = secrets.randbits(63)
+    if not 0 <= seed < 2**63:
+        raise DiceError("Seed deve estar entre 0 e 2^63-1.")
+    return np.random.default_rng(seed), seed
+
+
+def dice_count(expr: DiceExpr, times: int = 1) -> int:
+    return times * sum(d.count for d in expr.dice)
+
+
+def roll(expr: DiceExpr, rng: np.random.Generator, times: int = 1) -> np.ndarray:
+    """
+    times rolagens da expressão -> array int64 com os totais.
+    """
+    totals = np.full(times, expr.constant, dtype=np.int64)
+    for d in expr.dice:
+        faces = rng.integers(1, d.sides + 1, size=(times, d.count))
+        if d.keep:
+            faces.sort(axis=1)
+            faces = faces[:, -d.keep_count:] if d.keep == "kh" else faces[:, :d.keep_count]
+        totals += d.sign * faces.sum(axis=1)
+    return totals
+
+
+def check_targets(values, modifier: int = 0) -> np.ndarray:
+    # atributo + modificador, limitado a 1–100
+    return np.clip(np.asarray(values, dtype=np.int64) + modifier, 1, CHECK_DIE)
+
+
+def _outcomes(rolls: np.ndarray, targets) -> np.ndarray:
+    return np.select(
+        [
+            rolls == CHECK_DIE,
+            rolls <= np.maximum(1, targets // 5),
+            rolls <= targets,
+            rolls >= FUMBLE_FROM,
+        ],
+        [0, 3, 2, 0],
+        default=1,
+    )
+
+
+def resolve_checks(targets: np.ndarray, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Um d100 por alvo, numa chamada só -> (rolagens, códigos de OUTCOMES).
+    """
+    rolls = rng.integers(1, CHECK_DIE + 1, size=len(targets))
+    return rolls, _outcomes(rolls, targets)
+
+
+def check(character, attribute: str, rng: np.random.Generator, modifier: int = 0) -> CheckResult:
+    """
+    Teste de um atributo de uma ficha (Character, PartyMember...).
+    """
+    if attribute not in ATTRIBUTES:
+        raise DiceError(f"Atributo desconhecido: {attribute}.")
+    targets = check_targets([getattr(character, attribute)], modifier)
+    rolls, outcomes = resolve_checks(targets, rng)
+    return CheckResult(int(targets[0]), int(rolls[0]), OUTCOMES[outcomes[0]])
+
+
+# =========================
+# Distribuições exatas
+# =========================
+def _term_pmf(d: Dice) -> tuple[int, np.ndarray]:
+    """
+    (menor total, probabilidades) de um termo, sem o sinal.
+    """
+    if not d.keep:
+        face = np.full(d.sides, 1 / d.sides)
+        pmf = face
+        for _ in range(d.count - 1):
+            pmf = np.convolve(pmf, face)
+        return d.count, pmf
+
+    if d.sides ** d.count > MAX_ENUMERATION:
+        raise DiceError("Expressão grande demais para calcular as chances.")
+    faces = np.array(list(product(range(1, d.sides + 1), repeat=d.count)), dtype=np.int64)
+    faces.sort(axis=1)
+    kept = faces[:, -d.keep_count:] if d.keep == "kh" else faces[:, :d.keep_count]
+    totals = kept.sum(axis=1)
+    minimum = d.keep_count
+    return minimum, np.bincount(totals - minimum) / len(totals)
+
+
+@lru_cache(maxsize=256)
+def _distribution(canonical: str) -> Distribution:
+    expr = parse(canonical)
+    support = 1 + sum(d.count * (d.sides - 1) for d in expr.dice)
+    if support > MAX_SUPPORT:
+        raise DiceError("Expressão grande demais para calcular as chances.")
+
+    minimum, pmf = expr.constant, np.ones(1)
+    for d in expr.dice:
+        term_min, term_pmf = _term_pmf(d)
+        if d.sign < 0:
+            # -X: valores invertidos, o menor vira -(maior)
+            term_min, term_pmf = -(term_min + len(term_pmf) - 1), term_pmf[::-1]
+        minimum += term_min
+        pmf = np.convolve(pmf, term_pmf)
+
+    values = np.arange(minimum, minimum + len(pmf))
+    mean = float(values @ pmf)
+    stdev = float(np.sqrt(((values - mean) ** 2) @ pmf))
+    # at_least[i] = P(total >= minimum + i)
+    at_least = np.cumsum(pmf[::-1])[::-1]
+    # compartilhados pelo cache: somente leitura
+    pmf.setflags(write=False)
+    at_least.setflags(write=False)
+    return Distribution(canonical, minimum, pmf, at_least, mean, stdev)
+
+
+def distribution(expr: DiceExpr | str) -> Distribution:
+    if isinstance(expr, str):
+        expr = parse(expr)
+    return _distribution(expr.text)
+
+
+def chance_at_least(dist: Distribution, target: int) -> float:
+    index = target - dist.minimum
+    if index <= 0:
+        return 1.0
+    if index >= len(dist.at_least):
+        return 0.0
+    return float(dist.at_least[index])
+
+
+@lru_cache(maxsize=CHECK_DIE)
+def check_odds(target: int) -> dict[str, float]:
+    """
+    Chance de cada resultado de um teste contra o alvo (1–100), exata.
+    """
+    target = int(check_targets([target])[0])
+    # as 100 faces pela mesma regra de resolve_checks
+    counts = np.bincount(_outcomes(np.arange(1, CHECK_DIE + 1), target), minlength=len(OUTCOMES))
+    return {outcome: float(counts[code] / CHECK_DIE) for code, outcome in enumerate(OUTCOMES)}
+
+
+def warm_cache() -> None:
+    for text in COMMON_EXPRESSIONS:
+        distribution(text)
+    for target in range(1, CHECK_DIE + 1):
+        check_odds(target)
@@ -0,0 +1,183 @@
+# app/instrumentation.py
+# Onde vai o tempo de cada requisição, sem profiler:
+#   - latência por rota (histograma) e contagem por status
+#   - SQL: nº de statements e tempo no banco por requisição (eventos do engine)
+#   - render de template e KDF medidos à parte
+#
+# Tudo sai em /metrics (app/metrics.py) e no header Server-Timing da própria
+# resposta (aparece no DevTools do navegador, aba Network > Timing).
+# SERVER_TIMING=0 desliga o header.
+#
+# O acumulador da requisição fica numa ContextVar: o AnyIO copia o contexto
+# para o threadpool, então rotas síncronas e dependências também contam.
+
+import os
+import time
+from contextvars import ContextVar
+
+import jinja2
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import Counter, Histogram
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") != "0"
+
+# nº de statements por requisição
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+http_latency = Histogram(
+    "rpg_http_request_seconds",
+    "Tempo até o início da resposta, por rota.",
+    labelnames=("method", "route"),
+)
+http_requests = Counter(
+    "rpg_http_requests_total",
+    "Requisições por rota e status.",
+    labelnames=("method", "route", "status"),
+)
+http_db_seconds = Histogram(
+    "rpg_http_db_seconds",
+    "Tempo gasto no banco por requisição.",
+    labelnames=("method", "route"),
+)
+http_db_statements = Histogram(
+    "rpg_http_db_statements",
+    "Statements SQL executados por requisição.",
+    labelnames=("method", "route"),
+    buckets=STATEMENT_BUCKETS,
+)
+template_seconds = Histogram(
+    "rpg_template_render_seconds",
+    "Tempo de render por template.",
+    labelnames=("template",),
+)
+
+
+class RequestTimings:
+    __slots__ = ("sql_count", "sql_seconds", "template_seconds", "kdf_seconds")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.kdf_seconds = 0.0
+
+    def server_timing(self, total: float) -> str:
+        parts = [f'db;dur={self.sql_seconds * 1000:.2f};desc="{self.sql_count} queries"']
+        if self.template_seconds:
+            parts.append(f"tpl;dur={self.template_seconds * 1000:.2f}")
+        if self.kdf_seconds:
+            parts.append(f"kdf;dur={self.kdf_seconds * 1000:.2f}")
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("rpg_request_timings", default=None)
+
+
+def current_timings() -> RequestTimings | None:
+    return _current.get()
+
+
+def record_kdf(seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.kdf_seconds += seconds
+
+
+# =========================
+# SQL (todos os engines: primário, leitura e o sync_engine do async)
+# =========================
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("rpg_query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["rpg_query_started"].pop()
+    timings = _current.get()
+    if timings is not None:
+        timings.sql_count += 1
+        timings.sql_seconds += time.perf_counter() - started
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # statement que falhou não passa pelo after_cursor_execute
+    conn = exception_context.connection
+    stack = conn.info.get("rpg_query_started") if conn is not None else None
+    if stack:
+        stack.pop()
+
+
+# =========================
+# Templates
+# =========================
+class TimedTemplate(jinja2.Template):
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            template_seconds.observe(elapsed, template=self.name or "")
+            timings = _current.get()
+            if timings is not None:
+                timings.template_seconds += elapsed
+
+
+def instrument_templates(env: jinja2.Environment) -> None:
+    # antes de carregar qualquer template (o loader usa env.template_class)
+    env.template_class = TimedTemplate
+
+
+# =========================
+# Middleware
+# =========================
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope["path"].startswith("/static/"):
+        return "/static"
+    # 404: não cria uma série por URL inventada
+    return "unmatched"
+
+
+class TimingMiddleware:
+    """
+    ASGI puro: mede até o http.response.start (SSE e downloads longos não
+    distorcem o histograma) e adiciona o Server-Timing nesse momento.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - started
+                method, route = scope["method"], _route_label(scope)
+                http_latency.observe(total, method=method, route=route)
+                http_requests.inc(method=method, route=route, status=message["status"])
+                http_db_seconds.observe(timings.sql_seconds, method=method, route=route)
+                http_db_statements.observe(timings.sql_count, method=method, route=route)
+                if SERVER_TIMING:
+                    header = timings.server_timing(total).encode("latin-1")
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,237 @@
+# app/inventory.py
+# Inventário e habilidades da ficha como linhas (character_items /
+# character_skills) em vez de dois textos livres.
+#
+#   - adicionar/remover um item = um INSERT/DELETE pequeno (o resto da ficha
+#     não é regravado e a versão da ficha não muda)
+#   - item com o mesmo nome de uma carta do catálogo fica ligado a ela (card_id)
+#   - "quem carrega o X?" é uma query por índice (name_key)
+#
+# parse_items/parse_skills convertem o texto antigo; usados pela migração
+# (app/migrations.py).
+
+import re
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session, selectinload
+
+from .models import User, Card, Character, CharacterItem, CharacterSkill
+from .text import order_key
+from . import search
+
+NAME_MAX = 120
+DESCRIPTION_MAX = 2000
+QUANTITY_MAX = 9999
+# por ficha
+MAX_ITEMS = 200
+MAX_SKILLS = 100
+
+# "- ", "* ", "• ", "1. ", "2) " no começo da linha
+_BULLET = re.compile(r"^\s*(?:[-*•·]+|\d+[.)])\s+")
+# "2x Poção", "2 x Poção", "3 Flechas"
+_QTY_PREFIX = re.compile(r"^(\d{1,4})\s*[xX×]?\s+(\S.*)$")
+# "Poção x2", "Poção ×2", "Poção (2)"
+_QTY_SUFFIX = re.compile(r"^(.*\S)\s*(?:[xX×]\s*(\d{1,4})|\((\d{1,4})\))$")
+# "Nome: descrição", "Nome - descrição", "Nome — descrição"
+_SKILL_SEPARATOR = re.compile(r"\s*(?::|\s[-–—]\s)\s*")
+
+
+class InventoryError(ValueError):
+    pass
+
+
+def _lines(text: str | None):
+    for line in (text or "").splitlines():
+        line = _BULLET.sub("", line).strip()
+        if line:
+            yield line
+
+
+def parse_item_line(line: str) -> tuple[str, int]:
+    match = _QTY_PREFIX.match(line)
+    if match:
+        return match.group(2).strip(), int(match.group(1))
+    match = _QTY_SUFFIX.match(line)
+    if match:
+        return match.group(1).strip(), int(match.group(2) or match.group(3))
+    return line, 1
+
+
+def parse_items(text: str | None) -> list[tuple[str, int]]:
+    """
+    Texto livre do inventário antigo -> [(nome, quantidade)], uma linha por item.
+    """
+    items = []
+    for line in _lines(text):
+        name, quantity = parse_item_line(line)
+        items.append((name[:NAME_MAX], max(1, min(QUANTITY_MAX, quantity))))
+    return items
+
+
+def parse_skills(text: str | None) -> list[tuple[str, str]]:
+    """
+    Texto livre das habilidades antigo -> [(nome, descrição)].
+    """
+    skills = []
+    for line in _lines(text):
+        parts = _SKILL_SEPARATOR.split(line, maxsplit=1)
+        name = parts[0].strip() or line
+        description = parts[1].strip() if len(parts) > 1 else ""
+        if len(name) > NAME_MAX:
+            # linha longa sem separador: tudo vira descrição
+            name, description = name[:NAME_MAX], line
+        skills.append((name, description[:DESCRIPTION_MAX]))
+    return skills
+
+
+def card_ids_by_key(db, keys) -> dict[str, int]:
+    """
+    name_key -> id da carta com esse nome (a de menor id se houver várias
+    raridades). db pode ser Session ou Connection.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    rows = db.execute(
+        select(Card.order_name, func.min(Card.id))
+        .where(Card.order_name.in_(keys))
+        .group_by(Card.order_name)
+    )
+    return {key: card_id for key, card_id in rows}
+
+
+def load_character_with_lists(db: Session, user_id: int) -> Character | None:
+    # 3 queries no total, independente do tamanho do inventário
+    return db.scalars(
+        select(Character)
+        .where(Character.user_id == user_id)
+        .options(selectinload(Character.items), selectinload(Character.skills))
+    ).first()
+
+
+def _clean_name(name: str) -> str:
+    name = " ".join((name or "").split())
+    if not name:
+        raise InventoryError("Informe um nome.")
+    if len(name) > NAME_MAX:
+        raise InventoryError(f"Nome maior que {NAME_MAX} caracteres.")
+    return name
+
+
+def _count(db: Session, model, character_id: int) -> int:
+    return db.scalar(select(func.count()).select_from(model).where(model.character_id == character_id))
+
+
+def add_item(db: Session, character: Character, name: str, quantity: int = 1) -> CharacterItem:
+    """
+    Sem commit. Mesmo nome já no inventário -> soma a quantidade.
+    """
+    name = _clean_name(name)
+    key = order_key(name)
+    quantity = max(1, min(QUANTITY_MAX, quantity))
+
+    item = db.scalars(
+        select(CharacterItem).where(CharacterItem.name_key == key, CharacterItem.character_id == character.id)
+    ).first()
+    if item is not None:
+        item.quantity = min(QUANTITY_MAX, item.quantity + quantity)
+        return item
+
+    if _count(db, CharacterItem, character.id) >= MAX_ITEMS:
+        raise InventoryError(f"No máximo {MAX_ITEMS} itens por ficha.")
+
+    item = CharacterItem(
+        character_id=character.id,
+        name=name,
+        name_key=key,
+        quantity=quantity,
+        card_id=card_ids_by_key(db, [key]).get(key),
+    )
+    db.add(item)
+    return item
+
+
+def add_skill(db: Session, character: Character, name: str, description: str = "") -> CharacterSkill:
+    name = _clean_name(name)
+    if _count(db, CharacterSkill, character.id) >= MAX_SKILLS:
+        raise InventoryError(f"No máximo {MAX_SKILLS} habilidades por ficha.")
+
+    skill = CharacterSkill(
+        character_id=character.id,
+        name=name,
+        name_key=order_key(name),
+        description=(description or "").strip()[:DESCRIPTION_MAX],
+    )
+    db.add(skill)
+    return skill
+
+
+def remove_item(db: Session, character_id: int, item_id: int) -> bool:
+    # um DELETE; o filtro por ficha impede apagar item de outro personagem
+    result = db.execute(
+        delete(CharacterItem).where(CharacterItem.id == item_id, CharacterItem.character_id == character_id)
+    )
+    if result.rowcount != 1:
+        return False
+    # DELETE do Core não passa pelo listener do ORM (app/search.py)
+    search.reindex_characters(db, [character_id])
+    return True
+
+
+def remove_skill(db: Session, character_id: int, skill_id: int) -> bool:
+    result = db.execute(
+        delete(CharacterSkill).where(CharacterSkill.id == skill_id, CharacterSkill.character_id == character_id)
+    )
+    if result.rowcount != 1:
+        return False
+    search.reindex_characters(db, [character_id])
+    return True
+
+
+def items_state(db: Session, character_id: int) -> list[dict]:
+    """
+    Inventário em JSON, na ordem da ficha (delta "items" do app/live.py).
+    """
+    rows = db.execute(
+        select(CharacterItem.id, CharacterItem.name, CharacterItem.quantity, CharacterItem.card_id)
+        .where(CharacterItem.character_id == character_id)
+        .order_by(CharacterItem.id)
+    )
+    return [row._asdict() for row in rows]
+
+
+def skills_state(db: Session, character_id: int) -> list[dict]:
+    rows = db.execute(
+        select(CharacterSkill.id, CharacterSkill.name, CharacterSkill.description)
+        .where(CharacterSkill.character_id == character_id)
+        .order_by(CharacterSkill.id)
+    )
+    return [row._asdict() for row in rows]
+
+
+def delete_character_lists(db: Session, character_ids) -> None:
+    """
+    Para deletes em massa de Character (sem cascade do ORM; o SQLite roda
+    sem PRAGMA foreign_keys). Tira as fichas do índice de busca também.
+    """
+    search.remove_characters(db, character_ids)
+    db.execute(delete(CharacterItem).where(CharacterItem.character_id.in_(character_ids)))
+    db.execute(delete(CharacterSkill).where(CharacterSkill.character_id.in_(character_ids)))
+
+
+def item_carriers(db: Session, name: str) -> list[dict]:
+    """
+    Quem carrega o item (comparação sem acento/maiúsculas, via name_key).
+    """
+    key = order_key(name)
+    rows = db.execute(
+        select(User.id, User.username, Character.name, CharacterItem.name, CharacterItem.quantity)
+        .join(Character, Character.id == CharacterItem.character_id)
+        .join(User, User.id == Character.user_id)
+        .where(CharacterItem.name_key == key)
+        .order_by(User.username)
+    )
+    return [
+        {"user_id": user_id, "username": username, "character": character, "item": item, "quantity": quantity}
+        for user_id, username, character, item, quantity in rows
+    ]
@@ -0,0 +1,168 @@
+# app/kdf.py
+# Pool de processos dedicado ao hash de senha (PBKDF2 é CPU pesado).
+#
+# Sem isso, cada /login roda o PBKDF2 numa thread do threadpool do AnyIO,
+# disputando o GIL por dezenas/centenas de ms, e uma rajada de logins no
+# início da sessão trava todas as rotas síncronas. Aqui:
+#   - o KDF roda em KDF_WORKERS processos (fora do GIL)
+#   - as rotas de senha são async e esperam o Future do pool no event loop
+#     (asyncio.wrap_future): nenhuma thread do AnyIO fica parada no PBKDF2,
+#     então uma rajada de logins não esgota o threadpool das rotas síncronas
+#   - no máximo KDF_MAX_PENDING operações em voo/fila por worker do uvicorn;
+#     acima disso KdfBusy -> a rota responde 429 com Retry-After
+#   - latência, rejeições e fila são exportadas em /metrics
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from . import passwords
+from .metrics import Counter, Gauge, Histogram
+from .instrumentation import record_kdf
+
+KDF_WORKERS = int(os.getenv("KDF_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+KDF_MAX_PENDING = int(os.getenv("KDF_MAX_PENDING", str(KDF_WORKERS * 8)))
+
+# Segundos sugeridos ao cliente quando a fila está cheia
+KDF_RETRY_AFTER = 2
+
+
+class KdfBusy(Exception):
+    """Fila do KDF cheia: a rota deve responder 429."""
+
+
+_pool: ProcessPoolExecutor | None = None
+_pending = 0
+# o event loop e as threads do lote (hash_many) mexem no contador e no pool
+_lock = threading.Lock()
+
+kdf_latency = Histogram(
+    "rpg_kdf_seconds",
+    "Tempo de hash/verificação de senha (inclui espera na fila do pool).",
+    labelnames=("op",),
+)
+kdf_rejected = Counter(
+    "rpg_kdf_rejected_total",
+    "Operações de KDF recusadas com 429 por fila cheia.",
+    labelnames=("op",),
+)
+Gauge("rpg_kdf_pending", "Operações de KDF em andamento ou na fila.", lambda: _pending)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: não herda threads/conexões do processo do uvicorn
+            _pool = ProcessPoolExecutor(
+                max_workers=KDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _finished(op: str, started: float) -> None:
+    global _pending
+    with _lock:
+        _pending -= 1
+    kdf_latency.observe(time.perf_counter() - started, op=op)
+
+
+def _submit(op: str, fn, *args) -> Future:
+    global _pending
+    with _lock:
+        if _pending >= KDF_MAX_PENDING:
+            kdf_rejected.inc(op=op)
+            raise KdfBusy()
+        _pending += 1
+
+    started = time.perf_counter()
+    try:
+        future = _get_pool().submit(fn, *args)
+    except BaseException:
+        _finished(op, started)
+        raise
+    future.add_done_callback(lambda _: _finished(op, started))
+    return future
+
+
+async def _run(op: str, fn, *args):
+    # só a corrotina espera; a CPU gasta fica no processo do pool. Se o
+    # cliente desistir, o cancelamento chega ao Future (sai da fila se ainda
+    # não começou) e o _finished roda do mesmo jeito
+    started = time.perf_counter()
+    try:
+        return await asyncio.wrap_future(_submit(op, fn, *args))
+    finally:
+        record_kdf(time.perf_counter() - started)
+
+
+async def hash_password(password: str) -> str:
+    return await _run("hash", passwords.hash_password, password)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await _run("verify", passwords.verify_password, password, password_hash)
+
+
+async def verify_and_update(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """
+    Verifica e, se o hash estiver em formato/custo antigo, já devolve o novo
+    (o rehash acontece no mesmo processo do pool, sem segunda ida à fila).
+    """
+    return await _run("verify", passwords.verify_and_update, password, password_hash)
+
+
+def _hash_chunk(passwords_chunk: list[str]) -> list[str]:
+    return [passwords.hash_password(p) for p in passwords_chunk]
+
+
+# Lote (provisionamento em massa): no máximo KDF_WORKERS - 1 pedaços em voo
+# somando TODOS os lotes do processo (semáforo do módulo), para sempre sobrar
+# um processo para /login. Com um processo só não sobra nenhum: o lote anda
+# um hash por vez e cada login novo entra na fila do pool logo atrás do hash
+# em andamento (espera no máximo um hash, não o lote inteiro).
+BULK_CHUNK = 4 if KDF_WORKERS > 1 else 1
+_bulk_slots = threading.BoundedSemaphore(max(1, KDF_WORKERS - 1))
+
+
+def hash_many(items: list[str]) -> list[str]:
+    """
+    Hash de vários passwords em paralelo no pool. Cada pedaço em voo conta
+    na fila como uma operação (KdfBusy se a fila já estiver cheia).
+    """
+    chunks = [items[i:i + BULK_CHUNK] for i in range(0, len(items), BULK_CHUNK)]
+    futures: list[Future] = []
+    started = time.perf_counter()
+    try:
+        for chunk in chunks:
+            _bulk_slots.acquire()
+            try:
+                future = _submit("hash_bulk", _hash_chunk, chunk)
+            except BaseException:
+                _bulk_slots.release()
+                raise
+            future.add_done_callback(lambda _: _bulk_slots.release())
+            futures.append(future)
+        return [h for future in futures for h in future.result()]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+        record_kdf(time.perf_counter() - started)
+
+
+def pending() -> int:
+    return _pending
+
+
+def shutdown() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
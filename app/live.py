@@ -0,0 +1,189 @@
+# app/live.py
+# Push de alterações das fichas (Server-Sent Events).
+#
+# Em vez do mestre recarregar /player/{id} (ou o painel) para ver HP/pontos
+# mudarem, as rotas que gravam Character publicam deltas por campo aqui e as
+# páginas abertas recebem via EventSource:
+#   - /api/live/party              todas as fichas (só mestre)
+#   - /api/live/character/{id}     uma ficha (mestre ou o próprio jogador)
+#
+# Cada conexão tem uma fila limitada e que COALESCE: várias alterações da
+# mesma ficha antes do cliente ler viram um único delta com os campos
+# mesclados (um HP clicado 10x = 1 evento). Se a fila estourar (cliente lento
+# com muitas fichas diferentes), descarta tudo e manda "resync": o cliente
+# recarrega a página.
+#
+# O hub é por processo: com vários workers do uvicorn, cada um só vê o que
+# foi gravado nele. Para isso precisaria de um broker (ex: LISTEN/NOTIFY).
+
+import asyncio
+import json
+import os
+
+from .metrics import Counter, Gauge
+
+# fichas distintas pendentes por conexão antes de virar "resync"
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "64"))
+# conexões simultâneas por worker; acima disso 503
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", "200"))
+# comentário SSE periódico: mantém proxies abertos e detecta desconexão
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", "15"))
+
+PARTY = "party"
+
+live_published = Counter("rpg_live_published_total", "Deltas de ficha publicados no hub.")
+live_resyncs = Counter("rpg_live_resync_total", "Conexões SSE que estouraram a fila e receberam resync.")
+
+
+def character_topic(user_id: int) -> str:
+    return f"character:{user_id}"
+
+
+class Subscription:
+    """
+    Fila de uma conexão: user_id -> delta pendente (campos mesclados).
+    Só é mexida no event loop.
+    """
+
+    def __init__(self, topic: str, maxsize: int = LIVE_QUEUE_SIZE):
+        self.topic = topic
+        self.maxsize = maxsize
+        self._pending: dict[int, dict] = {}
+        self._resync = False
+        self._event = asyncio.Event()
+
+    def push(self, user_id: int, fields: dict | None) -> None:
+        if self._resync:
+            return
+
+        delta = self._pending.get(user_id)
+        if delta is None:
+            if len(self._pending) >= self.maxsize:
+                self._pending.clear()
+                self._resync = True
+                live_resyncs.inc()
+                self._event.set()
+                return
+            delta = self._pending[user_id] = {"user_id": user_id, "fields": {}}
+
+        if fields is None:
+            # ficha removida: campos anteriores não interessam mais
+            delta["fields"] = {}
+            delta["removed"] = True
+        else:
+            delta.pop("removed", None)
+            delta["fields"].update(fields)
+        self._event.set()
+
+    async def get(self, timeout: float | None = None) -> list[tuple[str, dict]]:
+        """
+        Espera e devolve os eventos pendentes ([] se deu timeout).
+        """
+        if not self._pending and not self._resync:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._event.clear()
+
+        if self._resync:
+            self._resync = False
+            return [("resync", {})]
+
+        events = [("delta", delta) for delta in self._pending.values()]
+        self._pending = {}
+        return events
+
+
+class LiveHub:
+    def __init__(self):
+        self._topics: dict[str, set[Subscription]] = {}
+        self._count = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def subscribers(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count >= LIVE_MAX_SUBSCRIBERS
+
+    def subscribe(self, topic: str) -> Subscription | None:
+        """
+        Chamado no event loop. None se o worker já está no limite de conexões.
+        """
+        if self.full:
+            return None
+        self._loop = asyncio.get_running_loop()
+        sub = Subscription(topic)
+        self._topics.setdefault(topic, set()).add(sub)
+        self._count += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._topics.get(sub.topic)
+        if subs and sub in subs:
+            subs.discard(sub)
+            self._count -= 1
+            if not subs:
+                del self._topics[sub.topic]
+
+    def _deliver(self, user_id: int, fields: dict | None) -> None:
+        for topic in (PARTY, character_topic(user_id)):
+            for sub in self._topics.get(topic, ()):
+                sub.push(user_id, fields)
+
+    def publish(self, user_id: int, fields: dict | None) -> None:
+        """
+        Publica alterações da ficha de user_id (fields=None: ficha removida).
+        Pode ser chamado de rotas síncronas (threadpool) ou do event loop.
+        """
+        loop = self._loop
+        if loop is None or not self._count or loop.is_closed():
+            return
+        live_published.inc()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(user_id, fields)
+        else:
+            loop.call_soon_threadsafe(self._deliver, user_id, fields)
+
+
+hub = LiveHub()
+
+Gauge("rpg_live_subscribers", "Conexões SSE abertas neste worker.", lambda: hub.subscribers)
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def event_stream(request, topic: str):
+    """
+    Gerador para StreamingResponse: eventos SSE até o cliente desconectar.
+
+    A inscrição acontece aqui dentro, já com o stream começando: se a
+    resposta nunca chegar a iterar o gerador (cliente caiu antes), não sobra
+    inscrição presa contando para LIVE_MAX_SUBSCRIBERS.
+    """
+    sub = hub.subscribe(topic)
+    if sub is None:
+        # lotou entre a checagem da rota e aqui: o EventSource volta depois
+        yield "retry: 30000\n\n"
+        return
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            events = await sub.get(timeout=LIVE_HEARTBEAT)
+            if await request.is_disconnected():
+                break
+            if not events:
+                yield ": ping\n\n"
+                continue
+            yield "".join(format_sse(event, data) for event, data in events)
+    finally:
+        hub.unsubscribe(sub)
@@ -1,34 +1,117 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
 
-from .db import Base, engine, SessionLocal
-from .routers import auth, player, master, cards
-from .seed import seed_users  # 👈 ADICIONADO
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, RedirectResponse, PlainTextResponse, Response
+from sqlalchemy import text
 
-app = FastAPI()
+from .config import settings
+from .db import engine, dispose_async_engine, pool_status
+from .bootstrap import ensure_database
+from .assets import AssetStaticFiles
+from .replica import ReadYourWritesMiddleware
+from .instrumentation import TimingMiddleware
+from .metrics import Gauge, render_prometheus
+from .templating import templates, precompile
+from . import dice, kdf, simulator
+from .routers import auth, player, master, cards, live, search, roll
 
-# Cria tabelas
-Base.metadata.create_all(bind=engine)
 
-# 👇 SEED AUTOMÁTICO (Render / Free-safe)
-try:
-    db = SessionLocal()
-    seed_users(db)
-    db.commit()
-finally:
-    db.close()
+# logger do uvicorn: aparece no log do servidor sem configurar logging
+log = logging.getLogger("uvicorn.error")
 
-# Static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # configuração efetiva do banco (ver app/config.py), sem senhas
+    log.info("banco: %s", " ".join(f"{k}={v}" for k, v in settings.describe().items()))
+    # Schema + seed (Render / Free-safe): um SELECT no carimbo quando o banco
+    # já foi inicializado ("python -m app.cli init"); senão o primeiro worker
+    # migra/semeia sob lock e os outros só esperam. DB_AUTO_INIT=0 desliga.
+    if os.getenv("DB_AUTO_INIT", "1") != "0":
+        ensure_database(engine)
+    # distribuições exatas das rolagens comuns (app/dice.py), ~ms
+    dice.warm_cache()
+    # todos os templates compilados antes da 1ª requisição (app/templating.py)
+    count, seconds = precompile(templates.env)
+    log.info("templates: %d carregados em %.0f ms", count, seconds * 1000)
+    try:
+        yield
+    finally:
+        # encerra os pools de processos (hash de senha, simulador)
+        kdf.shutdown()
+        simulator.shutdown()
+        await dispose_async_engine()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# GETs logo depois de uma escrita vão ao primário (ver app/replica.py)
+app.add_middleware(ReadYourWritesMiddleware)
+# latência por rota, SQL/template/KDF por requisição -> /metrics e Server-Timing
+# (adicionado por último = mais externo: mede o app inteiro)
+app.add_middleware(TimingMiddleware)
+
+# Static files (URLs com hash de conteúdo -> cache immutable; ver app/assets.py)
+app.mount("/static", AssetStaticFiles(directory="app/static"), name="static")
 
 # Routers
 app.include_router(auth.router)
 app.include_router(player.router)
 app.include_router(master.router)
 app.include_router(cards.router)
+app.include_router(live.router)
+app.include_router(search.router)
+app.include_router(roll.router)
+
+Gauge(
+    "rpg_db_pool_checked_out",
+    "Conexões do pool principal em uso.",
+    lambda: (pool_status(engine) or {}).get("checked_out", 0),
+)
+Gauge(
+    "rpg_db_pool_capacity",
+    "Conexões máximas do pool principal (size + overflow).",
+    lambda: (pool_status(engine) or {}).get("capacity", 0),
+)
+
 
 # ✅ Rota raiz para não dar 404 no Render
 @app.get("/", include_in_schema=False)
 def root():
     return RedirectResponse(url="/login")
+
+
+# Métricas por worker no formato do Prometheus (ver app/metrics.py).
+# Com METRICS_TOKEN definido, exige "Authorization: Bearer <token>".
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        return Response(status_code=401)
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# Health check: banco respondendo + ocupação do pool. 503 se o banco não
+# responde ou o pool está esgotado (requisições novas iriam esperar).
+@app.get("/healthz", include_in_schema=False)
+def healthz():
+    body = {"status": "ok", "env": settings.app_env, "database_source": settings.database_source}
+
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        body["database"] = {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+    except Exception as e:
+        body["database"] = {"ok": False, "error": type(e).__name__}
+        body["status"] = "error"
+
+    pool = pool_status(engine)
+    body["pool"] = pool
+    if pool and pool["saturation"] is not None and pool["saturation"] >= 1:
+        body["status"] = "saturated"
+
+    return JSONResponse(body, status_code=200 if body["status"] == "ok" else 503)
@@ -0,0 +1,132 @@
+# app/migrations.py
+# Migrações leves e idempotentes.
+# O projeto usa Base.metadata.create_all, que cria tabelas novas mas NÃO
+# adiciona colunas em tabelas que já existem (ex: rpg.db do Render).
+# Aqui ficam os ALTERs necessários para bancos criados por versões anteriores.
+
+from sqlalchemy import insert, inspect, text
+from sqlalchemy.engine import Engine
+
+from .db import Base
+from . import models  # noqa: F401  (registra as tabelas no metadata)
+from .models import CharacterItem, CharacterSkill
+from .inventory import parse_items, parse_skills, card_ids_by_key
+from .text import order_key
+from .search import ensure_search_index
+
+# (tabela, coluna, tipo SQL)
+ADDED_COLUMNS = [
+    # Miniaturas responsivas do catálogo (import_cards.py)
+    ("cards", "thumb_path", "VARCHAR"),
+    ("cards", "srcset_webp", "VARCHAR"),
+    ("cards", "srcset_avif", "VARCHAR"),
+    ("cards", "image_width", "INTEGER"),
+    ("cards", "image_height", "INTEGER"),
+
+    # Invalidação de sessões (app/auth.py)
+    ("users", "session_version", "INTEGER NOT NULL DEFAULT 1"),
+    ("users", "seed_fingerprint", "VARCHAR(64)"),
+
+    # Concorrência otimista da ficha
+    ("characters", "version", "INTEGER NOT NULL DEFAULT 1"),
+]
+
+
+# Índices de colunas únicas substituídos pelos compostos de Card.__table_args__
+DROPPED_INDEXES = [
+    "ix_cards_id",
+    "ix_cards_type",
+    "ix_cards_rarity",
+    "ix_cards_class_type",
+    "ix_cards_order_name",
+]
+
+
+# (tabela, coluna) removidas do model. Antes do DROP, o conteúdo é migrado
+# (ver split_character_text). DROP COLUMN: SQLite >= 3.35 ou Postgres.
+DROPPED_COLUMNS = [
+    # Inventário/habilidades em texto livre -> character_items/character_skills
+    ("characters", "inventory_text"),
+    ("characters", "skills_text"),
+]
+
+
+def split_character_text(conn, columns: set[str]) -> int:
+    """
+    Converte inventory_text/skills_text (uma entrada por linha) em linhas de
+    character_items/character_skills. Devolve quantas fichas foram migradas.
+    """
+    if "inventory_text" not in columns and "skills_text" not in columns:
+        return 0
+
+    inventory = "inventory_text" if "inventory_text" in columns else "''"
+    skills = "skills_text" if "skills_text" in columns else "''"
+    rows = conn.execute(text(
+        f"SELECT id, {inventory}, {skills} FROM characters "
+        f"WHERE COALESCE({inventory}, '') <> '' OR COALESCE({skills}, '') <> ''"
+    )).all()
+
+    items, skill_rows = [], []
+    for character_id, inventory_text, skills_text in rows:
+        for name, quantity in parse_items(inventory_text):
+            items.append({"character_id": character_id, "name": name, "name_key": order_key(name), "quantity": quantity})
+        for name, description in parse_skills(skills_text):
+            skill_rows.append({"character_id": character_id, "name": name, "name_key": order_key(name),
+                               "description": description})
+
+    card_ids = card_ids_by_key(conn, {row["name_key"] for row in items})
+    for row in items:
+        row["card_id"] = card_ids.get(row["name_key"])
+
+    if items:
+        conn.execute(insert(CharacterItem.__table__), items)
+    if skill_rows:
+        conn.execute(insert(CharacterSkill.__table__), skill_rows)
+    return len(rows)
+
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Adiciona colunas e índices faltantes. Seguro rodar várias vezes.
+    """
+    insp = inspect(engine)
+    tables = set(insp.get_table_names())
+    columns_cache: dict[str, set[str]] = {}
+
+    with engine.begin() as conn:
+        for table, column, sql_type in ADDED_COLUMNS:
+            if table not in tables:
+                # tabela nova: create_all já cria com todas as colunas
+                continue
+
+            if table not in columns_cache:
+                columns_cache[table] = {c["name"] for c in insp.get_columns(table)}
+
+            if column in columns_cache[table]:
+                continue
+
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
+            columns_cache[table].add(column)
+
+        # create_all só cria índices junto com a tabela
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+
+        for name in DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+        # dados antes do DROP COLUMN, na mesma transação
+        if "characters" in tables:
+            split_character_text(conn, {c["name"] for c in insp.get_columns("characters")})
+
+        for table, column in DROPPED_COLUMNS:
+            if table in tables and column in {c["name"] for c in insp.get_columns(table)}:
+                conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+
+        # busca full-text (app/search.py): não é um model, create_all não cria
+        ensure_search_index(conn)
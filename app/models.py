@@ -1,6 +1,6 @@
 from sqlalchemy import String, Integer, Text, Boolean, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Column, Integer as ColInteger, String as ColString, UniqueConstraint
+from sqlalchemy import Column, Integer as ColInteger, String as ColString, UniqueConstraint, BigInteger, Index
 
 from .db import Base
 
@@ -14,6 +14,13 @@ class User(Base):
     role: Mapped[str] = mapped_column(String(10), default="player")  # master | player
     force_password_change: Mapped[bool] = mapped_column(Boolean, default=True)
 
+    # Incrementado para invalidar sessões já emitidas (ver app/auth.py)
+    session_version: Mapped[int] = mapped_column(Integer, default=1)
+
+    # HMAC(password_hash + senha do seed): deixa o seed_users conferir a senha
+    # sem rodar PBKDF2 a cada boot (ver app/seed.py)
+    seed_fingerprint: Mapped[str | None] = mapped_column(String(64), nullable=True, default=None)
+
     character: Mapped["Character"] = relationship(
         back_populates="user",
         uselist=False,
@@ -45,32 +52,91 @@ class Character(Base):
     hero_points: Mapped[int] = mapped_column(Integer, default=5)
 
     notes: Mapped[str] = mapped_column(Text, default="")
-    inventory_text: Mapped[str] = mapped_column(Text, default="")
-    skills_text: Mapped[str] = mapped_column(Text, default="")
+
+    # Controle de concorrência otimista: todo UPDATE faz
+    # "... WHERE version = <lida>" e incrementa (ver app/routers/player.py)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
 
     user: Mapped["User"] = relationship(back_populates="character")
 
+    # Inventário e habilidades em linhas próprias (antes: inventory_text e
+    # skills_text, migrados por app/migrations.py). Carregue com selectinload.
+    items: Mapped[list["CharacterItem"]] = relationship(
+        back_populates="character",
+        cascade="all, delete-orphan",
+        order_by="CharacterItem.id",
+    )
+    skills: Mapped[list["CharacterSkill"]] = relationship(
+        back_populates="character",
+        cascade="all, delete-orphan",
+        order_by="CharacterSkill.id",
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+class CharacterItem(Base):
+    """
+    Um item do inventário. card_id liga o item à carta do catálogo de mesmo
+    nome (quando existe); name_key é o nome sem acento/maiúsculas, para
+    "quem carrega o X?" usar índice.
+    """
+    __tablename__ = "character_items"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id", ondelete="CASCADE"))
+    name: Mapped[str] = mapped_column(String(120))
+    name_key: Mapped[str] = mapped_column(String(120))
+    quantity: Mapped[int] = mapped_column(Integer, default=1)
+    card_id: Mapped[int | None] = mapped_column(ForeignKey("cards.id", ondelete="SET NULL"), nullable=True)
+
+    character: Mapped["Character"] = relationship(back_populates="items")
+    card: Mapped["Card | None"] = relationship()
+
+    __table_args__ = (
+        Index("ix_character_items_character", "character_id", "id"),
+        Index("ix_character_items_name_key", "name_key", "character_id"),
+        Index("ix_character_items_card", "card_id"),
+    )
+
+
+class CharacterSkill(Base):
+    __tablename__ = "character_skills"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    character_id: Mapped[int] = mapped_column(ForeignKey("characters.id", ondelete="CASCADE"))
+    name: Mapped[str] = mapped_column(String(120))
+    name_key: Mapped[str] = mapped_column(String(120))
+    description: Mapped[str] = mapped_column(Text, default="")
+
+    character: Mapped["Character"] = relationship(back_populates="skills")
+
+    __table_args__ = (
+        Index("ix_character_skills_character", "character_id", "id"),
+        Index("ix_character_skills_name_key", "name_key", "character_id"),
+    )
+
 
 class Card(Base):
     __tablename__ = "cards"
 
-    id = Column(ColInteger, primary_key=True, index=True)
+    id = Column(ColInteger, primary_key=True)
 
     # "arma" | "inimigo" | "local"
-    type = Column(ColString, nullable=False, index=True)
+    type = Column(ColString, nullable=False)
 
     # "comum" | "incomum" | "rara" | "epica" | "lendaria" | "mitica"
-    rarity = Column(ColString, nullable=False, index=True)
+    rarity = Column(ColString, nullable=False)
 
     # Só para armas: "combatente" | "potencializador" | "estrategico" | "especialista"
     # Para inimigos/locais: None
-    class_type = Column(ColString, nullable=True, index=True)
+    class_type = Column(ColString, nullable=True)
 
     # Nome exibido
     name = Column(ColString, nullable=False)
 
     # Nome normalizado para ordenação A–Z (sem acento)
-    order_name = Column(ColString, nullable=False, index=True)
+    order_name = Column(ColString, nullable=False)
 
     # slug do arquivo (sem acento, underscore)
     slug = Column(ColString, nullable=False, index=True)
@@ -78,6 +144,71 @@ class Card(Base):
     # caminho público da imagem
     image_path = Column(ColString, nullable=False)
 
+    # Miniaturas geradas pelo import_cards.py (app/thumbnails.py)
+    # thumb_path = menor variante WebP (fallback do <img>)
+    thumb_path = Column(ColString, nullable=True)
+    srcset_webp = Column(ColString, nullable=True)
+    srcset_avif = Column(ColString, nullable=True)
+
+    # Dimensões do original (evita "pulo" de layout enquanto carrega)
+    image_width = Column(ColInteger, nullable=True)
+    image_height = Column(ColInteger, nullable=True)
+
     __table_args__ = (
         UniqueConstraint("type", "rarity", "class_type", "slug", name="uq_card_identity"),
+
+        # Índices compostos = combinações de filtro do /cards e /api/cards.
+        # Todos terminam em (order_name, id): atendem o ORDER BY (A–Z e Z–A) e o
+        # cursor keyset sem "TEMP B-TREE". Conferidos por check_query_plans.py.
+        Index("ix_cards_order", "order_name", "id"),
+        Index("ix_cards_type_order", "type", "order_name", "id"),
+        Index("ix_cards_rarity_order", "rarity", "order_name", "id"),
+        Index("ix_cards_type_rarity_order", "type", "rarity", "order_name", "id"),
+        Index("ix_cards_type_class_order", "type", "class_type", "order_name", "id"),
+        Index("ix_cards_type_class_rarity_order", "type", "class_type", "rarity", "order_name", "id"),
     )
+
+
+class CardSource(Base):
+    """
+    Manifest do import_cards.py: um registro por arquivo de imagem importado.
+    Permite pular arquivos que não mudaram (size + mtime iguais).
+    """
+    __tablename__ = "card_sources"
+
+    id = Column(ColInteger, primary_key=True)
+
+    # caminho relativo a app/static/cards (ex: "armas/combatente/comum/escudo.png")
+    path = Column(ColString, nullable=False, unique=True)
+
+    size = Column(ColInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+
+    # sha256 do conteúdo
+    content_hash = Column(ColString(64), nullable=False)
+
+
+class CatalogState(Base):
+    """
+    Linha única (id=1) com a versão do catálogo de cartas.
+    O import_cards.py incrementa a versão; o cache do /cards (app/catalog.py)
+    descarta o que tem em memória quando ela muda.
+    """
+    __tablename__ = "catalog_state"
+
+    id = Column(ColInteger, primary_key=True)
+    version = Column(ColInteger, nullable=False, default=0)
+
+
+class SchemaState(Base):
+    """
+    Linha única (id=1) carimbada por app/bootstrap.py depois de criar/migrar o
+    schema e rodar o seed. Worker que encontra o carimbo atual só serve.
+    """
+    __tablename__ = "schema_state"
+
+    id = Column(ColInteger, primary_key=True)
+    # sha256 do metadata + migrações (bootstrap.schema_fingerprint)
+    schema_version = Column(ColString(64), nullable=False, default="")
+    # HMAC da configuração de seed (seed.seed_digest)
+    seed_digest = Column(ColString(64), nullable=False, default="")
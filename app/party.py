@@ -0,0 +1,87 @@
+# app/party.py
+# Visão do grupo para o painel do mestre: todos os jogadores com os dados
+# vitais da ficha em UMA query (join + só as colunas usadas, sem os textos
+# longos) e agregados do grupo calculados em cima dessas linhas.
+#
+# get_party() memoiza o resultado em request.state: qualquer caminho que
+# renderiza o painel (inclusive os de erro) consulta o banco uma vez só.
+
+from collections import namedtuple
+
+from fastapi import Request
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import User, Character
+
+ATTRIBUTES = ("heroism", "agility", "intellect", "strength", "willpower", "vigor")
+
+PARTY_COLUMNS = (
+    User.id,
+    User.username,
+    Character.name,
+    Character.level,
+    Character.hp,
+    Character.hero_points,
+    *(getattr(Character, attr) for attr in ATTRIBUTES),
+    Character.version,
+)
+
+PartyMember = namedtuple(
+    "PartyMember",
+    ["id", "username", "name", "level", "hp", "hero_points", *ATTRIBUTES, "version"],
+)
+
+PartySummary = namedtuple(
+    "PartySummary",
+    ["players", "with_character", "total_hp", "avg_hp", "min_hp", "total_hero_points", "avg_attributes"],
+)
+
+
+def load_party(db: Session, user_ids=None) -> list[PartyMember]:
+    # user_ids: só esses jogadores (testes de atributo em app/routers/roll.py)
+    q = (
+        select(*PARTY_COLUMNS)
+        .select_from(User)
+        .outerjoin(Character, Character.user_id == User.id)
+        .where(User.role == "player")
+        .order_by(User.id.asc())
+    )
+    if user_ids is not None:
+        q = q.where(User.id.in_(user_ids))
+    return [PartyMember(*row) for row in db.execute(q)]
+
+
+def summarize(members: list[PartyMember]) -> PartySummary:
+    # jogador sem ficha ainda (outer join) não entra nas médias
+    sheets = [m for m in members if m.hp is not None]
+    count = len(sheets)
+
+    total_hp = sum(m.hp for m in sheets)
+    return PartySummary(
+        players=len(members),
+        with_character=count,
+        total_hp=total_hp,
+        avg_hp=round(total_hp / count, 1) if count else None,
+        min_hp=min((m.hp for m in sheets), default=None),
+        total_hero_points=sum(m.hero_points for m in sheets),
+        avg_attributes={
+            attr: (round(sum(getattr(m, attr) for m in sheets) / count, 1) if count else None)
+            for attr in ATTRIBUTES
+        },
+    )
+
+
+def get_party(request: Request, db: Session) -> tuple[list[PartyMember], PartySummary]:
+    cached = getattr(request.state, "party", None)
+    if cached is None:
+        members = load_party(db)
+        cached = request.state.party = (members, summarize(members))
+    return cached
+
+
+def party_json(members: list[PartyMember], summary: PartySummary) -> dict:
+    return {
+        "players": [m._asdict() for m in members],
+        "summary": summary._asdict(),
+    }
@@ -0,0 +1,75 @@
+# app/passwords.py
+# Hash de senha: um único módulo para rotas, seed e scripts.
+#
+# Formato atual: o do passlib ("$pbkdf2-sha256$<rounds>$<salt>$<hash>"), com custo
+# definido por PASSWORD_PBKDF2_ROUNDS. Também verifica o formato antigo gravado
+# pelo app/seed.py ("pbkdf2_sha256$<iters>$<salt_hex>$<hash_hex>"); qualquer hash
+# antigo ou abaixo do custo atual é regravado no próximo login bem-sucedido.
+#
+# Módulo sem dependências do app: é importado pelos processos do pool de KDF
+# (app/kdf.py), então não deve puxar config/banco.
+
+import hashlib
+import hmac
+import os
+
+from passlib.context import CryptContext
+from passlib.exc import UnknownHashError
+
+PASSWORD_ROUNDS = int(os.getenv("PASSWORD_PBKDF2_ROUNDS", "210000"))
+
+LEGACY_PREFIX = "pbkdf2_sha256$"
+
+pwd = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_ROUNDS,
+    # hashes com menos rounds que a política atual "precisam de update"
+    pbkdf2_sha256__min_rounds=PASSWORD_ROUNDS,
+)
+
+
+def hash_password(password: str) -> str:
+    return pwd.hash(password)
+
+
+def _verify_legacy(password: str, stored: str) -> bool:
+    try:
+        algo, iters_s, salt_hex, hash_hex = stored.split("$", 3)
+        if algo != "pbkdf2_sha256":
+            return False
+        dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt_hex), int(iters_s))
+        return hmac.compare_digest(dk.hex(), hash_hex)
+    except ValueError:
+        return False
+
+
+def verify_and_update(password: str, stored: str) -> tuple[bool, str | None]:
+    """
+    (senha confere?, novo hash se o armazenado estiver desatualizado ou None).
+    """
+    if not stored:
+        return False, None
+
+    if stored.startswith(LEGACY_PREFIX):
+        if not _verify_legacy(password, stored):
+            return False, None
+        return True, hash_password(password)
+
+    try:
+        return pwd.verify_and_update(password, stored)
+    except (UnknownHashError, ValueError):
+        return False, None
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return verify_and_update(password, password_hash)[0]
+
+
+def needs_update(stored: str) -> bool:
+    if not stored or stored.startswith(LEGACY_PREFIX):
+        return True
+    try:
+        return pwd.needs_update(stored)
+    except (UnknownHashError, ValueError):
+        return True
@@ -0,0 +1,192 @@
+# app/provisioning.py
+# Criação de jogadores em massa (elenco de campanha, mesas de evento).
+#
+# Entrada: CSV (cabeçalho username[,password][,character_name]) ou JSON
+# (lista de objetos com as mesmas chaves, ou lista de usernames).
+# Sem password na linha, gera uma senha temporária.
+#
+# Fluxo: valida todas as linhas, confere usernames existentes numa query só,
+# faz os hashes em paralelo (pool de processos) e grava users + characters
+# numa única transação com INSERTs em lote. Devolve um relatório por linha
+# com as senhas temporárias para entregar aos jogadores.
+
+import csv
+import io
+import json
+import secrets
+import string
+from collections import namedtuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from .models import User, Character
+from . import search
+
+MAX_ROSTER = 500
+USERNAME_MAX = 50
+NAME_MAX = 120
+
+# generated: senha criada aqui (temporária), não vinda do arquivo
+RosterEntry = namedtuple("RosterEntry", ["line", "username", "password", "character_name", "generated"],
+                         defaults=(False,))
+
+# status: "created" | "error"
+ReportRow = namedtuple("ReportRow", ["line", "username", "status", "temp_password", "character_name", "error"])
+
+
+class RosterError(ValueError):
+    """Arquivo inválido como um todo (formato, vazio, grande demais)."""
+
+
+def generate_temp_password(length: int = 10) -> str:
+    alphabet = string.ascii_letters + string.digits
+    return "".join(secrets.choice(alphabet) for _ in range(length))
+
+
+def _entry(line: int, item) -> RosterEntry:
+    if isinstance(item, str):
+        item = {"username": item}
+    if not isinstance(item, dict):
+        raise RosterError(f"linha {line}: esperado objeto ou username")
+    return RosterEntry(
+        line=line,
+        username=str(item.get("username") or "").strip(),
+        password=str(item.get("password") or "") or None,
+        character_name=str(item.get("character_name") or "").strip() or None,
+    )
+
+
+def parse_roster(data: bytes, filename: str = "") -> list[RosterEntry]:
+    """
+    Detecta JSON pelo nome do arquivo ou pelo primeiro caractere; o resto é CSV.
+    """
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise RosterError("arquivo precisa estar em UTF-8")
+
+    stripped = text.lstrip()
+    if filename.lower().endswith(".json") or stripped.startswith(("[", "{")):
+        try:
+            items = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise RosterError(f"JSON inválido: {e.msg} (linha {e.lineno})")
+        if isinstance(items, dict):
+            items = items.get("players")
+        if not isinstance(items, list):
+            raise RosterError('JSON deve ser uma lista (ou {"players": [...]})')
+        entries = [_entry(i, item) for i, item in enumerate(items, start=1)]
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames or "username" not in [f.strip() for f in reader.fieldnames]:
+            raise RosterError("CSV precisa de cabeçalho com a coluna username")
+        entries = [
+            _entry(reader.line_num, {(k or "").strip(): v for k, v in row.items()})
+            for row in reader
+        ]
+
+    if not entries:
+        raise RosterError("nenhum jogador no arquivo")
+    if len(entries) > MAX_ROSTER:
+        raise RosterError(f"no máximo {MAX_ROSTER} jogadores por importação")
+    return entries
+
+
+def validate_roster(db: Session, entries: list[RosterEntry]) -> tuple[list[RosterEntry], list[ReportRow]]:
+    """
+    (linhas válidas, linhas rejeitadas). Usernames já existentes são
+    conferidos numa única query.
+    """
+    usernames = {e.username for e in entries if e.username}
+    existing = set(db.scalars(select(User.username).where(User.username.in_(usernames)))) if usernames else set()
+
+    valid: list[RosterEntry] = []
+    rejected: list[ReportRow] = []
+    seen: set[str] = set()
+
+    for e in entries:
+        error = None
+        if not e.username:
+            error = "username vazio"
+        elif len(e.username) > USERNAME_MAX:
+            error = f"username maior que {USERNAME_MAX} caracteres"
+        elif e.username in existing:
+            error = "username já existe"
+        elif e.username in seen:
+            error = "username repetido no arquivo"
+        elif e.character_name and len(e.character_name) > NAME_MAX:
+            error = f"nome do personagem maior que {NAME_MAX} caracteres"
+
+        if error:
+            rejected.append(ReportRow(e.line, e.username, "error", None, e.character_name, error))
+            continue
+
+        seen.add(e.username)
+        valid.append(e)
+
+    return valid, rejected
+
+
+def with_passwords(entries: list[RosterEntry]) -> list[RosterEntry]:
+    return [e if e.password else e._replace(password=generate_temp_password(), generated=True) for e in entries]
+
+
+def insert_roster(db: Session, entries: list[RosterEntry], password_hashes: list[str]) -> list[tuple[int, RosterEntry]]:
+    """
+    INSERT em lote de users e characters (sem commit). Devolve (user_id, entry).
+    """
+    if not entries:
+        return []
+
+    rows = db.execute(
+        insert(User).returning(User.id, User.username),
+        [
+            {
+                "username": e.username,
+                "password_hash": h,
+                "role": "player",
+                "force_password_change": True,
+                "session_version": 1,
+            }
+            for e, h in zip(entries, password_hashes)
+        ],
+    )
+    ids = {username: user_id for user_id, username in rows}
+
+    character_ids = db.scalars(
+        insert(Character).returning(Character.id),
+        [
+            {
+                "user_id": ids[e.username],
+                "name": (e.character_name or e.username).upper(),
+                "version": 1,
+            }
+            for e in entries
+        ],
+    ).all()
+    # INSERT do Core não passa pelo listener do ORM (app/search.py)
+    search.reindex_characters(db, character_ids)
+    return [(ids[e.username], e) for e in entries]
+
+
+def build_report(created: list[tuple[int, RosterEntry]], rejected: list[ReportRow]) -> list[ReportRow]:
+    """
+    Só as senhas geradas aparecem (temp_password); as que vieram no arquivo
+    o mestre já tem e não são repetidas no relatório.
+    """
+    rows = [
+        ReportRow(e.line, e.username, "created", e.password if e.generated else None,
+                  (e.character_name or e.username).upper(), None)
+        for _, e in created
+    ]
+    return sorted(rows + rejected, key=lambda r: r.line)
+
+
+def report_csv(report: list[ReportRow]) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(ReportRow._fields)
+    for row in report:
+        writer.writerow(["" if v is None else v for v in row])
+    return out.getvalue()
@@ -0,0 +1,71 @@
+# app/replica.py
+# Roteamento de leitura: páginas GET (/cards, /master, /player) usam o
+# engine de leitura (app.db.read_engine: réplica, ou pool query_only no
+# mesmo SQLite); rotas que escrevem continuam no primário (get_db).
+#
+# Read-your-writes: toda requisição que escreve (POST/PATCH/PUT/DELETE com
+# sucesso) marca o navegador com o cookie rpg_rw por alguns segundos; nesse
+# intervalo os GETs daquele navegador vão ao primário e veem a própria
+# escrita mesmo se a réplica estiver atrasada.
+
+import time
+
+from fastapi import Request
+
+from .config import settings
+from .db import SessionLocal, ReadSessionLocal, read_engine, engine
+
+RW_COOKIE = "rpg_rw"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _recently_wrote(request: Request) -> bool:
+    raw = request.cookies.get(RW_COOKIE)
+    if not raw:
+        return False
+    try:
+        return time.time() - float(raw) < settings.read_your_writes_seconds
+    except ValueError:
+        return False
+
+
+def get_read_db(request: Request):
+    """
+    Dependência das rotas só de leitura. Não faça commit com ela: no SQLite
+    o pool de leitura é query_only e qualquer escrita falha.
+    """
+    if read_engine is engine or _recently_wrote(request):
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI puro (não bufferiza respostas, então não atrapalha o SSE).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or read_engine is engine:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (
+                    f"{RW_COOKIE}={time.time():.3f}; Max-Age={int(settings.read_your_writes_seconds) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
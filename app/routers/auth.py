@@ -1,21 +1,23 @@
 from fastapi import APIRouter, Depends, Request, Form
 from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..db import get_db
+from ..db import get_async_db, get_db
 from ..models import User
-from ..auth import verify_password, hash_password, set_session, clear_session, read_session
+from ..auth import (
+    set_session,
+    clear_session,
+    read_session_user,
+    read_session_user_async,
+    invalidate_user_sessions,
+)
+from .. import kdf
+from ..kdf import KdfBusy, KDF_RETRY_AFTER
+from ..templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
-
-
-def _get_logged_user(request: Request, db: Session) -> User | None:
-    user_id = read_session(request)
-    if not user_id:
-        return None
-    return db.query(User).filter(User.id == user_id).first()
 
 
 @router.get("/login", response_class=HTMLResponse)
@@ -26,33 +28,56 @@ def login_page(request: Request):
     )
 
 
+def _kdf_busy(template: str, request: Request):
+    return templates.TemplateResponse(
+        template,
+        {"request": request, "error": "Servidor ocupado. Tente novamente em alguns segundos."},
+        status_code=429,
+        headers={"Retry-After": str(KDF_RETRY_AFTER)},
+    )
+
+
+# async: o PBKDF2 roda no pool de processos (app/kdf.py) e a rota espera o
+# resultado no event loop, sem ocupar thread; o banco vai pela sessão async
 @router.post("/login")
-def login(
+async def login(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = db.query(User).filter(User.username == username).first()
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await kdf.verify_and_update(password, user.password_hash)
+        except KdfBusy:
+            return _kdf_busy("login.html", request)
 
-    if (not user) or (not verify_password(password, user.password_hash)):
+    if not valid:
         return templates.TemplateResponse(
             "login.html",
             {"request": request, "error": "Usuário ou senha incorretos."},
             status_code=401
         )
 
+    # Hash em formato/custo antigo: regrava com a política atual
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+
     resp = RedirectResponse(url="/me", status_code=303)
 
     # ✅ IMPORTANTE: agora passa request também
-    set_session(request, resp, user.id)
+    set_session(request, resp, user)
 
     return resp
 
 
 @router.get("/me")
 def me_redirect(request: Request, db: Session = Depends(get_db)):
-    user = _get_logged_user(request, db)
+    user = read_session_user(request, db)
     if not user:
         return RedirectResponse(url="/login", status_code=303)
 
@@ -68,7 +93,7 @@ def me_redirect(request: Request, db: Session = Depends(get_db)):
 
 @router.get("/change-password", response_class=HTMLResponse)
 def change_password_page(request: Request, db: Session = Depends(get_db)):
-    user = _get_logged_user(request, db)
+    user = read_session_user(request, db)
     if not user:
         return RedirectResponse(url="/login", status_code=303)
 
@@ -81,14 +106,20 @@ def change_password_page(request: Request, db: Session = Depends(get_db)):
     )
 
 
+# async pelo mesmo motivo do /login
 @router.post("/change-password")
-def change_password_submit(
+async def change_password_submit(
     request: Request,
     new_password: str = Form(...),
     confirm_password: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = _get_logged_user(request, db)
+    session_user = await read_session_user_async(request, db)
+    if not session_user:
+        return RedirectResponse(url="/login", status_code=303)
+
+    # Aqui precisamos da linha real (vamos gravar a senha)
+    user = await db.get(User, session_user.id)
     if not user:
         return RedirectResponse(url="/login", status_code=303)
 
@@ -112,14 +143,19 @@ def change_password_submit(
             status_code=400
         )
 
-    user.password_hash = hash_password(new_password)
+    try:
+        user.password_hash = await kdf.hash_password(new_password)
+    except KdfBusy:
+        return _kdf_busy("change_password.html", request)
     user.force_password_change = False
-    db.commit()
+    # derruba sessões antigas; este navegador recebe um cookie novo abaixo
+    invalidate_user_sessions(user)
+    await db.commit()
 
     resp = RedirectResponse(url="/me", status_code=303)
 
     # ✅ IMPORTANTE: reemitir cookie com secure correto
-    set_session(request, resp, user.id)
+    set_session(request, resp, user)
 
     return resp
 
@@ -1,14 +1,16 @@
+import hashlib
+
 from fastapi import APIRouter, Depends, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from sqlalchemy.orm import Session
 
-from ..db import get_db
-from ..models import Card, User
-from ..auth import read_session
+from ..replica import get_read_db
+from ..catalog import CardView, catalog_cache, decode_cursor
+from ..auth import read_session_user
+from ..assets import static_srcset, static_url
+from ..templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 # Canon (DB) -> Label (UI)
 RARITY_OPTIONS = [
@@ -33,21 +35,16 @@ TYPE_OPTIONS = [
     ("local", "Locais"),
 ]
 
-
-def _get_logged_user(request: Request, db: Session) -> User | None:
-    user_id = read_session(request)
-    if not user_id:
-        return None
-    return db.query(User).filter(User.id == user_id).first()
+# Cartas por página (HTML inicial e /api/cards)
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
 
 
-@router.get("/cards", response_class=HTMLResponse)
-def cards_catalog(request: Request, db: Session = Depends(get_db)):
-    me = _get_logged_user(request, db)
-    if not me:
-        return RedirectResponse(url="/login", status_code=303)
-
-    # Query params
+def _parse_filters(request: Request) -> dict:
+    """
+    Normaliza os filtros da querystring (mesmas regras no HTML e na API).
+    Retorna os valores "crus" (para o formulário) e os efetivos (para a query).
+    """
     rarity = (request.query_params.get("rarity") or "").strip().lower()
     sort = (request.query_params.get("sort") or "az").strip().lower()  # az | za
     card_type = (request.query_params.get("type") or "").strip().lower()  # arma|inimigo|local|"" (todos)
@@ -57,31 +54,53 @@ def cards_catalog(request: Request, db: Session = Depends(get_db)):
     valid_types = {t[0] for t in TYPE_OPTIONS}
     valid_classes = {c[0] for c in CLASS_OPTIONS}
 
-    q = db.query(Card)
-
     # Se classe foi selecionada, força tipo "arma"
     if class_type in valid_classes:
         card_type = "arma"
 
-    # Filtro por tipo
-    if card_type in valid_types:
-        q = q.filter(Card.type == card_type)
+    return {
+        "selected_rarity": rarity,
+        "selected_sort": sort,
+        "selected_type": card_type,
+        "selected_class": class_type,
+        # Filtros inválidos/vazios = sem filtro; classe só vale para armas
+        "query": {
+            "card_type": card_type if card_type in valid_types else None,
+            "rarity": rarity if rarity in valid_rarities else None,
+            "class_type": class_type if card_type == "arma" and class_type in valid_classes else None,
+            "sort": "za" if sort == "za" else "az",
+        },
+    }
 
-    # Filtro por raridade
-    if rarity in valid_rarities:
-        q = q.filter(Card.rarity == rarity)
 
-    # Filtro por classe (somente armas)
-    if card_type == "arma" and class_type in valid_classes:
-        q = q.filter(Card.class_type == class_type)
+def _card_json(c: CardView) -> dict:
+    return {
+        "id": c.id,
+        "type": c.type,
+        "name": c.name,
+        "rarity": c.rarity,
+        "class_type": c.class_type,
+        "image": static_url(c.image_path),
+        "thumb": static_url(c.thumb_path or c.image_path),
+        "srcset_webp": static_srcset(c.srcset_webp),
+        "srcset_avif": static_srcset(c.srcset_avif),
+        "width": c.image_width,
+        "height": c.image_height,
+    }
 
-    # Ordenação
-    if sort == "za":
-        q = q.order_by(Card.order_name.desc())
-    else:
-        q = q.order_by(Card.order_name.asc())
 
-    cards = q.all()
+@router.get("/cards", response_class=HTMLResponse)
+def cards_catalog(request: Request, db: Session = Depends(get_read_db)):
+    me = read_session_user(request, db)
+    if not me:
+        return RedirectResponse(url="/login", status_code=303)
+
+    filters = _parse_filters(request)
+
+    # Uma página renderizada; o resto chega via /api/cards (scroll infinito).
+    # Sem JS, o link "próximas" do sentinela volta aqui com ?cursor=
+    after = decode_cursor(request.query_params.get("cursor"))
+    cards, next_cursor = catalog_cache.get_page(db, **filters["query"], after=after, limit=PAGE_SIZE)
 
     return templates.TemplateResponse(
         "cards_catalog.html",
@@ -89,12 +108,52 @@ def cards_catalog(request: Request, db: Session = Depends(get_db)):
             "request": request,
             "me": me,
             "cards": cards,
+            "next_cursor": next_cursor,
+            # mesmos filtros, cursor trocado
+            "next_query": request.url.include_query_params(cursor=next_cursor).query if next_cursor else None,
             "rarity_options": RARITY_OPTIONS,
             "type_options": TYPE_OPTIONS,
             "class_options": CLASS_OPTIONS,
-            "selected_rarity": rarity,
-            "selected_sort": sort,
-            "selected_type": card_type,
-            "selected_class": class_type,
+            "selected_rarity": filters["selected_rarity"],
+            "selected_sort": filters["selected_sort"],
+            "selected_type": filters["selected_type"],
+            "selected_class": filters["selected_class"],
         },
     )
+
+
+@router.get("/api/cards")
+def cards_api(request: Request, db: Session = Depends(get_read_db)):
+    """
+    Catálogo paginado por keyset em (order_name, id).
+    Parâmetros: type, rarity, class_type, sort (az|za), cursor, limit.
+    """
+    me = read_session_user(request, db)
+    if not me:
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+
+    filters = _parse_filters(request)["query"]
+    after = decode_cursor(request.query_params.get("cursor"))
+    try:
+        limit = int(request.query_params.get("limit") or PAGE_SIZE)
+    except ValueError:
+        limit = PAGE_SIZE
+    limit = max(1, min(MAX_PAGE_SIZE, limit))
+
+    # ETag = versão do catálogo + parâmetros efetivos: dá para responder 304
+    # antes de montar a página
+    version = catalog_cache.current_version(db)
+    key = repr((version, sorted(filters.items()), after, limit)).encode("utf-8")
+    etag = f'"{hashlib.sha1(key).hexdigest()[:16]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    cards, next_cursor = catalog_cache.get_page(db, **filters, after=after, limit=limit)
+
+    return JSONResponse(
+        {"items": [_card_json(c) for c in cards], "next_cursor": next_cursor},
+        headers=headers,
+    )
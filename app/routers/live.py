@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from ..db import AsyncSessionLocal
+from ..auth import read_session_user_async
+from ..live import PARTY, character_topic, event_stream, hub
+
+router = APIRouter()
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # nginx/Render: não bufferizar o stream
+    "X-Accel-Buffering": "no",
+}
+
+
+async def _session_user(request: Request):
+    # sessão curta: a conexão SSE fica aberta por minutos, o banco não
+    async with AsyncSessionLocal() as db:
+        return await read_session_user_async(request, db)
+
+
+def _stream(request: Request, topic: str):
+    # só confere o limite; a inscrição é feita pelo event_stream quando o
+    # stream começa (e desfeita no finally dele)
+    if hub.full:
+        return JSONResponse({"detail": "Too many live connections"}, status_code=503, headers={"Retry-After": "30"})
+    return StreamingResponse(event_stream(request, topic), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# Todas as fichas (painel do mestre)
+@router.get("/api/live/party")
+async def live_party(request: Request):
+    me = await _session_user(request)
+    if not me:
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+    if me.role != "master":
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
+
+    return _stream(request, PARTY)
+
+
+# Uma ficha: o mestre vê qualquer uma, o jogador só a própria
+@router.get("/api/live/character/{user_id}")
+async def live_character(user_id: int, request: Request):
+    me = await _session_user(request)
+    if not me:
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+    if me.role != "master" and me.id != user_id:
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
+
+    return _stream(request, character_topic(user_id))
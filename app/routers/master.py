@@ -1,75 +1,192 @@
-from fastapi import APIRouter, Depends, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Body, Depends, File, Request, Form, UploadFile
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-import secrets
-import string
+from starlette.concurrency import run_in_threadpool
 
 from ..db import get_db
 from ..models import User, Character
-from ..auth import read_session, hash_password
+from ..auth import SessionUser, read_session_user, invalidate_user_sessions
+from ..kdf import KdfBusy, KDF_RETRY_AFTER
+from ..live import hub
+from ..replica import get_read_db
+from ..party import ATTRIBUTES, get_party, party_json
+from .. import inventory, kdf, provisioning, simulator
+from ..templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 # =========================
 # Helpers
 # =========================
-def _require_master(request: Request, db: Session) -> User | None:
-    user_id = read_session(request)
-    if not user_id:
-        return None
-    me = db.query(User).filter(User.id == user_id).first()
-    if not me or (me.role or "").lower() != "master":
+def _require_master(request: Request, db: Session) -> SessionUser | None:
+    me = read_session_user(request, db)
+    if not me or me.role != "master":
         return None
     return me
 
 
-def _generate_temp_password(length: int = 10) -> str:
-    alphabet = string.ascii_letters + string.digits
-    return "".join(secrets.choice(alphabet) for _ in range(length))
+def _render_dashboard(
+    request: Request,
+    db: Session,
+    me: SessionUser,
+    *,
+    error: str | None = None,
+    success: str | None = None,
+    report: list | None = None,
+    status_code: int = 200,
+    headers: dict | None = None,
+):
+    # todos os caminhos (normal e de erro) passam por aqui: uma query só
+    players, summary = get_party(request, db)
+    return templates.TemplateResponse(
+        "master_dashboard.html",
+        {
+            "request": request,
+            "me": me,
+            "players": players,
+            "summary": summary,
+            "attributes": ATTRIBUTES,
+            "error": error,
+            "success": success,
+            "report": report,
+        },
+        status_code=status_code,
+        headers=headers,
+    )
+
+
+def _kdf_busy(request: Request, db: Session, me: SessionUser):
+    return _render_dashboard(
+        request,
+        db,
+        me,
+        error="Servidor ocupado com outros logins. Tente novamente em alguns segundos.",
+        status_code=429,
+        headers={"Retry-After": str(KDF_RETRY_AFTER)},
+    )
 
 
 # =========================
 # Dashboard
 # =========================
 @router.get("/master", response_class=HTMLResponse)
-def master_dashboard(request: Request, db: Session = Depends(get_db)):
+def master_dashboard(request: Request, db: Session = Depends(get_read_db)):
     me = _require_master(request, db)
     if not me:
         return RedirectResponse(url="/login", status_code=303)
 
-    players = (
-        db.query(User)
-        .filter(User.role == "player")
-        .order_by(User.id.asc())
-        .all()
-    )
+    return _render_dashboard(request, db, me)
 
-    return templates.TemplateResponse(
-        "master_dashboard.html",
-        {
-            "request": request,
-            "me": me,
-            "players": players,
-            "error": None,
-            "success": None,
-        },
-    )
+
+# Mesmos dados do painel em JSON (jogadores + vitais + agregados do grupo)
+@router.get("/api/party")
+def party_overview(request: Request, db: Session = Depends(get_read_db)):
+    me = read_session_user(request, db)
+    if not me:
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+    if me.role != "master":
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
+
+    players, summary = get_party(request, db)
+    return JSONResponse(party_json(players, summary))
+
+
+# Quem carrega um item: /api/party/items?name=Necronomicon
+@router.get("/api/party/items")
+def party_item_carriers(request: Request, name: str = "", db: Session = Depends(get_read_db)):
+    me = read_session_user(request, db)
+    if not me:
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+    if me.role != "master":
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
+    if not name.strip():
+        return JSONResponse({"detail": "Informe name"}, status_code=422)
+
+    return JSONResponse({"name": name.strip(), "carriers": inventory.item_carriers(db, name)})
+
+
+# =========================
+# Simulador de encontros (app/simulator.py)
+# =========================
+def _int_list(value, field: str) -> list[int]:
+    if not isinstance(value, list):
+        raise simulator.SimulationError(f"{field}: lista de ids.")
+    try:
+        return [int(v) for v in value]
+    except (TypeError, ValueError):
+        raise simulator.SimulationError(f"{field}: lista de ids.")
+
+
+def _encounter_args(data: dict):
+    characters = _int_list(data.get("characters") or [], "characters")
+
+    enemies = []
+    for item in data.get("enemies") or []:
+        if not isinstance(item, dict):
+            raise simulator.SimulationError("enemies: lista de {card_id, count}.")
+        try:
+            enemies.append((int(item["card_id"]), max(1, int(item.get("count") or 1))))
+        except (KeyError, TypeError, ValueError):
+            raise simulator.SimulationError("enemies: lista de {card_id, count}.")
+
+    weapons = data.get("weapons") or {}
+    if not isinstance(weapons, dict):
+        raise simulator.SimulationError("weapons: {id da ficha: id da carta}.")
+    try:
+        weapons = {int(k): int(v) for k, v in weapons.items()}
+        # padrão só quando falta; 0 e negativos são recusados em _check_args
+        sims = simulator.DEFAULT_SIMS if data.get("sims") is None else int(data["sims"])
+        seed = None if data.get("seed") is None else int(data["seed"])
+    except (TypeError, ValueError):
+        raise simulator.SimulationError("weapons, sims e seed: números inteiros.")
+    return characters, enemies, weapons, sims, seed
+
+
+# Corpo: {"characters": [ids das fichas], "enemies": [{"card_id": 7, "count": 2}],
+#         "weapons": {"<id da ficha>": id da carta}, "sims": 20000, "seed": 1}
+# A mesma seed com o mesmo corpo devolve o mesmo relatório.
+# Síncrona: as duas queries rodam no threadpool; as lutas rodam no pool de
+# processos do simulador e a thread só espera o resultado.
+@router.post("/api/encounters/simulate")
+def simulate_encounter(request: Request, data: dict = Body(...), db: Session = Depends(get_read_db)):
+    me = read_session_user(request, db)
+    if not me:
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+    if me.role != "master":
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
+
+    try:
+        characters, enemies, weapons, sims, seed = _encounter_args(data)
+        encounter = simulator.load_encounter(db, characters, enemies, weapons)
+        report = simulator.run_pooled(encounter, sims, seed)
+    except simulator.SimulationError as e:
+        return JSONResponse({"detail": str(e)}, status_code=422)
+    except simulator.SimulationBusy:
+        return JSONResponse(
+            {"detail": "Já tem uma simulação rodando. Tente de novo em alguns segundos."},
+            status_code=429,
+            headers={"Retry-After": str(simulator.SIM_RETRY_AFTER)},
+        )
+
+    return JSONResponse(simulator.report_json(report))
 
 
 # =========================
 # Criar jogador
 # =========================
 @router.post("/master/create-player")
-def create_player(
+async def create_player(
     request: Request,
     db: Session = Depends(get_db),
     username: str = Form(...),
     password: str = Form(...),
 ):
-    me = _require_master(request, db)
+    # async: o PBKDF2 é esperado no event loop (app/kdf.py); só as consultas
+    # curtas e o commit passam pelo threadpool
+    me = await run_in_threadpool(_require_master, request, db)
     if not me:
         return RedirectResponse(url="/login", status_code=303)
 
@@ -77,24 +194,25 @@ def create_player(
     if not username:
         return RedirectResponse(url="/master", status_code=303)
 
-    existing = db.query(User).filter(User.username == username).first()
+    existing = await run_in_threadpool(lambda: db.query(User.id).filter(User.username == username).first())
     if existing:
-        players = db.query(User).filter(User.role == "player").order_by(User.id.asc()).all()
-        return templates.TemplateResponse(
-            "master_dashboard.html",
-            {
-                "request": request,
-                "me": me,
-                "players": players,
-                "error": "Esse username já existe. Escolha outro.",
-                "success": None,
-            },
-            status_code=400,
+        return await run_in_threadpool(
+            _render_dashboard, request, db, me, error="Esse username já existe. Escolha outro.", status_code=400
         )
 
+    try:
+        password_hash = await kdf.hash_password(password)
+    except KdfBusy:
+        return await run_in_threadpool(_kdf_busy, request, db, me)
+
+    await run_in_threadpool(_insert_player, db, username, password_hash)
+    return RedirectResponse(url="/master", status_code=303)
+
+
+def _insert_player(db: Session, username: str, password_hash: str) -> None:
     user = User(
         username=username,
-        password_hash=hash_password(password),
+        password_hash=password_hash,
         role="player",
         force_password_change=True,
     )
@@ -105,8 +223,64 @@ def create_player(
     c = Character(user_id=user.id, name=username.upper())
     db.add(c)
     db.commit()
+    hub.publish(user.id, {"name": c.name, "version": c.version})
 
-    return RedirectResponse(url="/master", status_code=303)
+
+# =========================
+# Criar jogadores em massa (CSV/JSON)
+# =========================
+@router.post("/master/bulk-players")
+def bulk_create_players(
+    request: Request,
+    db: Session = Depends(get_db),
+    roster: UploadFile = File(...),
+    output: str = Form("html"),
+):
+    me = _require_master(request, db)
+    if not me:
+        return RedirectResponse(url="/login", status_code=303)
+
+    try:
+        entries = provisioning.parse_roster(roster.file.read(), roster.filename or "")
+    except provisioning.RosterError as e:
+        return _render_dashboard(request, db, me, error=f"Importação inválida: {e}", status_code=400)
+
+    valid, rejected = provisioning.validate_roster(db, entries)
+    valid = provisioning.with_passwords(valid)
+
+    try:
+        hashes = kdf.hash_many([e.password for e in valid])
+    except KdfBusy:
+        return _kdf_busy(request, db, me)
+
+    try:
+        created = provisioning.insert_roster(db, valid, hashes)
+        db.commit()
+    except IntegrityError:
+        # username criado por outra requisição entre a validação e o INSERT
+        db.rollback()
+        return _render_dashboard(
+            request, db, me, error="Algum username foi criado enquanto importava. Tente de novo.", status_code=409
+        )
+
+    for user_id, e in created:
+        hub.publish(user_id, {"name": (e.character_name or e.username).upper(), "version": 1})
+
+    report = provisioning.build_report(created, rejected)
+    if output == "csv":
+        return Response(
+            provisioning.report_csv(report),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="jogadores-criados.csv"'},
+        )
+
+    return _render_dashboard(
+        request,
+        db,
+        me,
+        success=f"{len(created)} jogador(es) criado(s), {len(rejected)} linha(s) com erro.",
+        report=report,
+    )
 
 
 # =========================
@@ -123,22 +297,16 @@ def delete_player(user_id: int, request: Request, db: Session = Depends(get_db))
         return RedirectResponse(url="/master", status_code=303)
 
     if (user.role or "").lower() != "player":
-        players = db.query(User).filter(User.role == "player").order_by(User.id.asc()).all()
-        return templates.TemplateResponse(
-            "master_dashboard.html",
-            {
-                "request": request,
-                "me": me,
-                "players": players,
-                "error": "Apenas usuários com role=player podem ser excluídos.",
-                "success": None,
-            },
-            status_code=400,
+        return _render_dashboard(
+            request, db, me, error="Apenas usuários com role=player podem ser excluídos.", status_code=400
         )
 
+    invalidate_user_sessions(user)
+    inventory.delete_character_lists(db, db.scalars(select(Character.id).where(Character.user_id == user.id)).all())
     db.query(Character).filter(Character.user_id == user.id).delete()
     db.delete(user)
     db.commit()
+    hub.publish(user_id, None)
 
     return RedirectResponse(url="/master", status_code=303)
 
@@ -147,30 +315,34 @@ def delete_player(user_id: int, request: Request, db: Session = Depends(get_db))
 # Reset de senha do jogador
 # =========================
 @router.post("/master/reset-password/{user_id}")
-def reset_player_password(user_id: int, request: Request, db: Session = Depends(get_db)):
-    me = _require_master(request, db)
+async def reset_player_password(user_id: int, request: Request, db: Session = Depends(get_db)):
+    # async pelo mesmo motivo do create_player
+    me = await run_in_threadpool(_require_master, request, db)
     if not me:
         return RedirectResponse(url="/login", status_code=303)
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await run_in_threadpool(lambda: db.query(User).filter(User.id == user_id).first())
     if not user or (user.role or "").lower() != "player":
         return RedirectResponse(url="/master", status_code=303)
 
-    temp_password = _generate_temp_password()
+    temp_password = provisioning.generate_temp_password()
 
-    user.password_hash = hash_password(temp_password)
-    user.force_password_change = True
-    db.commit()
+    try:
+        password_hash = await kdf.hash_password(temp_password)
+    except KdfBusy:
+        return await run_in_threadpool(_kdf_busy, request, db, me)
 
-    players = db.query(User).filter(User.role == "player").order_by(User.id.asc()).all()
+    username = user.username
+    await run_in_threadpool(_reset_password, db, user, password_hash)
 
-    return templates.TemplateResponse(
-        "master_dashboard.html",
-        {
-            "request": request,
-            "me": me,
-            "players": players,
-            "error": None,
-            "success": f"Senha de {user.username} resetada. Nova senha temporária: {temp_password}",
-        },
+    return await run_in_threadpool(
+        _render_dashboard, request, db, me, success=f"Senha de {username} resetada. Nova senha temporária: {temp_password}"
     )
+
+
+def _reset_password(db: Session, user: User, password_hash: str) -> None:
+    user.password_hash = password_hash
+    user.force_password_change = True
+    # senha antiga deixa de valer também para quem já estava logado
+    invalidate_user_sessions(user)
+    db.commit()
@@ -1,33 +1,31 @@
-from fastapi import APIRouter, Depends, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Body, Depends, Request, Form
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
-from ..db import get_db
+from ..db import get_db, get_async_db
 from ..models import User, Character
-from ..auth import read_session
+from ..auth import SessionUser, read_session_user, read_session_user_async
+from ..live import hub
+from ..replica import get_read_db
+from .. import inventory, search
+from ..templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
-def _get_logged_user(request: Request, db: Session) -> User | None:
-    user_id = read_session(request)
-    if not user_id:
-        return None
-    return db.query(User).filter(User.id == user_id).first()
-
-
-def _require_master(request: Request, db: Session) -> User | None:
-    me = _get_logged_user(request, db)
+def _require_master(request: Request, db: Session) -> SessionUser | None:
+    me = read_session_user(request, db)
     if not me:
         return None
-    if (me.role or "").lower() != "master":
+    if me.role != "master":
         return None
     return me
 
 
-def _get_or_create_character(db: Session, user: User) -> Character:
+def _get_or_create_character(db: Session, user: User | SessionUser) -> Character:
     c = db.query(Character).filter(Character.user_id == user.id).first()
     if not c:
         c = Character(user_id=user.id, name=(user.username or "").upper())
@@ -37,47 +35,294 @@ def _get_or_create_character(db: Session, user: User) -> Character:
     return c
 
 
+def _character_for_view(db: Session, user: User | SessionUser) -> Character:
+    """
+    Ficha para exibir em GET, sem escrever: se ainda não existe, devolve uma
+    em branco (transiente, com os defaults das colunas). Ela é gravada no
+    primeiro save (POST do form ou PATCH).
+    """
+    c = inventory.load_character_with_lists(db, user.id)
+    if c is None:
+        defaults = {
+            col.key: col.default.arg
+            for col in Character.__table__.columns
+            if col.default is not None and not callable(col.default.arg)
+        }
+        c = Character(**defaults)
+        c.user_id = user.id
+        c.name = (user.username or "").upper()
+    return c
+
+
 def _clamp(v: int, lo: int, hi: int) -> int:
     return max(lo, min(hi, v))
 
 
-def _apply_character_form(c: Character, form: dict) -> None:
-    # Campos texto
-    name = (form.get("name") or "").strip()
-    age = (form.get("age") or "").strip()
-    occupation = (form.get("occupation") or "").strip()
-    level = (form.get("level") or "").strip()
-    affiliation = (form.get("affiliation") or "").strip()
-    personality = (form.get("personality") or "hero").strip()
-
-    if name:
-        c.name = name
-    c.age = age
-    c.occupation = occupation
-    if level:
-        c.level = level
-    c.affiliation = affiliation
-    c.personality = personality if personality in ("hero", "antihero", "villain") else "hero"
-
-    # Atributos numéricos
-    c.heroism = _clamp(int(form.get("heroism", 50)), 1, 100)
-    c.agility = _clamp(int(form.get("agility", 50)), 1, 100)
-    c.intellect = _clamp(int(form.get("intellect", 50)), 1, 100)
-    c.strength = _clamp(int(form.get("strength", 50)), 1, 100)
-    c.willpower = _clamp(int(form.get("willpower", 50)), 1, 100)
-    c.vigor = _clamp(int(form.get("vigor", 50)), 1, 100)
-
-    c.hp = _clamp(int(form.get("hp", 25)), 0, 999)
-    c.hero_points = _clamp(int(form.get("hero_points", 5)), 0, 999)
-
-    c.notes = form.get("notes", "") or ""
-    c.inventory_text = form.get("inventory_text", "") or ""
-    c.skills_text = form.get("skills_text", "") or ""
+# Normalização por campo da ficha: usada pelo form completo (POST) e pelo
+# PATCH JSON. Cada função devolve o valor a gravar, None para "manter o atual"
+# ou levanta ValueError/TypeError se o valor for inválido.
+PERSONALITIES = ("hero", "antihero", "villain")
+
+
+def _keep_if_empty(value) -> str | None:
+    # nome/level vazios mantêm o valor atual
+    return str(value or "").strip() or None
+
+
+def _text(value) -> str:
+    return str(value or "").strip()
+
+
+def _long_text(value) -> str:
+    return "" if value is None else str(value)
+
+
+def _personality(value) -> str:
+    value = str(value or "hero").strip()
+    return value if value in PERSONALITIES else "hero"
+
+
+def _int_between(lo: int, hi: int):
+    def normalize(value) -> int:
+        if isinstance(value, str):
+            value = value.strip()
+        return _clamp(int(value), lo, hi)
+    return normalize
+
+
+CHARACTER_FIELDS = {
+    "name": _keep_if_empty,
+    "age": _text,
+    "occupation": _text,
+    "level": _keep_if_empty,
+    "affiliation": _text,
+    "personality": _personality,
+
+    "heroism": _int_between(1, 100),
+    "agility": _int_between(1, 100),
+    "intellect": _int_between(1, 100),
+    "strength": _int_between(1, 100),
+    "willpower": _int_between(1, 100),
+    "vigor": _int_between(1, 100),
+
+    "hp": _int_between(0, 999),
+    "hero_points": _int_between(0, 999),
+
+    "notes": _long_text,
+}
+
+
+class FieldError(ValueError):
+    def __init__(self, field: str, message: str):
+        super().__init__(f"{field}: {message}")
+        self.field = field
+        self.message = message
+
+
+def _normalize_fields(data: dict) -> dict:
+    """
+    Valida/normaliza só os campos enviados. Campos que normalizam para None
+    (ex: nome vazio) ficam de fora.
+    """
+    values = {}
+    for field, raw in data.items():
+        normalize = CHARACTER_FIELDS.get(field)
+        if normalize is None:
+            raise FieldError(field, "campo desconhecido")
+        try:
+            value = normalize(raw)
+        except (TypeError, ValueError):
+            raise FieldError(field, "valor inválido")
+        if value is not None:
+            values[field] = value
+    return values
+
+
+def _apply_character_form(c: Character, form: dict) -> dict:
+    values = _normalize_fields(form)
+    for field, value in values.items():
+        setattr(c, field, value)
+    return values
+
+
+# tentativas de UPDATE quando outra escrita passa entre o SELECT e o UPDATE
+MAX_PATCH_ATTEMPTS = 3
+
+
+class VersionConflict(Exception):
+    """
+    A ficha mudou desde a versão do cliente e algum campo enviado também foi
+    alterado por outra pessoa: 409 com o estado atual.
+    """
+    def __init__(self, fields: list[str], state: dict):
+        super().__init__(", ".join(fields))
+        self.fields = fields
+        self.state = state
+
+
+async def _character_state(db: AsyncSession, character_id: int) -> dict:
+    row = (await db.execute(
+        select(Character.version, *[getattr(Character, field) for field in CHARACTER_FIELDS])
+        .where(Character.id == character_id)
+    )).one()
+    return dict(row._mapping)
+
+
+def _unchanged_since_base(field: str, current, base: dict) -> bool:
+    """
+    O valor no servidor ainda é o que o cliente viu (base)? Então a edição do
+    cliente não pisa em ninguém, mesmo com a versão da linha já adiante.
+    """
+    if field not in base:
+        return False
+    try:
+        return CHARACTER_FIELDS[field](base[field]) == current
+    except (TypeError, ValueError):
+        return False
+
+
+async def _patch_character(
+    db: AsyncSession,
+    user: User | SessionUser,
+    changes: dict,
+    *,
+    version: int | None = None,
+    base: dict | None = None,
+) -> dict:
+    """
+    Aplica um PATCH parcial: carrega só as colunas enviadas e faz UPDATE só
+    das que mudaram (um HP -1 não regrava notes/inventário/habilidades).
+
+    Concorrência: UPDATE ... WHERE version = <lida> (compare-and-swap). Se a
+    ficha já está numa versão mais nova que a do cliente, faz merge por campo:
+    aceita se nenhum campo enviado foi alterado por outra pessoa desde "base",
+    senão VersionConflict. Sem "version" (cliente antigo) o último vence.
+    """
+    values = _normalize_fields(changes)
+    base = base or {}
+    columns = [getattr(Character, field) for field in values]
+
+    for _ in range(MAX_PATCH_ATTEMPTS):
+        row = (await db.execute(
+            select(Character.id, Character.version, *columns).where(Character.user_id == user.id)
+        )).first()
+
+        if row is None:
+            c = Character(user_id=user.id, name=(user.username or "").upper())
+            for field, value in values.items():
+                setattr(c, field, value)
+            db.add(c)
+            await db.commit()
+            hub.publish(user.id, {**values, "version": c.version})
+            return {"fields": values, "saved": sorted(values), "version": c.version}
+
+        merged = version is not None and row.version != version
+        if merged:
+            conflicts = [
+                field for field, value in values.items()
+                if getattr(row, field) != value and not _unchanged_since_base(field, getattr(row, field), base)
+            ]
+            if conflicts:
+                raise VersionConflict(conflicts, await _character_state(db, row.id))
+
+        dirty = {field: value for field, value in values.items() if getattr(row, field) != value}
+        if not dirty:
+            body = {"fields": values, "saved": [], "version": row.version}
+        else:
+            result = await db.execute(
+                update(Character)
+                .where(Character.id == row.id, Character.version == row.version)
+                .values(**dirty, version=row.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                # outra escrita entre o SELECT e o UPDATE: relê e tenta de novo
+                await db.rollback()
+                continue
+            if dirty.keys() & set(search.CHARACTER_TEXT_FIELDS):
+                # UPDATE do Core não passa pelo listener do ORM (app/search.py)
+                await db.run_sync(search.reindex_characters, [row.id])
+            await db.commit()
+            hub.publish(user.id, {**dirty, "version": row.version + 1})
+            body = {"fields": values, "saved": sorted(dirty), "version": row.version + 1}
+
+        if merged:
+            # o cliente estava atrás: manda o estado completo para ele se atualizar
+            body["character"] = await _character_state(db, row.id)
+        return body
+
+    raise VersionConflict([], await _character_state(db, row.id))
+
+
+async def _patch_response(db: AsyncSession, user: User | SessionUser, data: dict) -> JSONResponse:
+    """
+    Corpo: {"version": 3, "changes": {"hp": 17}, "base": {"hp": 18}}
+    ("base" = valor que o cliente tinha antes de editar cada campo).
+    """
+    changes = data.get("changes")
+    version = data.get("version")
+    base = data.get("base") or {}
+    if (
+        not isinstance(changes, dict)
+        or not isinstance(base, dict)
+        or (version is not None and (not isinstance(version, int) or isinstance(version, bool)))
+    ):
+        return JSONResponse({"detail": "Esperado {version, changes, base}"}, status_code=422)
+
+    try:
+        return JSONResponse(await _patch_character(db, user, changes, version=version, base=base))
+    except FieldError as e:
+        return JSONResponse({"detail": e.message, "field": e.field}, status_code=422)
+    except VersionConflict as e:
+        return JSONResponse(
+            {
+                "detail": "A ficha foi alterada por outra pessoa",
+                "conflicts": e.fields,
+                "version": e.state["version"],
+                "character": e.state,
+            },
+            status_code=409,
+        )
+
+
+def _save_character_form(db: Session, c: Character, form: dict, version: int | None) -> bool:
+    """
+    POST do form completo. False se a ficha mudou desde que o form foi
+    renderizado (versão diferente ou UPDATE sem linha afetada).
+    """
+    if version is not None and version != c.version:
+        return False
+    values = _apply_character_form(c, form)
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        return False
+    hub.publish(c.user_id, {**values, "version": c.version})
+    return True
+
+
+def _error_sheet(request: Request, db: Session, user, show_back: bool, error: str, status_code: int):
+    db.expire_all()
+    c = _get_or_create_character(db, user)
+    return templates.TemplateResponse(
+        "player_sheet.html",
+        {"request": request, "user": user, "c": c, "error": error, "show_back": show_back},
+        status_code=status_code,
+    )
+
+
+def _conflict_sheet(request: Request, db: Session, user, show_back: bool):
+    return _error_sheet(
+        request, db, user, show_back,
+        "A ficha foi alterada por outra pessoa enquanto você editava. Confira os valores atuais e salve de novo.",
+        409,
+    )
 
 
 @router.get("/player", response_class=HTMLResponse)
-def player_sheet(request: Request, db: Session = Depends(get_db)):
-    me = _get_logged_user(request, db)
+def player_sheet(request: Request, db: Session = Depends(get_read_db)):
+    me = read_session_user(request, db)
     if not me:
         return RedirectResponse(url="/login", status_code=303)
 
@@ -85,7 +330,7 @@ def player_sheet(request: Request, db: Session = Depends(get_db)):
     if (me.role or "").lower() == "master":
         return RedirectResponse(url="/master", status_code=303)
 
-    c = _get_or_create_character(db, me)
+    c = _character_for_view(db, me)
 
     return templates.TemplateResponse(
         "player_sheet.html",
@@ -116,10 +361,10 @@ def player_update(
     hero_points: int = Form(5),
 
     notes: str = Form(""),
-    inventory_text: str = Form(""),
-    skills_text: str = Form(""),
+
+    version: int | None = Form(None),
 ):
-    me = _get_logged_user(request, db)
+    me = read_session_user(request, db)
     if not me:
         return RedirectResponse(url="/login", status_code=303)
 
@@ -129,7 +374,8 @@ def player_update(
 
     c = _get_or_create_character(db, me)
 
-    _apply_character_form(
+    saved = _save_character_form(
+        db,
         c,
         {
             "name": name,
@@ -147,18 +393,18 @@ def player_update(
             "hp": hp,
             "hero_points": hero_points,
             "notes": notes,
-            "inventory_text": inventory_text,
-            "skills_text": skills_text,
         },
+        version,
     )
+    if not saved:
+        return _conflict_sheet(request, db, me, show_back=False)
 
-    db.commit()
     return RedirectResponse(url="/player", status_code=303)
 
 
 # Mestre visualizar ficha de um jogador específico
 @router.get("/player/{user_id}", response_class=HTMLResponse)
-def player_sheet_for_master(user_id: int, request: Request, db: Session = Depends(get_db)):
+def player_sheet_for_master(user_id: int, request: Request, db: Session = Depends(get_read_db)):
     me = _require_master(request, db)
     if not me:
         return RedirectResponse(url="/login", status_code=303)
@@ -167,7 +413,7 @@ def player_sheet_for_master(user_id: int, request: Request, db: Session = Depend
     if not user or (user.role or "").lower() != "player":
         return RedirectResponse(url="/master", status_code=303)
 
-    c = _get_or_create_character(db, user)
+    c = _character_for_view(db, user)
 
     return templates.TemplateResponse(
         "player_sheet.html",
@@ -200,8 +446,8 @@ def player_update_for_master(
     hero_points: int = Form(5),
 
     notes: str = Form(""),
-    inventory_text: str = Form(""),
-    skills_text: str = Form(""),
+
+    version: int | None = Form(None),
 ):
     me = _require_master(request, db)
     if not me:
@@ -213,7 +459,8 @@ def player_update_for_master(
 
     c = _get_or_create_character(db, user)
 
-    _apply_character_form(
+    saved = _save_character_form(
+        db,
         c,
         {
             "name": name,
@@ -231,79 +478,157 @@ def player_update_for_master(
             "hp": hp,
             "hero_points": hero_points,
             "notes": notes,
-            "inventory_text": inventory_text,
-            "skills_text": skills_text,
         },
+        version,
     )
+    if not saved:
+        return _conflict_sheet(request, db, user, show_back=True)
 
-    db.commit()
     return RedirectResponse(url=f"/player/{user_id}", status_code=303)
-@router.post("/player/{user_id}/update")
-def player_update_for_master(
-    user_id: int,
-    request: Request,
-    db: Session = Depends(get_db),
 
-    name: str = Form(""),
-    age: str = Form(""),
-    occupation: str = Form(""),
-    level: str = Form(""),
-    affiliation: str = Form(""),
-    personality: str = Form("hero"),
 
-    heroism: int = Form(50),
-    agility: int = Form(50),
-    intellect: int = Form(50),
-    strength: int = Form(50),
-    willpower: int = Form(50),
-    vigor: int = Form(50),
+# PATCH parcial da ficha (autosave do player_sheet.html): corpo JSON só com os
+# campos alterados, ex: {"hp": 17}. Responde os valores normalizados.
+# async + AsyncSession: o caminho mais frequente em combate não ocupa uma
+# thread do threadpool enquanto espera o banco.
+@router.patch("/api/player/character")
+async def patch_my_character(request: Request, data: dict = Body(...), db: AsyncSession = Depends(get_async_db)):
+    me = await read_session_user_async(request, db)
+    if not me:
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+    if (me.role or "").lower() == "master":
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
 
-    hp: int = Form(25),
-    hero_points: int = Form(5),
+    return await _patch_response(db, me, data)
 
-    notes: str = Form(""),
-    inventory_text: str = Form(""),
-    skills_text: str = Form(""),
+
+@router.patch("/api/player/{user_id}/character")
+async def patch_character_for_master(
+    user_id: int, request: Request, data: dict = Body(...), db: AsyncSession = Depends(get_async_db)
 ):
-    me = _get_logged_user(request, db)
+    me = await read_session_user_async(request, db)
     if not me:
-        return RedirectResponse(url="/login", status_code=303)
-    if (me.role or "").lower() != "master":
-        return RedirectResponse(url="/player", status_code=303)
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+    if me.role != "master":
+        return JSONResponse({"detail": "Forbidden"}, status_code=403)
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        return RedirectResponse(url="/master", status_code=303)
+    user = (await db.execute(select(User.id, User.username, User.role).where(User.id == user_id))).first()
+    if not user or (user.role or "").lower() != "player":
+        return JSONResponse({"detail": "Not found"}, status_code=404)
 
-    c = db.query(Character).filter(Character.user_id == user.id).first()
-    if not c:
-        c = Character(user_id=user.id, name=user.username.upper())
-        db.add(c)
-        db.flush()
+    return await _patch_response(db, user, data)
+
+
+# =========================
+# Inventário e habilidades (linhas próprias; ver app/inventory.py)
+# =========================
+# O próprio jogador ou o mestre. Cada operação grava/apaga uma linha só: a
+# ficha (e a versão dela) não é regravada.
+def _sheet_owner(request: Request, db: Session, user_id: int):
+    """
+    (quem pediu, dono da ficha) ou None se não pode mexer nessa ficha.
+    """
+    me = read_session_user(request, db)
+    if not me:
+        return None
+    if me.role == "master":
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user or (user.role or "").lower() != "player":
+            return None
+        return me, user
+    if me.id == user_id:
+        return me, me
+    return None
 
-    def clamp(v, lo, hi):
-        return max(lo, min(hi, v))
 
-    c.name = name.strip() or c.name
-    c.age = age.strip()
-    c.occupation = occupation.strip()
-    c.level = level.strip() or c.level
-    c.affiliation = affiliation.strip()
-    c.personality = personality if personality in ("hero", "antihero", "villain") else "hero"
+def _sheet_url(me, user) -> str:
+    return "/player" if me.id == user.id else f"/player/{user.id}"
 
-    c.heroism = clamp(int(heroism), 1, 100)
-    c.agility = clamp(int(agility), 1, 100)
-    c.intellect = clamp(int(intellect), 1, 100)
-    c.strength = clamp(int(strength), 1, 100)
-    c.willpower = clamp(int(willpower), 1, 100)
-    c.vigor = clamp(int(vigor), 1, 100)
 
-    c.hp = clamp(int(hp), 0, 999)
-    c.hero_points = clamp(int(hero_points), 0, 999)
+def _publish_list(db: Session, user_id: int, character_id: int, name: str) -> None:
+    # a ficha aberta (jogador ou mestre) refaz a lista; a versão não muda.
+    # Sem ninguém ouvindo neste worker, nem consulta a lista.
+    if hub.subscribers:
+        state = inventory.items_state if name == "items" else inventory.skills_state
+        hub.publish(user_id, {name: state(db, character_id)})
 
-    c.notes = notes
-    c.inventory_text = inventory_text
-    c.skills_text = skills_text
 
+@router.post("/player/{user_id}/items")
+def add_character_item(
+    user_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    name: str = Form(""),
+    quantity: str = Form(""),
+):
+    owner = _sheet_owner(request, db, user_id)
+    if not owner:
+        return RedirectResponse(url="/login", status_code=303)
+    me, user = owner
+
+    c = _get_or_create_character(db, user)
+    try:
+        # vazio = 1; texto vira erro na própria ficha, não um 422 em JSON
+        try:
+            amount = int(quantity.strip() or 1)
+        except ValueError:
+            raise inventory.InventoryError("Quantidade deve ser um número inteiro.")
+        inventory.add_item(db, c, name, amount)
+    except inventory.InventoryError as e:
+        return _error_sheet(request, db, user, me.id != user.id, str(e), 400)
+    character_id = c.id  # antes do commit (depois dele, ler c.id é mais uma query)
     db.commit()
-    return RedirectResponse(url=f"/player/{user_id}", status_code=303)
+    _publish_list(db, user_id, character_id, "items")
+    return RedirectResponse(url=_sheet_url(me, user), status_code=303)
+
+
+@router.post("/player/{user_id}/items/{item_id}/delete")
+def remove_character_item(user_id: int, item_id: int, request: Request, db: Session = Depends(get_db)):
+    owner = _sheet_owner(request, db, user_id)
+    if not owner:
+        return RedirectResponse(url="/login", status_code=303)
+    me, user = owner
+
+    character_id = db.query(Character.id).filter(Character.user_id == user.id).scalar()
+    if character_id is not None and inventory.remove_item(db, character_id, item_id):
+        db.commit()
+        _publish_list(db, user_id, character_id, "items")
+    return RedirectResponse(url=_sheet_url(me, user), status_code=303)
+
+
+@router.post("/player/{user_id}/skills")
+def add_character_skill(
+    user_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    name: str = Form(""),
+    description: str = Form(""),
+):
+    owner = _sheet_owner(request, db, user_id)
+    if not owner:
+        return RedirectResponse(url="/login", status_code=303)
+    me, user = owner
+
+    c = _get_or_create_character(db, user)
+    try:
+        inventory.add_skill(db, c, name, description)
+    except inventory.InventoryError as e:
+        return _error_sheet(request, db, user, me.id != user.id, str(e), 400)
+    character_id = c.id  # antes do commit (depois dele, ler c.id é mais uma query)
+    db.commit()
+    _publish_list(db, user_id, character_id, "skills")
+    return RedirectResponse(url=_sheet_url(me, user), status_code=303)
+
+
+@router.post("/player/{user_id}/skills/{skill_id}/delete")
+def remove_character_skill(user_id: int, skill_id: int, request: Request, db: Session = Depends(get_db)):
+    owner = _sheet_owner(request, db, user_id)
+    if not owner:
+        return RedirectResponse(url="/login", status_code=303)
+    me, user = owner
+
+    character_id = db.query(Character.id).filter(Character.user_id == user.id).scalar()
+    if character_id is not None and inventory.remove_skill(db, character_id, skill_id):
+        db.commit()
+        _publish_list(db, user_id, character_id, "skills")
+    return RedirectResponse(url=_sheet_url(me, user), status_code=303)
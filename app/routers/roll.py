@@ -0,0 +1,185 @@
+from fastapi import APIRouter, Body, Depends, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+import numpy as np
+
+from ..replica import get_read_db
+from ..auth import SessionUser, read_session_user
+from ..party import ATTRIBUTES, load_party
+from .. import dice
+
+router = APIRouter()
+
+# itens por lista (rolls / checks) num pedido
+MAX_BATCH_ITEMS = 50
+
+
+def _int(value, field: str, lo: int, hi: int, default: int | None = None) -> int:
+    if value is None and default is not None:
+        return default
+    if isinstance(value, bool):
+        raise dice.DiceError(f"{field}: valor inválido.")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise dice.DiceError(f"{field}: valor inválido.")
+    if not lo <= value <= hi:
+        raise dice.DiceError(f"{field}: de {lo} a {hi}.")
+    return value
+
+
+def _list(data: dict, key: str) -> list:
+    items = data.get(key) or []
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise dice.DiceError(f"{key}: lista de objetos.")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise dice.DiceError(f"{key}: no máximo {MAX_BATCH_ITEMS} itens.")
+    return items
+
+
+def _parse_rolls(data: dict) -> list[tuple[dice.DiceExpr, int]]:
+    rolls = []
+    for item in _list(data, "rolls"):
+        expr = dice.parse(str(item.get("expr") or ""))
+        rolls.append((expr, _int(item.get("times"), "times", 1, dice.MAX_TIMES, default=1)))
+    if sum(dice.dice_count(expr, times) for expr, times in rolls) > dice.MAX_DICE_PER_BATCH:
+        raise dice.DiceError(f"No máximo {dice.MAX_DICE_PER_BATCH} dados por pedido.")
+    return rolls
+
+
+def _parse_checks(data: dict, me: SessionUser) -> list[tuple[str, int, list | None]]:
+    checks = []
+    for item in _list(data, "checks"):
+        attribute = str(item.get("attribute") or "")
+        if attribute not in ATTRIBUTES:
+            raise dice.DiceError(f"attribute: um de {', '.join(ATTRIBUTES)}.")
+        modifier = _int(item.get("modifier"), "modifier", -100, 100, default=0)
+        if me.role == "master":
+            # sem user_ids = grupo inteiro
+            user_ids = item.get("user_ids")
+            if user_ids is not None:
+                if not isinstance(user_ids, list):
+                    raise dice.DiceError("user_ids: lista de ids.")
+                user_ids = [_int(i, "user_ids", 1, 2**31) for i in user_ids]
+        else:
+            # jogador testa só a própria ficha
+            user_ids = [me.id]
+        checks.append((attribute, modifier, user_ids))
+    return checks
+
+
+def _resolve_checks(db: Session, checks, rng) -> list[dict]:
+    """
+    Todos os testes do pedido com UM d100 vetorizado: alvos de todos os
+    grupos concatenados, rolados juntos e separados de volta.
+    """
+    if not checks:
+        return []
+
+    # uma query para o grupo inteiro, recortada por teste
+    wanted = None
+    if all(user_ids is not None for _, _, user_ids in checks):
+        wanted = {i for _, _, user_ids in checks for i in user_ids}
+    members = [m for m in load_party(db, wanted) if m.hp is not None]  # sem ficha não testa
+    by_id = {m.id: m for m in members}
+
+    groups = []
+    for attribute, modifier, user_ids in checks:
+        group = members if user_ids is None else [by_id[i] for i in dict.fromkeys(user_ids) if i in by_id]
+        groups.append((attribute, modifier, group))
+
+    targets = np.concatenate([
+        dice.check_targets([getattr(m, attribute) for m in group], modifier)
+        for attribute, modifier, group in groups
+    ])
+    rolls, outcomes = dice.resolve_checks(targets, rng)
+
+    results, start = [], 0
+    for attribute, modifier, group in groups:
+        end = start + len(group)
+        codes = outcomes[start:end]
+        counts = np.bincount(codes, minlength=len(dice.OUTCOMES))
+        results.append({
+            "attribute": attribute,
+            "modifier": modifier,
+            "results": [
+                {
+                    "user_id": m.id,
+                    "username": m.username,
+                    "name": m.name,
+                    "target": int(target),
+                    "roll": int(roll),
+                    "outcome": dice.OUTCOMES[code],
+                }
+                for m, target, roll, code in zip(group, targets[start:end], rolls[start:end], codes)
+            ],
+            "summary": {outcome: int(counts[code]) for code, outcome in enumerate(dice.OUTCOMES)},
+        })
+        start = end
+    return results
+
+
+# Rolagens e testes em lote. Corpo:
+#   {"seed": 123,                                        (opcional)
+#    "rolls":  [{"expr": "2d6+1", "times": 10}],
+#    "checks": [{"attribute": "agility", "modifier": -10, "user_ids": [2, 3]}]}
+# Mestre: user_ids opcional (sem = grupo todo). Jogador: sempre a própria ficha.
+# A mesma seed com o mesmo corpo devolve os mesmos resultados.
+@router.post("/api/roll")
+def roll_batch(request: Request, data: dict = Body(...), db: Session = Depends(get_read_db)):
+    me = read_session_user(request, db)
+    if not me:
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+
+    try:
+        seed = data.get("seed")
+        if seed is not None:
+            seed = _int(seed, "seed", 0, 2**63 - 1)
+        rolls = _parse_rolls(data)
+        checks = _parse_checks(data, me)
+        if not rolls and not checks:
+            raise dice.DiceError("Envie rolls e/ou checks.")
+    except dice.DiceError as e:
+        return JSONResponse({"detail": str(e)}, status_code=422)
+
+    rng, seed = dice.make_rng(seed)
+    # ordem fixa de consumo do gerador (testes, depois rolagens): reprodutível
+    check_results = _resolve_checks(db, checks, rng)
+    roll_results = [
+        {"expr": expr.text, "results": dice.roll(expr, rng, times).tolist()}
+        for expr, times in rolls
+    ]
+    return JSONResponse({"seed": seed, "rolls": roll_results, "checks": check_results})
+
+
+# Chances exatas (em cache): /api/roll/odds?expr=2d6&target=8 ou ?check=55
+@router.get("/api/roll/odds")
+def roll_odds(request: Request, expr: str = "", target: int | None = None, check: int | None = None,
+              db: Session = Depends(get_read_db)):
+    me = read_session_user(request, db)
+    if not me:
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+
+    if check is not None:
+        target = int(dice.check_targets([check])[0])
+        return JSONResponse({"check": target, "odds": dice.check_odds(target)})
+
+    try:
+        dist = dice.distribution(expr)
+    except dice.DiceError as e:
+        return JSONResponse({"detail": str(e)}, status_code=422)
+
+    body = {
+        "expr": dist.expr,
+        "min": dist.minimum,
+        "max": dist.minimum + len(dist.pmf) - 1,
+        "mean": round(dist.mean, 4),
+        "stdev": round(dist.stdev, 4),
+        "pmf": dist.pmf.tolist(),
+        "at_least": dist.at_least.tolist(),
+    }
+    if target is not None:
+        body["target"] = target
+        body["chance_at_least"] = dice.chance_at_least(dist, target)
+    return JSONResponse(body)
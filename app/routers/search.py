@@ -0,0 +1,65 @@
+import time
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from sqlalchemy.orm import Session
+
+from ..replica import get_read_db
+from ..auth import SessionUser, read_session_user
+from ..assets import static_url
+from .. import search
+from ..templating import templates
+
+router = APIRouter()
+
+SEARCH_LIMIT = 20
+
+
+def _allowed_kinds(me: SessionUser) -> tuple[str, ...]:
+    # fichas (anotações dos jogadores) só para o mestre
+    return search.KINDS if me.role == "master" else ("card",)
+
+
+def _run_search(request: Request, db: Session, me: SessionUser) -> dict:
+    q = (request.query_params.get("q") or "").strip()
+    kind = (request.query_params.get("kind") or "").strip().lower()
+    allowed = _allowed_kinds(me)
+    kinds = (kind,) if kind in allowed else allowed
+    try:
+        limit = int(request.query_params.get("limit") or SEARCH_LIMIT)
+    except ValueError:
+        limit = SEARCH_LIMIT
+
+    started = time.perf_counter()
+    results = search.hydrate(db, search.search(db, q, kinds=kinds, limit=limit)) if q else []
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for item in results:
+        if item["kind"] == "card":
+            item["image"] = static_url(item.pop("image_path"))
+            item["thumb"] = static_url(item.pop("thumb_path"))
+
+    return {"q": q, "kind": kind if kind in allowed else "", "results": results,
+            "took_ms": round(elapsed_ms, 2)}
+
+
+# Busca por prefixo, sem acento, com ranking (ver app/search.py).
+# Parâmetros: q, kind (card|character), limit.
+@router.get("/api/search")
+def search_api(request: Request, db: Session = Depends(get_read_db)):
+    me = read_session_user(request, db)
+    if not me:
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+    return JSONResponse(_run_search(request, db, me))
+
+
+@router.get("/search", response_class=HTMLResponse)
+def search_page(request: Request, db: Session = Depends(get_read_db)):
+    me = read_session_user(request, db)
+    if not me:
+        return RedirectResponse(url="/login", status_code=303)
+
+    return templates.TemplateResponse(
+        "search.html",
+        {"request": request, "me": me, "kinds": _allowed_kinds(me), **_run_search(request, db, me)},
+    )
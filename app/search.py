@@ -0,0 +1,382 @@
+# app/search.py
+# Busca full-text em cartas e fichas (nome, anotações, itens, habilidades).
+#
+# Um índice só, "search_index", com um documento por carta/ficha:
+#   - SQLite:   tabela virtual FTS5 (ranking bm25, prefixo via prefix=)
+#   - Postgres: tabela com coluna tsvector gerada + índice GIN (ts_rank)
+# O texto é gravado já normalizado por order_key (sem acento, minúsculo), e a
+# consulta passa pela mesma função: "pocao" acha "Poção".
+#
+# Sincronização:
+#   - ORM: o listener after_flush reindexa cartas/fichas/itens/habilidades
+#     criados, alterados ou removidos pela Session
+#   - escritas em lote (insert()/update()/delete() do Core, import_cards.py)
+#     chamam reindex_characters/remove_characters/rebuild_cards explicitamente
+#
+# O id do documento é ref_id * 4 + código do tipo (rowid no FTS5, PK no
+# Postgres): reindexar uma ficha é DELETE/INSERT por chave, sem varrer o índice.
+#
+# A migração cria e popula o índice quando ele não existe e, no SQLite,
+# recria quando o DDL abaixo mudou. Para forçar: "python -m app.cli reindex".
+
+import re
+from collections import namedtuple
+
+from sqlalchemy import event, inspect, literal, select, text, union_all
+from sqlalchemy.orm import Session
+
+from .models import User, Card, Character, CharacterItem, CharacterSkill
+from .text import order_key
+
+KIND_CODES = {"card": 1, "character": 2}
+KINDS = tuple(KIND_CODES)
+
+MAX_TERMS = 8
+MAX_RESULTS = 50
+# termos de 1 letra ("a", "o", "e") casam com quase tudo: ficam de fora
+MIN_TERM_LENGTH = 2
+# fichas por lote no reindex (limite de parâmetros do SQLite)
+BATCH_SIZE = 500
+
+SQLITE_DDL = [
+    # prefix=: índice próprio para prefixos desses tamanhos. Sem ele, "espada"*
+    # junta a lista de documentos de todo termo que começa com "espada" a
+    # cada consulta (índice ~2x maior, termos comuns ~3x mais rápidos)
+    "CREATE VIRTUAL TABLE search_index USING fts5("
+    "kind UNINDEXED, ref_id UNINDEXED, title, body, "
+    "tokenize='unicode61', prefix='2 3 4 5 6 7 8')",
+    # ranking padrão da coluna "rank" (ORDER BY rank é o caminho rápido do
+    # FTS5): bm25 com peso por coluna (kind, ref_id, title, body)
+    "INSERT INTO search_index(search_index, rank) VALUES ('rank', 'bm25(0, 0, 10.0, 1.0)')",
+]
+
+POSTGRES_DDL = [
+    "CREATE TABLE search_index ("
+    "id BIGINT PRIMARY KEY, kind VARCHAR(16) NOT NULL, ref_id INTEGER NOT NULL, "
+    "title TEXT NOT NULL, body TEXT NOT NULL, "
+    "document tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')"
+    ") STORED)",
+    "CREATE INDEX ix_search_index_document ON search_index USING GIN (document)",
+]
+
+# colunas de Character que entram no documento
+CHARACTER_TEXT_FIELDS = ("name", "notes")
+
+SearchHit = namedtuple("SearchHit", ["kind", "ref_id", "rank"])
+
+
+class SearchUnavailable(RuntimeError):
+    """Banco sem suporte (nem SQLite com FTS5 nem Postgres)."""
+
+
+def _conn(db):
+    # Session (sync ou o sync_session do AsyncSession) ou Connection
+    return db.connection() if isinstance(db, Session) else db
+
+
+def _id_column(dialect: str) -> str:
+    if dialect == "sqlite":
+        return "rowid"
+    if dialect == "postgresql":
+        return "id"
+    raise SearchUnavailable(dialect)
+
+
+def doc_id(kind: str, ref_id: int) -> int:
+    return ref_id * 4 + KIND_CODES[kind]
+
+
+def normalize(value: str | None) -> str:
+    return order_key(value or "")
+
+
+def query_terms(q: str) -> list[str]:
+    terms = [t for t in re.findall(r"\w+", normalize(q)) if len(t) >= MIN_TERM_LENGTH]
+    return terms[:MAX_TERMS]
+
+
+# =========================
+# Escrita
+# =========================
+def _write_docs(conn, kind: str, docs: dict[int, tuple[str, str]], removed=(), replace: bool = True) -> None:
+    """
+    docs: ref_id -> (título, corpo). removed: ref_ids a apagar sem reinserir.
+    replace=False: o chamador já limpou o índice (rebuild).
+    """
+    id_col = _id_column(conn.dialect.name)
+    ids = [doc_id(kind, ref_id) for ref_id in [*docs, *removed]] if replace else []
+    if ids:
+        conn.execute(
+            text(f"DELETE FROM search_index WHERE {id_col} IN ({', '.join(str(i) for i in ids)})")
+        )
+    if docs:
+        conn.execute(
+            text(f"INSERT INTO search_index ({id_col}, kind, ref_id, title, body) "
+                 "VALUES (:id, :kind, :ref_id, :title, :body)"),
+            [
+                {"id": doc_id(kind, ref_id), "kind": kind, "ref_id": ref_id,
+                 "title": normalize(title), "body": normalize(body)}
+                for ref_id, (title, body) in docs.items()
+            ],
+        )
+
+
+def reindex_characters(db, character_ids, *, replace: bool = True) -> None:
+    """
+    Regrava os documentos das fichas (1 SELECT + DELETE + INSERT por lote de
+    BATCH_SIZE). Fichas que não existem mais saem do índice.
+    """
+    ids = sorted(set(character_ids))
+    conn = _conn(db)
+    for start in range(0, len(ids), BATCH_SIZE):
+        _reindex_character_batch(conn, ids[start:start + BATCH_SIZE], replace)
+
+
+def _reindex_character_batch(conn, ids: list[int], replace: bool) -> None:
+    # ficha, itens e habilidades numa query só
+    rows = conn.execute(union_all(
+        select(Character.id, literal("c"), Character.name, Character.notes)
+        .where(Character.id.in_(ids)),
+        select(CharacterItem.character_id, literal("i"), CharacterItem.name, literal(""))
+        .where(CharacterItem.character_id.in_(ids)),
+        select(CharacterSkill.character_id, literal("s"), CharacterSkill.name, CharacterSkill.description)
+        .where(CharacterSkill.character_id.in_(ids)),
+    ))
+
+    titles: dict[int, str] = {}
+    bodies: dict[int, list[str]] = {}
+    for character_id, source, name, extra in rows:
+        body = bodies.setdefault(character_id, [])
+        if source == "c":
+            titles[character_id] = name or ""
+            body.append(extra or "")
+        else:
+            body.extend((name or "", extra or ""))
+
+    _write_docs(
+        conn,
+        "character",
+        {ref_id: (title, "\n".join(bodies[ref_id])) for ref_id, title in titles.items()},
+        removed=[i for i in ids if i not in titles],
+        replace=replace,
+    )
+
+
+def remove_characters(db, character_ids) -> None:
+    _write_docs(_conn(db), "character", {}, removed=sorted(set(character_ids)))
+
+
+def _card_doc(card_type, rarity, class_type, name) -> tuple[str, str]:
+    return name or "", " ".join(v for v in (card_type, rarity, class_type) if v)
+
+
+def reindex_cards(db, card_ids) -> None:
+    ids = sorted(set(card_ids))
+    if not ids:
+        return
+    conn = _conn(db)
+    docs = {
+        card_id: _card_doc(card_type, rarity, class_type, name)
+        for card_id, card_type, rarity, class_type, name in conn.execute(
+            select(Card.id, Card.type, Card.rarity, Card.class_type, Card.name).where(Card.id.in_(ids))
+        )
+    }
+    _write_docs(conn, "card", docs, removed=[i for i in ids if i not in docs])
+
+
+def rebuild_cards(db) -> None:
+    """
+    Todas as cartas de novo (import_cards.py, na mesma transação do import).
+    """
+    conn = _conn(db)
+    conn.execute(text("DELETE FROM search_index WHERE kind = 'card'"))
+    docs = {
+        card_id: _card_doc(card_type, rarity, class_type, name)
+        for card_id, card_type, rarity, class_type, name in conn.execute(
+            select(Card.id, Card.type, Card.rarity, Card.class_type, Card.name)
+        )
+    }
+    _write_docs(conn, "card", docs, replace=False)
+
+
+def rebuild(db) -> None:
+    conn = _conn(db)
+    conn.execute(text("DELETE FROM search_index"))
+    rebuild_cards(conn)
+    reindex_characters(conn, conn.execute(select(Character.id)).scalars(), replace=False)
+
+
+def drop_search_index(conn) -> None:
+    conn.execute(text("DROP TABLE IF EXISTS search_index"))
+
+
+def _sqlite_ddl(conn) -> str | None:
+    return conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'search_index'")
+    ).scalar()
+
+
+def ensure_search_index(conn) -> bool:
+    """
+    Cria e popula o índice se ainda não existe (chamado pelas migrações).
+    SQLite: índice criado com outro DDL (ex: prefix= antigo) é recriado.
+    True se criou.
+    """
+    dialect = conn.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return False
+    if dialect == "sqlite" and _sqlite_ddl(conn) not in (None, SQLITE_DDL[0]):
+        drop_search_index(conn)
+    if inspect(conn).has_table("search_index"):
+        return False
+    for ddl in SQLITE_DDL if dialect == "sqlite" else POSTGRES_DDL:
+        conn.execute(text(ddl))
+    rebuild(conn)
+    return True
+
+
+# =========================
+# Sincronização pelo ORM
+# =========================
+def _text_changed(obj, fields) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_after_flush(session, flush_context):
+    characters: set[int] = set()
+    removed_characters: set[int] = set()
+    cards: set[int] = set()
+
+    for obj in session.new:
+        if isinstance(obj, Character):
+            characters.add(obj.id)
+        elif isinstance(obj, (CharacterItem, CharacterSkill)):
+            characters.add(obj.character_id)
+        elif isinstance(obj, Card):
+            cards.add(obj.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Character) and _text_changed(obj, CHARACTER_TEXT_FIELDS):
+            characters.add(obj.id)
+        elif isinstance(obj, CharacterItem) and _text_changed(obj, ("name",)):
+            characters.add(obj.character_id)
+        elif isinstance(obj, CharacterSkill) and _text_changed(obj, ("name", "description")):
+            characters.add(obj.character_id)
+        elif isinstance(obj, Card) and _text_changed(obj, ("name", "type", "rarity", "class_type")):
+            cards.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Character):
+            removed_characters.add(obj.id)
+        elif isinstance(obj, (CharacterItem, CharacterSkill)):
+            characters.add(obj.character_id)
+        elif isinstance(obj, Card):
+            cards.add(obj.id)
+
+    characters -= removed_characters
+    if not (characters or removed_characters or cards):
+        return
+    if session.get_bind().dialect.name not in ("sqlite", "postgresql"):
+        return
+
+    if removed_characters:
+        remove_characters(session, removed_characters)
+    if characters:
+        reindex_characters(session, characters)
+    if cards:
+        reindex_cards(session, cards)
+
+
+# =========================
+# Consulta
+# =========================
+def search(db, q: str, *, kinds=KINDS, limit: int = 20) -> list[SearchHit]:
+    """
+    Prefixo em todos os termos ("nec" acha "Necronomicon"), E entre termos.
+    Documentos com todos os termos no título vêm antes; dentro de cada grupo,
+    melhores primeiro. Termos de uma letra são ignorados.
+    """
+    terms = query_terms(q)
+    kinds = [k for k in kinds if k in KIND_CODES]
+    if not terms or not kinds:
+        return []
+    limit = max(1, min(MAX_RESULTS, limit))
+    conn = _conn(db)
+    params = {"limit": limit, **{f"kind{i}": kind for i, kind in enumerate(kinds)}}
+    # kind não é indexado: só filtra quando nem todos os tipos valem
+    kind_filter = ""
+    if len(kinds) < len(KINDS):
+        kind_filter = f"AND kind IN ({', '.join(f':kind{i}' for i in range(len(kinds)))}) "
+
+    if conn.dialect.name == "sqlite":
+        # rank = bm25 configurado no DDL; menor = melhor. ORDER BY rank
+        # calcula o bm25 de todo documento que casa (termo comum: dezenas de
+        # ms). Por isso primeiro só o título ({title} : ...): poucos
+        # documentos, e com peso 10 são os melhores de qualquer jeito. O corpo
+        # só é consultado quando o título não enche o limite; ali também
+        # ORDER BY rank, então nenhum resultado melhor fica de fora.
+        match = " AND ".join(f'"{t}"*' for t in terms)
+        query = text(
+            "SELECT kind, ref_id, rank FROM search_index "
+            f"WHERE search_index MATCH :match {kind_filter}"
+            "ORDER BY rank LIMIT :limit"
+        )
+        rows = conn.execute(query, {**params, "match": f"{{title}} : ({match})"}).all()
+        if len(rows) < limit:
+            seen = {(kind, ref_id) for kind, ref_id, _ in rows}
+            rest = conn.execute(query, {**params, "match": match})
+            rows += [row for row in rest if (row.kind, row.ref_id) not in seen][:limit - len(rows)]
+        return [SearchHit(kind, int(ref_id), -rank) for kind, ref_id, rank in rows]
+
+    if conn.dialect.name == "postgresql":
+        # mesma ordem do SQLite: título primeiro, depois ts_rank
+        params["query"] = " & ".join(f"{t}:*" for t in terms)
+        rows = conn.execute(text(
+            "SELECT kind, ref_id, ts_rank(document, to_tsquery('simple', :query)) AS rank "
+            "FROM search_index "
+            f"WHERE document @@ to_tsquery('simple', :query) {kind_filter}"
+            "ORDER BY ts_filter(document, '{a}') @@ to_tsquery('simple', :query) DESC, rank DESC "
+            "LIMIT :limit"
+        ), params)
+        return [SearchHit(kind, ref_id, rank) for kind, ref_id, rank in rows]
+
+    raise SearchUnavailable(conn.dialect.name)
+
+
+def hydrate(db, hits: list[SearchHit]) -> list[dict]:
+    """
+    Resultado para a resposta (no máximo 1 SELECT por tipo), na ordem do rank.
+    """
+    card_ids = [h.ref_id for h in hits if h.kind == "card"]
+    character_ids = [h.ref_id for h in hits if h.kind == "character"]
+
+    found = {}
+    if card_ids:
+        for card_id, name, card_type, rarity, class_type, image_path, thumb_path in db.execute(
+            select(Card.id, Card.name, Card.type, Card.rarity, Card.class_type, Card.image_path, Card.thumb_path)
+            .where(Card.id.in_(card_ids))
+        ):
+            found["card", card_id] = {
+                "kind": "card", "id": card_id, "name": name, "type": card_type, "rarity": rarity,
+                "class_type": class_type, "image_path": image_path, "thumb_path": thumb_path or image_path,
+            }
+    if character_ids:
+        for character_id, user_id, name, username in db.execute(
+            select(Character.id, Character.user_id, Character.name, User.username)
+            .join(User, User.id == Character.user_id)
+            .where(Character.id.in_(character_ids))
+        ):
+            found["character", character_id] = {
+                "kind": "character", "id": character_id, "user_id": user_id, "name": name,
+                "username": username, "url": f"/player/{user_id}",
+            }
+
+    results = []
+    for hit in hits:
+        item = found.get((hit.kind, hit.ref_id))
+        if item is not None:
+            results.append({**item, "rank": round(hit.rank, 4)})
+    return results
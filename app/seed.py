@@ -2,32 +2,23 @@
 import os
 import hashlib
 import hmac
-import secrets
 
 from sqlalchemy.orm import Session
 
+from .config import APP_SECRET
 from .models import User
+from .passwords import hash_password, verify_password
 
 
-# === Password hashing (simples e estável) ===
-# Formato salvo: pbkdf2_sha256$<iters>$<salt_hex>$<hash_hex>
-def hash_password(password: str, *, iterations: int = 210_000) -> str:
-    salt = secrets.token_bytes(16)
-    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
-    return f"pbkdf2_sha256${iterations}${salt.hex()}${dk.hex()}"
-
-
-def verify_password(password: str, stored: str) -> bool:
-    try:
-        algo, iters_s, salt_hex, hash_hex = stored.split("$", 3)
-        if algo != "pbkdf2_sha256":
-            return False
-        iterations = int(iters_s)
-        salt = bytes.fromhex(salt_hex)
-        dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
-        return hmac.compare_digest(dk.hex(), hash_hex)
-    except Exception:
-        return False
+def _seed_fingerprint(username: str, password_hash: str, password: str) -> str:
+    """
+    Impressão digital barata de "este hash corresponde à senha do seed".
+    HMAC com APP_SECRET: quem só tem o banco não consegue testar senhas com ela.
+    Se o hash mudar (troca de senha, rehash no login), a impressão não bate e
+    o seed volta a verificar com PBKDF2 uma única vez.
+    """
+    msg = "\0".join((username, password_hash, password)).encode("utf-8")
+    return hmac.new(APP_SECRET.encode("utf-8"), msg, hashlib.sha256).hexdigest()
 
 
 def _upsert_user(
@@ -45,11 +36,13 @@ def _upsert_user(
     u = db.query(User).filter(User.username == username).first()
 
     if u is None:
+        password_hash = hash_password(password)
         u = User(
             username=username,
-            password_hash=hash_password(password),
+            password_hash=password_hash,
             role=role,
             force_password_change=force_password_change,
+            seed_fingerprint=_seed_fingerprint(username, password_hash, password),
         )
         db.add(u)
         return
@@ -61,34 +54,46 @@ def _upsert_user(
         u.role = role
         changed = True
 
-    # Atualiza senha se estiver diferente
-    if password and not verify_password(password, u.password_hash):
-        u.password_hash = hash_password(password)
-        u.force_password_change = force_password_change
-        changed = True
+    # Atualiza senha se estiver diferente. Caminho comum (nada mudou desde o
+    # último boot): só compara o HMAC, sem PBKDF2.
+    if password:
+        fingerprint = _seed_fingerprint(username, u.password_hash, password)
+        if not hmac.compare_digest(u.seed_fingerprint or "", fingerprint):
+            if not verify_password(password, u.password_hash):
+                u.password_hash = hash_password(password)
+                u.force_password_change = force_password_change
+            u.seed_fingerprint = _seed_fingerprint(username, u.password_hash, password)
+            changed = True
 
     if changed:
         db.add(u)
 
 
+def _seed_config() -> list[tuple[str, str, str]]:
+    """
+    (username, senha, role) vindos das variáveis SEED_*.
+    """
+    return [
+        (os.getenv("SEED_ADMIN_USER", "master"), os.getenv("SEED_ADMIN_PASS", "suaSenha"), "master"),
+        (os.getenv("SEED_PLAYER_USER", "player"), os.getenv("SEED_PLAYER_PASS", "suaSenha"), "player"),
+    ]
+
+
+def seed_digest() -> str:
+    """
+    HMAC da configuração de seed. app/bootstrap.py só roda seed_users de novo
+    quando ela muda (ex: SEED_ADMIN_PASS trocada no painel do Render).
+    """
+    msg = "\0".join("\0".join(entry) for entry in _seed_config()).encode("utf-8")
+    return hmac.new(APP_SECRET.encode("utf-8"), msg, hashlib.sha256).hexdigest()
+
+
 def seed_users(db: Session) -> None:
-    admin_user = os.getenv("SEED_ADMIN_USER", "master")
-    admin_pass = os.getenv("SEED_ADMIN_PASS", "suaSenha")
-
-    player_user = os.getenv("SEED_PLAYER_USER", "player")
-    player_pass = os.getenv("SEED_PLAYER_PASS", "suaSenha")
-
-    _upsert_user(
-        db,
-        username=admin_user,
-        password=admin_pass,
-        role="master",
-        force_password_change=False,
-    )
-    _upsert_user(
-        db,
-        username=player_user,
-        password=player_pass,
-        role="player",
-        force_password_change=False,
-    )
+    for username, password, role in _seed_config():
+        _upsert_user(
+            db,
+            username=username,
+            password=password,
+            role=role,
+            force_password_change=False,
+        )
@@ -0,0 +1,277 @@
+# app/simulator.py
+# Simulador de encontros para o mestre balancear lutas antes da sessão:
+# grupo (fichas) contra inimigos (cartas "inimigo"), com armas (cartas
+# "arma") nas mãos dos personagens. Roda dezenas de milhares de lutas
+# (app/combat.py) e devolve taxa de vitória, distribuição de HP perdido e
+# de rodadas.
+#
+#   - ficha e cartas viram arrays (Combatants) uma vez; nada de ORM nas lutas
+#   - as lutas são divididas em pedaços de CHUNK_SIZE, cada um com a sua
+#     seed (SeedSequence.spawn); os pedaços rodam num pool de processos
+#     (SIM_WORKERS) e as somas são juntadas no fim
+#   - o pedaço não depende do nº de workers: a mesma seed dá o mesmo
+#     relatório com 1 ou 16 processos
+#
+# Atributos das cartas saem da raridade (a tabela não tem outros números):
+# ver enemy_stats / weapon_stats.
+
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import Card, Character
+from . import combat
+
+SIM_WORKERS = int(os.getenv("SIM_WORKERS", str(max(1, os.cpu_count() or 1))))
+CHUNK_SIZE = 2500
+DEFAULT_SIMS = 20_000
+MAX_SIMS = 200_000
+MAX_PARTY = 12
+MAX_ENEMIES = 30
+# Segundos sugeridos ao cliente no 429 (uma simulação inteira, não um hash)
+SIM_RETRY_AFTER = 5
+
+RARITY_TIER = {"comum": 0, "incomum": 1, "rara": 2, "epica": 3, "lendaria": 4, "mitica": 5}
+
+# atributo usado no ataque, pela classe da arma
+WEAPON_ATTRIBUTE = {
+    "combatente": "strength",
+    "especialista": "agility",
+    "estrategico": "intellect",
+    "potencializador": "willpower",
+}
+UNARMED = {"attribute": "strength", "damage_sides": 4, "damage_bonus": 0}
+
+Encounter = namedtuple("Encounter", ["combatants", "labels"])
+SimulationReport = namedtuple("SimulationReport", ["encounter", "stats", "seed", "workers", "seconds"])
+
+
+class SimulationError(ValueError):
+    pass
+
+
+class SimulationBusy(Exception):
+    """Já tem uma simulação rodando neste worker: a rota responde 429."""
+
+
+_pool: ProcessPoolExecutor | None = None
+# rota síncrona: o "já tem uma rodando" é conferido entre threads
+_running = threading.Lock()
+
+
+# =========================
+# Cartas/fichas -> números
+# =========================
+def enemy_stats(card: Card) -> dict:
+    tier = RARITY_TIER.get(card.rarity, 0)
+    return {
+        "hp": 10 + 10 * tier,
+        "attack": 35 + 8 * tier,
+        "damage_sides": 6 + 2 * tier,
+        "damage_bonus": tier,
+        "soak": tier // 2,
+    }
+
+
+def weapon_stats(card: Card | None) -> dict:
+    if card is None:
+        return dict(UNARMED)
+    tier = RARITY_TIER.get(card.rarity, 0)
+    return {
+        "attribute": WEAPON_ATTRIBUTE.get(card.class_type, "strength"),
+        "damage_sides": 6 + 2 * tier,
+        "damage_bonus": tier,
+    }
+
+
+def character_stats(character: Character, weapon: Card | None) -> dict:
+    w = weapon_stats(weapon)
+    return {
+        "hp": max(1, character.hp),
+        "attack": max(1, min(combat.CHECK_DIE, getattr(character, w["attribute"]))),
+        "damage_sides": w["damage_sides"],
+        "damage_bonus": w["damage_bonus"],
+        # vigor absorve dano: 0–4 por golpe
+        "soak": character.vigor // 25,
+    }
+
+
+def build_encounter(party: list[tuple[dict, dict]], enemies: list[tuple[dict, dict]]) -> Encounter:
+    """
+    [(stats, label)] de cada lado -> Encounter (arrays + rótulos).
+    """
+    members = [(combat.PARTY, s, label) for s, label in party] + [(combat.ENEMY, s, label) for s, label in enemies]
+    combatants = combat.Combatants(
+        side=np.array([side for side, _, _ in members], dtype=np.int64),
+        **{
+            field: np.array([s[field] for _, s, _ in members], dtype=np.int64)
+            for field in ("hp", "attack", "damage_sides", "damage_bonus", "soak")
+        },
+    )
+    labels = [{**label, **s} for _, s, label in members]
+    return Encounter(combatants, labels)
+
+
+def load_encounter(db: Session, character_ids, enemies, weapons=None) -> Encounter:
+    """
+    character_ids: ids das fichas; enemies: [(card_id, quantidade)];
+    weapons: {character_id: card_id da arma}. Duas queries.
+    """
+    character_ids = list(dict.fromkeys(character_ids))
+    weapons = weapons or {}
+    if not 1 <= len(character_ids) <= MAX_PARTY:
+        raise SimulationError(f"Grupo de 1 a {MAX_PARTY} fichas.")
+    if not 1 <= sum(count for _, count in enemies) <= MAX_ENEMIES:
+        raise SimulationError(f"De 1 a {MAX_ENEMIES} inimigos.")
+
+    characters = {c.id: c for c in db.scalars(select(Character).where(Character.id.in_(character_ids)))}
+    missing = [i for i in character_ids if i not in characters]
+    if missing:
+        raise SimulationError(f"Fichas não encontradas: {', '.join(map(str, missing))}.")
+
+    card_ids = {card_id for card_id, _ in enemies} | set(weapons.values())
+    cards = {c.id: c for c in db.scalars(select(Card).where(Card.id.in_(card_ids)))}
+    for card_id, _ in enemies:
+        if card_id not in cards or cards[card_id].type != "inimigo":
+            raise SimulationError(f"Carta {card_id} não é um inimigo.")
+    for card_id in weapons.values():
+        if card_id not in cards or cards[card_id].type != "arma":
+            raise SimulationError(f"Carta {card_id} não é uma arma.")
+
+    party = []
+    for character_id in character_ids:
+        c = characters[character_id]
+        weapon = cards.get(weapons.get(character_id))
+        label = {"kind": "character", "id": c.id, "name": c.name, "weapon": weapon.name if weapon else None}
+        party.append((character_stats(c, weapon), label))
+
+    foes = []
+    for card_id, count in enemies:
+        card = cards[card_id]
+        for n in range(count):
+            name = card.name if count == 1 else f"{card.name} #{n + 1}"
+            foes.append((enemy_stats(card), {"kind": "enemy", "id": card.id, "name": name}))
+    return build_encounter(party, foes)
+
+
+# =========================
+# Execução
+# =========================
+def chunks(sims: int, seed: int) -> list[tuple[int, np.random.SeedSequence]]:
+    sizes = [CHUNK_SIZE] * (sims // CHUNK_SIZE) + ([sims % CHUNK_SIZE] if sims % CHUNK_SIZE else [])
+    return list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+
+
+def _check_args(sims: int, seed: int | None) -> int:
+    if not 1 <= sims <= MAX_SIMS:
+        raise SimulationError(f"De 1 a {MAX_SIMS} simulações.")
+    if seed is None:
+        seed = secrets.randbits(63)
+    if not 0 <= seed < 2**63:
+        raise SimulationError("Seed deve estar entre 0 e 2^63-1.")
+    return seed
+
+
+def run(encounter: Encounter, sims: int, seed: int | None = None, executor: Executor | None = None,
+        workers: int = 1) -> SimulationReport:
+    """
+    Síncrono. executor=None roda no próprio processo (scripts, benchmark).
+    """
+    seed = _check_args(sims, seed)
+    started = time.perf_counter()
+    c = encounter.combatants
+    parts = chunks(sims, seed)
+    if executor is None:
+        results = [combat.fight(c, size, s) for size, s in parts]
+    else:
+        results = executor.map(combat.fight, *zip(*[(c, size, s) for size, s in parts]))
+    stats = combat.empty_stats(len(c.hp))
+    for result in results:
+        stats = combat.merge(stats, result)
+    return SimulationReport(encounter, stats, seed, workers, time.perf_counter() - started)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: mesmo motivo do pool do KDF (app/kdf.py)
+        _pool = ProcessPoolExecutor(max_workers=SIM_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def run_pooled(encounter: Encounter, sims: int, seed: int | None = None) -> SimulationReport:
+    """
+    Para as rotas: pedaços no pool, a thread da rota só espera. Uma
+    simulação por vez por worker do uvicorn (SimulationBusy).
+    """
+    if not _running.acquire(blocking=False):
+        raise SimulationBusy()
+    try:
+        return run(encounter, sims, seed, _get_pool(), SIM_WORKERS)
+    finally:
+        _running.release()
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# =========================
+# Relatório
+# =========================
+def _percentile(histogram: np.ndarray, q: float) -> int | None:
+    cumulative = np.cumsum(histogram)
+    if not cumulative[-1]:
+        return None
+    return int(np.searchsorted(cumulative, q * cumulative[-1]))
+
+
+def report_json(report: SimulationReport) -> dict:
+    stats, sims = report.stats, report.stats.sims
+    # rodadas: só lutas decididas (empates não entram no histograma)
+    decided = int(stats.rounds.sum())
+    values = np.arange(len(stats.rounds))
+    hp_values = np.arange(len(stats.hp_loss))
+    return {
+        "sims": sims,
+        "seed": report.seed,
+        "workers": report.workers,
+        "elapsed_ms": round(report.seconds * 1000, 1),
+        "sims_per_second": round(sims / report.seconds) if report.seconds else None,
+        "win_rate": int(stats.outcomes[combat.PARTY_WINS]) / sims,
+        "loss_rate": int(stats.outcomes[combat.ENEMY_WINS]) / sims,
+        "draw_rate": int(stats.outcomes[combat.DRAWS]) / sims,
+        "rounds": {
+            "mean": round(float(values @ stats.rounds) / decided, 2) if decided else None,
+            "p50": _percentile(stats.rounds, 0.5),
+            "p90": _percentile(stats.rounds, 0.9),
+            "max_rounds": combat.MAX_ROUNDS,
+            "histogram": stats.rounds[1:].tolist(),
+        },
+        "party_hp_loss_pct": {
+            "mean": round(float(hp_values @ stats.hp_loss) / sims, 1),
+            "p10": _percentile(stats.hp_loss, 0.1),
+            "p50": _percentile(stats.hp_loss, 0.5),
+            "p90": _percentile(stats.hp_loss, 0.9),
+            "histogram": stats.hp_loss.tolist(),
+        },
+        "combatants": [
+            {
+                **label,
+                "death_rate": int(deaths) / sims,
+                "avg_damage_taken": round(int(damage) / sims, 2),
+            }
+            for label, deaths, damage in zip(report.encounter.labels, stats.deaths, stats.damage)
+        ],
+    }
@@ -0,0 +1,132 @@
+# app/templating.py
+# Um ambiente Jinja só para o app inteiro (antes: um Jinja2Templates por
+# router, cada um compilando os mesmos templates de novo).
+#
+#   - bytecode cache em disco (TEMPLATE_CACHE_DIR; padrão: pasta temporária
+#     do Jinja): o 1º worker compila, os outros e os próximos boots só
+#     carregam o código já compilado
+#   - auto_reload só em desenvolvimento; em produção o template carregado
+#     não é conferido no disco a cada render
+#   - precompile() no startup carrega todos os templates: a 1ª requisição de
+#     cada página não paga compilação
+#   - {% cache "nome", chave1, chave2 %}...{% endcache %}: guarda o HTML de um
+#     trecho que só depende das chaves (ex: barra de filtros do catálogo);
+#     desligado com auto_reload (template editado mudaria o trecho)
+
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+
+import jinja2
+from jinja2 import nodes
+from jinja2.ext import Extension
+from fastapi.templating import Jinja2Templates
+
+from .config import settings
+from .instrumentation import instrument_templates
+from .assets import register_template_helpers
+
+TEMPLATE_DIR = "app/templates"
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR") or None
+# trechos guardados ({% cache %}); chaves vêm da querystring, então tem limite
+FRAGMENT_CACHE_SIZE = int(os.getenv("TEMPLATE_FRAGMENT_CACHE_SIZE", "512"))
+
+
+class FragmentCache:
+    """
+    LRU em memória, por processo. Chave = (nome, *valores do {% cache %}).
+    """
+
+    def __init__(self, max_size: int = FRAGMENT_CACHE_SIZE, enabled: bool = True):
+        self.max_size = max_size
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: tuple) -> str | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: tuple, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_cache", [nodes.List(args)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache(self, key, caller):
+        cache = self.environment.fragment_cache
+        if not cache.enabled:
+            return caller()
+        key = tuple(key)
+        value = cache.get(key)
+        if value is None:
+            value = caller()
+            cache.set(key, value)
+        return value
+
+
+def make_environment(*, auto_reload: bool | None = None, bytecode_cache: bool = True,
+                     cache_dir: str | None = TEMPLATE_CACHE_DIR) -> jinja2.Environment:
+    """
+    O ambiente do app (instrumentado, com os helpers de assets). Parâmetros
+    só para o bench_templates.py comparar configurações.
+    """
+    if auto_reload is None:
+        auto_reload = not settings.is_production
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,
+        auto_reload=auto_reload,
+        bytecode_cache=jinja2.FileSystemBytecodeCache(cache_dir) if bytecode_cache else None,
+        extensions=[FragmentCacheExtension],
+    )
+    env.fragment_cache = FragmentCache(enabled=not auto_reload)
+    # antes de carregar qualquer template (ver app/instrumentation.py)
+    instrument_templates(env)
+    register_template_helpers(env)
+    return env
+
+
+def precompile(env: jinja2.Environment) -> tuple[int, float]:
+    """
+    Carrega (compila ou lê do bytecode cache) todos os .html -> (nº, segundos).
+    """
+    started = time.perf_counter()
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names), time.perf_counter() - started
+
+
+templates = Jinja2Templates(env=make_environment())
@@ -0,0 +1,24 @@
+# app/text.py
+# Normalização de nomes compartilhada pelo import das cartas e pela ficha
+# (ordenação A–Z e busca sem acento/maiúsculas).
+
+import re
+import unicodedata
+
+
+def strip_accents(s: str) -> str:
+    return "".join(
+        c for c in unicodedata.normalize("NFD", s)
+        if unicodedata.category(c) != "Mn"
+    )
+
+
+def slugify(name: str) -> str:
+    s = strip_accents(name).lower().strip()
+    s = re.sub(r"[^\w\s-]", "", s, flags=re.UNICODE)
+    s = re.sub(r"[\s-]+", "_", s)
+    return s
+
+
+def order_key(name: str) -> str:
+    return strip_accents(name).lower().strip()
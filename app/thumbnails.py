@@ -0,0 +1,97 @@
+# app/thumbnails.py
+# Gera miniaturas WebP/AVIF em várias larguras para o catálogo de cartas.
+# As imagens originais têm ~2.5–3 MB (1024x1536); o grid do /cards mostra
+# tiles de ~180–360px, então servimos variantes pequenas com srcset.
+#
+# Saída: app/static/thumbs/<mesmo caminho relativo de app/static>/<nome>-<largura>.<ext>
+
+import os
+
+from PIL import Image
+
+STATIC_DIR = os.path.join("app", "static")
+THUMB_DIR = os.path.join(STATIC_DIR, "thumbs")
+
+# 180px = tile no desktop; 360/540 = telas 2x/3x
+THUMB_WIDTHS = (180, 360, 540)
+
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+
+
+def avif_supported() -> bool:
+    """
+    AVIF é nativo no Pillow >= 11.3; versões anteriores precisam do plugin
+    pillow-avif-plugin. Sem suporte, geramos apenas WebP.
+    """
+    try:
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    Image.init()
+    return "AVIF" in Image.SAVE
+
+
+def _public_url(path: str) -> str:
+    rel = os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+    return f"/static/{rel}"
+
+
+def _is_fresh(target: str, source_mtime: float) -> bool:
+    return os.path.exists(target) and os.path.getmtime(target) >= source_mtime
+
+
+def build_thumbnails(src_file: str, *, with_avif: bool | None = None) -> dict:
+    """
+    Gera (ou reaproveita, se já estiverem atualizadas) as miniaturas de src_file.
+
+    Retorna os campos de mídia do Card:
+      thumb_path, srcset_webp, srcset_avif, image_width, image_height
+    """
+    if with_avif is None:
+        with_avif = avif_supported()
+
+    rel = os.path.relpath(src_file, STATIC_DIR)
+    stem = os.path.splitext(rel)[0]
+    out_base = os.path.join(THUMB_DIR, stem)
+    os.makedirs(os.path.dirname(out_base), exist_ok=True)
+
+    source_mtime = os.path.getmtime(src_file)
+
+    formats = [("webp", "WEBP", {"quality": WEBP_QUALITY, "method": 4})]
+    if with_avif:
+        formats.append(("avif", "AVIF", {"quality": AVIF_QUALITY}))
+
+    with Image.open(src_file) as im:
+        width, height = im.size
+        widths = [w for w in THUMB_WIDTHS if w < width] or [width]
+
+        targets = {
+            (ext, w): f"{out_base}-{w}.{ext}"
+            for ext, _, _ in formats
+            for w in widths
+        }
+
+        if not all(_is_fresh(t, source_mtime) for t in targets.values()):
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGBA" if "transparency" in im.info else "RGB")
+
+            # Redimensiona da maior para a menor: cada passo parte da
+            # variante anterior, bem mais barato que reamostrar o original.
+            current = im
+            for w in sorted(widths, reverse=True):
+                h = max(1, round(height * w / width))
+                current = current.resize((w, h), Image.Resampling.LANCZOS)
+                for ext, pil_format, options in formats:
+                    current.save(targets[(ext, w)], pil_format, **options)
+
+    def srcset(ext: str) -> str:
+        return ", ".join(f"{_public_url(targets[(ext, w)])} {w}w" for w in widths)
+
+    return {
+        "thumb_path": _public_url(targets[("webp", widths[0])]),
+        "srcset_webp": srcset("webp"),
+        "srcset_avif": srcset("avif") if with_avif else None,
+        "image_width": width,
+        "image_height": height,
+    }
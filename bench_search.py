@@ -0,0 +1,187 @@
+# bench_search.py
+# Executar: python bench_search.py [--cards 20000] [--characters 20000] [--queries 200] [--vocabulary 5000]
+#
+# Mede a busca (app/search.py) num SQLite temporário com dezenas de milhares
+# de cartas e fichas (anotações, itens e habilidades sintéticos):
+#   - "fts":  search.search (FTS5, prefixo + bm25) + hydrate, como o /api/search
+#   - "like": o equivalente ingênuo, LIKE '%termo%' em cards.name,
+#             characters.notes, character_items.name e character_skills.name
+# Duas baterias: termos "típicos" (qualquer palavra de um vocabulário com
+# frequência Zipf) e termos "comuns" (as palavras mais frequentes, o pior
+# caso do FTS: o bm25 é calculado para cada documento que casa).
+# Mostra p50/p95/máx por consulta e o tempo de montar o índice.
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+WORDS = (
+    "espada escudo poção cura veneno flecha arco lança machado adaga grimório necronomicon "
+    "anel amuleto tocha corda mapa chave lâmina cristal runa sombra fogo gelo trovão vento "
+    "dragão lobo corvo serpente caveira cripta torre castelo floresta pântano deserto ruína "
+    "mágica proibida antiga sagrada maldita élfica anã sombria dourada prateada quântica"
+).split()
+
+
+SYLLABLES = "ba be bi bo bu ca co cu da de di do fa fe fi ga go gu la le li lo ma me mi mo na ne ni no " \
+            "pa pe po ra re ri ro sa se si so ta te ti to va ve vi vo xa za ze zu".split()
+
+
+def vocabulary(rng: random.Random, size: int) -> list[str]:
+    # palavras reais primeiro (as mais frequentes) + pseudo-palavras
+    words = list(WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def make_sentence(rng: random.Random, words: list[str]):
+    # frequência ~ Zipf (peso 1/posição), como texto de verdade
+    weights = [1 / (i + 1) for i in range(len(words))]
+
+    def sentence(n: int) -> str:
+        return " ".join(rng.choices(words, weights, k=n))
+
+    return sentence
+
+
+def populate(conn, cards: int, characters: int, sentence) -> None:
+    from sqlalchemy import insert
+    from app.models import User, Card, Character, CharacterItem, CharacterSkill
+    from app.text import order_key
+
+    rows = []
+    for i in range(cards):
+        name = f"{sentence(2).title()} {i}"
+        rows.append({"type": "arma", "rarity": ("comum", "rara", "epica")[i % 3], "class_type": "combatente",
+                     "name": name, "order_name": order_key(name), "slug": f"c{i}", "image_path": f"cards/c{i}.png"})
+    conn.execute(insert(Card), rows)
+
+    conn.execute(insert(User), [
+        {"username": f"u{i}", "password_hash": "x", "role": "player", "force_password_change": False,
+         "session_version": 1}
+        for i in range(characters)
+    ])
+    conn.execute(insert(Character), [
+        {"user_id": i + 1, "name": f"Personagem {i}", "notes": sentence(40), "version": 1}
+        for i in range(characters)
+    ])
+    items, skills = [], []
+    for character_id in range(1, characters + 1):
+        for _ in range(5):
+            name = sentence(2)
+            items.append({"character_id": character_id, "name": name, "name_key": order_key(name), "quantity": 1})
+        for _ in range(2):
+            name = sentence(1)
+            skills.append({"character_id": character_id, "name": name, "name_key": order_key(name),
+                           "description": sentence(8)})
+    conn.execute(insert(CharacterItem), items)
+    conn.execute(insert(CharacterSkill), skills)
+
+
+def like_search(db, q: str, limit: int = 20):
+    from sqlalchemy import or_, select
+    from app.models import Card, Character, CharacterItem, CharacterSkill
+
+    pattern = f"%{q}%"
+    cards = db.execute(select(Card.id, Card.name).where(Card.name.ilike(pattern)).limit(limit)).all()
+    characters = db.execute(
+        select(Character.id, Character.name)
+        .where(or_(
+            Character.notes.ilike(pattern),
+            Character.id.in_(select(CharacterItem.character_id).where(CharacterItem.name.ilike(pattern))),
+            Character.id.in_(select(CharacterSkill.character_id).where(CharacterSkill.name.ilike(pattern))),
+        ))
+        .limit(limit)
+    ).all()
+    return cards + characters
+
+
+def percentiles(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"p50 {statistics.median(samples):7.2f} ms   p95 {p95:7.2f} ms   máx {samples[-1]:7.2f} ms"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark da busca full-text")
+    parser.add_argument("--cards", type=int, default=20000)
+    parser.add_argument("--characters", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--vocabulary", type=int, default=5000, help="nº de palavras distintas")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="bench-search-")
+    os.environ.setdefault("APP_SECRET", "bench-search")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ["DB_INIT_LOCK"] = os.path.join(tmp, "init-lock")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from app.db import engine, SessionLocal
+    from app.bootstrap import migrate_database
+    from app import search
+
+    rng = random.Random(42)
+    words = vocabulary(rng, args.vocabulary)
+    migrate_database(engine)
+    with engine.begin() as conn:
+        populate(conn, args.cards, args.characters, make_sentence(rng, words))
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        search.rebuild(conn)
+    print(f"[INFO] índice: {args.cards} cartas + {args.characters} fichas em {time.perf_counter() - started:.2f}s")
+
+    def make_queries(pool: list[str]) -> list[str]:
+        # termos inteiros, prefixos curtos e pares; metade sem acento
+        queries = []
+        for _ in range(args.queries):
+            word = rng.choice(pool)
+            kind = rng.random()
+            if kind < 0.4:
+                q = word
+            elif kind < 0.7:
+                q = word[:3]
+            else:
+                q = f"{word} {rng.choice(pool)[:4]}"
+            queries.append(search.normalize(q) if rng.random() < 0.5 else q)
+        return queries
+
+    # "típicas": qualquer palavra do vocabulário (nome de item, de NPC...);
+    # "comuns": as palavras mais frequentes, casam com boa parte das fichas
+    suites = {
+        "típicas": make_queries(words),
+        "comuns": make_queries(WORDS[:10]),
+    }
+
+    db = SessionLocal()
+    try:
+        timings = {}
+        for suite, queries in suites.items():
+            fts, like = timings.setdefault(f"fts   {suite}", []), timings.setdefault(f"like  {suite}", [])
+            for q in queries:
+                t0 = time.perf_counter()
+                search.hydrate(db, search.search(db, q, limit=20))
+                fts.append((time.perf_counter() - t0) * 1000)
+
+                t0 = time.perf_counter()
+                like_search(db, q)
+                like.append((time.perf_counter() - t0) * 1000)
+    finally:
+        db.close()
+
+    for name, samples in timings.items():
+        print(f"{name:15} {percentiles(samples)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
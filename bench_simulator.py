@@ -0,0 +1,96 @@
+# bench_simulator.py
+# Executar: python bench_simulator.py [--sims 100000] [--workers 1,2,4] [--runs 3]
+#
+# Mede o simulador de encontros (app/simulator.py) num encontro sintético
+# (4 personagens contra 4 inimigos; não precisa de banco):
+#   - "serial":     tudo no próprio processo (executor=None)
+#   - "N procs":    ProcessPoolExecutor com N processos (spawn), como o da rota
+# Mostra lutas/s e o ganho sobre 1 processo, e confere que todas as
+# configurações devolvem o MESMO relatório para a mesma seed.
+# O custo de subir o pool fica de fora (uma rodada de aquecimento antes).
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("APP_SECRET", "bench-simulator")
+
+from app import simulator
+
+SEED = 1234
+
+
+def encounter() -> simulator.Encounter:
+    party = [
+        ({"hp": 25, "attack": 60, "damage_sides": 8, "damage_bonus": 1, "soak": 2},
+         {"kind": "character", "id": i, "name": f"Personagem {i}"})
+        for i in range(4)
+    ]
+    enemies = [
+        ({"hp": 30, "attack": 51, "damage_sides": 10, "damage_bonus": 2, "soak": 1},
+         {"kind": "enemy", "id": 1, "name": f"Inimigo {i}"})
+        for i in range(4)
+    ]
+    return simulator.build_encounter(party, enemies)
+
+
+def comparable(report: simulator.SimulationReport) -> dict:
+    data = simulator.report_json(report)
+    for key in ("elapsed_ms", "sims_per_second", "workers"):
+        data.pop(key)
+    return data
+
+
+def main(argv: list[str] | None = None) -> int:
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, *(n for n in (2, 4, 8, 16) if n <= cpus), cpus})
+    parser = argparse.ArgumentParser(description="Benchmark do simulador de encontros")
+    parser.add_argument("--sims", type=int, default=100_000)
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)))
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+    workers = [int(n) for n in args.workers.split(",")]
+
+    e = encounter()
+    print(f"[INFO] {args.sims} lutas, {len(e.labels)} combatentes, {cpus} CPU(s), "
+          f"pedaços de {simulator.CHUNK_SIZE}")
+
+    timings = []
+    for _ in range(args.runs):
+        report = simulator.run(e, args.sims, SEED)
+        timings.append(report.seconds)
+    reference = comparable(report)
+    serial = args.sims / statistics.median(timings)
+    print(f"serial     {serial:10,.0f} lutas/s")
+
+    base = None
+    mismatches = 0
+    for n in workers:
+        with ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # aquecimento: sobe os processos e importa app.combat
+            simulator.run(e, simulator.CHUNK_SIZE * n, SEED, executor=pool, workers=n)
+            timings = []
+            for _ in range(args.runs):
+                report = simulator.run(e, args.sims, SEED, executor=pool, workers=n)
+                timings.append(report.seconds)
+        rate = args.sims / statistics.median(timings)
+        base = base or rate
+        same = comparable(report) == reference
+        mismatches += not same
+        print(f"{n:2} procs   {rate:10,.0f} lutas/s   x{rate / base:4.2f}   "
+              f"{'mesmo resultado' if same else 'RESULTADO DIFERENTE'}")
+
+    win = reference["win_rate"]
+    print(f"[INFO] seed {SEED}: vitória {win:.1%}, rodadas p50 {reference['rounds']['p50']}, "
+          f"HP perdido p50 {reference['party_hp_loss_pct']['p50']}%")
+    if cpus == 1:
+        print("[AVISO] só 1 CPU nesta máquina: não há ganho de paralelismo para medir")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
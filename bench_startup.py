@@ -0,0 +1,116 @@
+# bench_startup.py
+# Executar: python bench_startup.py [--workers 4] [--runs 3]
+#
+# Mede o cold start de N workers subindo AO MESMO TEMPO (processos novos, como
+# o uvicorn --workers faz), num SQLite temporário:
+#   - "import":   import app.main
+#   - "startup":  lifespan (ensure_database)
+#
+# Cenários:
+#   antes     = comportamento antigo: todo worker roda create_all +
+#               run_migrations + seed_users (com KDF) no boot
+#   1º deploy = banco vazio, workers sobem juntos (um migra sob lock)
+#   depois    = banco já carimbado (python -m app.cli init): só um SELECT
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+WORKER = r"""
+import json, os, sys, time
+sys.path.insert(0, os.environ["BENCH_ROOT"])
+t0 = time.perf_counter()
+from app.main import app, engine
+t1 = time.perf_counter()
+if os.environ.get("BENCH_LEGACY") == "1":
+    from app.db import Base, SessionLocal
+    from app.migrations import run_migrations
+    from app.seed import seed_users
+    from app.models import User
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        # seed antigo: verificava a senha com PBKDF2 a cada boot
+        from app.passwords import verify_password
+        for u in db.query(User).filter(User.username.in_(["master", "player"])):
+            verify_password("suaSenha", u.password_hash)
+        seed_users(db)
+        db.commit()
+    finally:
+        db.close()
+else:
+    from app.bootstrap import ensure_database
+    ensure_database(engine)
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "startup": t2 - t1}))
+"""
+
+
+def run_workers(n: int, env: dict) -> list[dict]:
+    procs = [
+        subprocess.Popen([sys.executable, "-c", WORKER], env=env, stdout=subprocess.PIPE, text=True)
+        for _ in range(n)
+    ]
+    results = []
+    for proc in procs:
+        out, _ = proc.communicate()
+        if proc.returncode != 0:
+            raise SystemExit(f"[ERRO] worker saiu com código {proc.returncode}")
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return results
+
+
+def _fmt(values: list[float]) -> str:
+    return f"média {statistics.mean(values) * 1000:7.1f} ms | máx {max(values) * 1000:7.1f} ms"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de cold start por worker")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="rpg-bench-startup-")
+    db_path = os.path.join(tmp, "rpg.db")
+    env = dict(
+        os.environ,
+        BENCH_ROOT=ROOT,
+        APP_SECRET=os.getenv("APP_SECRET", "bench-startup"),
+        DATABASE_URL=f"sqlite:///{db_path}",
+    )
+    env.pop("RENDER", None)
+
+    try:
+        scenarios = {}
+        for label, legacy, fresh in (("antes", True, False), ("1º deploy", False, True), ("depois", False, False)):
+            imports, startups = [], []
+            for _ in range(args.runs):
+                if fresh and os.path.exists(db_path):
+                    os.remove(db_path)
+                elif not os.path.exists(db_path):
+                    subprocess.run([sys.executable, "-m", "app.cli", "init"], env=env, cwd=ROOT,
+                                   check=True, stdout=subprocess.DEVNULL)
+                for r in run_workers(args.workers, dict(env, BENCH_LEGACY="1" if legacy else "0")):
+                    imports.append(r["import"])
+                    startups.append(r["startup"])
+            scenarios[label] = (imports, startups)
+
+        print(f"[INFO] {args.workers} workers simultâneos x {args.runs} rodadas (SQLite em {tmp})")
+        for label, (imports, startups) in scenarios.items():
+            print(f"{label:>10}  import  {_fmt(imports)}")
+            print(f"{'':>10}  startup {_fmt(startups)}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# bench_templates.py
+# Executar: python bench_templates.py [--requests 200] [--cards 200]
+#
+# Tempo de render de cada página (o "tpl" do Server-Timing, ver
+# app/instrumentation.py), num SQLite temporário com mestre, jogador e
+# cartas sintéticas. Duas configurações do ambiente Jinja (app/templating.py):
+#   - "antes":  auto_reload ligado, sem bytecode cache, sem cache de trechos,
+#               templates compilados na 1ª requisição (como cada router fazia)
+#   - "depois": auto_reload desligado, bytecode cache, {% cache %} ligado,
+#               precompile() no startup
+# Mostra a 1ª requisição de cada página (com a compilação, se houver) e o
+# p50 das seguintes: só o render ("tpl") e a requisição inteira. As duas
+# configurações se alternam a cada requisição (ruído da máquina vale igual
+# para as duas). Antes disso, o tempo de carregar todos os templates com e
+# sem bytecode cache (o que cada worker paga no boot).
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+
+TPL = re.compile(r"tpl;dur=([\d.]+)")
+TOTAL = re.compile(r"total;dur=([\d.]+)")
+PASSWORD = "senha-de-bench"
+
+
+def setup(cards: int) -> dict[str, int]:
+    from sqlalchemy import insert
+    from app.db import engine, SessionLocal
+    from app.bootstrap import migrate_database
+    from app.models import User, Card, Character
+    from app.passwords import hash_password
+    from app.text import order_key
+    from app import inventory
+
+    migrate_database(engine)
+    rarities = ("comum", "incomum", "rara", "epica", "lendaria", "mitica")
+    classes = ("combatente", "potencializador", "estrategico", "especialista")
+    with engine.begin() as conn:
+        conn.execute(insert(Card), [
+            {"type": "arma", "rarity": rarities[i % 6], "class_type": classes[i % 4], "name": f"Arma {i}",
+             "order_name": order_key(f"Arma {i}"), "slug": f"arma_{i}", "image_path": f"cards/arma_{i}.png"}
+            for i in range(cards)
+        ])
+
+    password_hash = hash_password(PASSWORD)
+    db = SessionLocal()
+    try:
+        master = User(username="mestre", password_hash=password_hash, role="master", force_password_change=False)
+        player = User(username="jogador", password_hash=password_hash, role="player", force_password_change=False)
+        db.add_all([master, player])
+        db.flush()
+        character = Character(user_id=player.id, name="JOGADOR", notes="Anotações de teste")
+        db.add(character)
+        db.flush()
+        for i in range(10):
+            inventory.add_item(db, character, f"Item {i}")
+            inventory.add_skill(db, character, f"Habilidade {i}", "Descrição")
+        db.commit()
+        return {"master": master.id, "player": player.id}
+    finally:
+        db.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de render dos templates")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--cards", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="bench-templates-")
+    os.environ.setdefault("APP_SECRET", "bench-templates")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ["DB_INIT_LOCK"] = os.path.join(tmp, "init-lock")
+    os.environ["DB_AUTO_INIT"] = "0"
+    os.environ["SERVER_TIMING"] = "1"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app import kdf, templating
+
+    # ---- boot: carregar todos os templates
+    bytecode_dir = os.path.join(tmp, "jinja-cache")
+    os.makedirs(bytecode_dir)
+    boot = {
+        "sem bytecode cache": templating.make_environment(auto_reload=False, bytecode_cache=False),
+        "bytecode cache frio": templating.make_environment(auto_reload=False, cache_dir=bytecode_dir),
+        "bytecode cache quente": templating.make_environment(auto_reload=False, cache_dir=bytecode_dir),
+    }
+    for name, env in boot.items():
+        count, seconds = templating.precompile(env)
+        print(f"[boot] {name:22} {count} templates em {seconds * 1000:7.1f} ms")
+
+    # ---- render por página
+    ids = setup(args.cards)
+    pages = [
+        ("login.html", None, "/login"),
+        ("change_password.html", "mestre", "/change-password"),
+        ("cards_catalog.html", "mestre", "/cards?type=arma&sort=za"),
+        ("master_dashboard.html", "mestre", "/master"),
+        ("player_sheet.html (jogador)", "jogador", "/player"),
+        ("player_sheet.html (mestre)", "mestre", f"/player/{ids['player']}"),
+        ("search.html", "mestre", "/search?q=arma"),
+    ]
+    configs = {
+        "antes": dict(env=dict(auto_reload=True, bytecode_cache=False), precompile=False),
+        "depois": dict(env=dict(auto_reload=False, cache_dir=bytecode_dir), precompile=True),
+    }
+
+    results: dict[str, dict[str, tuple[float, float, float]]] = {}
+    try:
+        clients = {None: TestClient(app)}
+        for username in ("mestre", "jogador"):
+            client = TestClient(app)
+            r = client.post("/login", data={"username": username, "password": PASSWORD}, follow_redirects=False)
+            if r.status_code != 303:
+                raise SystemExit(f"[ERRO] login de {username} falhou ({r.status_code})")
+            clients[username] = client
+
+        envs = {}
+        for config, options in configs.items():
+            envs[config] = templating.make_environment(**options["env"])
+            if options["precompile"]:
+                templating.precompile(envs[config])
+
+        for label, username, path in pages:
+            tpl = {config: [] for config in configs}
+            total = {config: [] for config in configs}
+            for _ in range(args.requests + 1):
+                for config, env in envs.items():
+                    # todos os routers usam esta instância (app/templating.py)
+                    templating.templates.env = env
+                    r = clients[username].get(path)
+                    if r.status_code != 200:
+                        raise SystemExit(f"[ERRO] {path}: status {r.status_code}")
+                    tpl[config].append(float(TPL.search(r.headers["server-timing"]).group(1)))
+                    total[config].append(float(TOTAL.search(r.headers["server-timing"]).group(1)))
+            # 1ª requisição: total (a compilação acontece no get_template,
+            # fora do "tpl"); seguintes: p50 do render e do total
+            results[label] = {
+                config: (total[config][0], statistics.median(tpl[config][1:]), statistics.median(total[config][1:]))
+                for config in configs
+            }
+    finally:
+        kdf.shutdown()
+
+    print()
+    print(f"{'':30} {'----------- antes -----------':>30} {'----------- depois ----------':>30}")
+    print(f"{'página':30}" + f" {'1ª req':>9} {'tpl p50':>9} {'req p50':>9}" * 2)
+    for label, by_config in results.items():
+        row = "".join(f" {first:7.2f}ms {tpl:7.2f}ms {total:7.2f}ms" for first, tpl, total in
+                      (by_config["antes"], by_config["depois"]))
+        print(f"{label:30}{row}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
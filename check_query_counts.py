@@ -0,0 +1,226 @@
+# check_query_counts.py
+# Executar: python check_query_counts.py [-v]
+#
+# Orçamento de queries por rota. Sobe o app num SQLite em memória (schema a
+# partir dos models), faz login como mestre e como jogador, chama cada rota
+# e conta os statements SQL que ela executou. Termina com exit 1 se:
+#   - alguma rota passar do orçamento em BUDGETS
+#   - /master ou /api/party executarem mais queries com um grupo maior, ou
+#     /player com um inventário maior (query por linha = N+1)
+#
+# Rode antes de subir mudanças nas rotas; se uma rota precisar mesmo de mais
+# uma query, ajuste o orçamento aqui no mesmo commit. Os mesmos BUDGETS rodam
+# no pytest, um teste por rota (tests/test_query_budgets.py).
+
+import argparse
+import os
+import sys
+import threading
+
+os.environ.setdefault("APP_SECRET", "check-query-counts")
+# memória compartilhada entre as conexões (threads do threadpool e o engine
+# async veem o mesmo banco); nada é gravado em disco
+os.environ["DATABASE_URL"] = "sqlite:///file:rpg_query_counts?mode=memory&cache=shared&uri=true"
+os.environ["DB_AUTO_INIT"] = "0"
+os.environ["SERVER_TIMING"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.main import app
+from app.db import engine, SessionLocal
+from app.bootstrap import migrate_database
+from app.models import User, Character
+from app.passwords import hash_password
+from app import inventory, kdf, provisioning
+
+PASSWORD = "senha-de-teste"
+
+# rota -> máximo de statements por requisição (catálogo com cache frio)
+BUDGETS = {
+    "POST /login": 1,
+    "GET /me": 1,
+    # sessão + ficha + itens + habilidades (selectinload)
+    "GET /player": 4,
+    "GET /player/{id}": 4,
+    # + reindex da busca: SELECT + DELETE + INSERT (app/search.py)
+    "POST /player/update": 6,
+    "POST /player/{id}/items": 8,
+    "PATCH /api/player/character": 2,
+    "GET /master": 1,
+    "GET /api/party": 1,
+    "GET /cards": 2,
+    "GET /api/cards": 1,
+    # sessão + grupo (uma query para todos os testes do pedido)
+    "POST /api/roll": 2,
+}
+
+# grupo/inventário extra para a conferência de N+1
+EXTRA_PLAYERS = 25
+EXTRA_ITEMS = 30
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements: list[str] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.count += 1
+            self.statements.append(" ".join(statement.split())[:160])
+
+    def reset(self) -> None:
+        with self._lock:
+            self.count = 0
+            self.statements = []
+
+
+def create_users() -> dict[str, int]:
+    password_hash = hash_password(PASSWORD)
+    db = SessionLocal()
+    try:
+        master = User(username="mestre", password_hash=password_hash, role="master", force_password_change=False)
+        player = User(username="jogador", password_hash=password_hash, role="player", force_password_change=False)
+        db.add_all([master, player])
+        db.flush()
+        db.add(Character(user_id=player.id, name="JOGADOR"))
+        db.commit()
+        return {"master": master.id, "player": player.id}
+    finally:
+        db.close()
+
+
+def add_players(count: int) -> None:
+    db = SessionLocal()
+    try:
+        entries = [provisioning.RosterEntry(i, f"extra{i}", PASSWORD, None) for i in range(count)]
+        password_hash = db.query(User.password_hash).filter(User.username == "jogador").scalar()
+        provisioning.insert_roster(db, entries, [password_hash] * count)
+        db.commit()
+    finally:
+        db.close()
+
+
+def add_items(user_id: int, count: int) -> None:
+    db = SessionLocal()
+    try:
+        character = db.query(Character).filter(Character.user_id == user_id).one()
+        for i in range(count):
+            inventory.add_item(db, character, f"Item extra {i}")
+            inventory.add_skill(db, character, f"Habilidade extra {i}")
+        db.commit()
+    finally:
+        db.close()
+
+
+def login(username: str) -> TestClient:
+    client = TestClient(app)
+    r = client.post("/login", data={"username": username, "password": PASSWORD}, follow_redirects=False)
+    if r.status_code != 303:
+        raise SystemExit(f"[ERRO] login de {username} falhou ({r.status_code})")
+    return client
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Confere o número de queries por rota")
+    parser.add_argument("-v", "--verbose", action="store_true", help="mostra os statements de cada rota")
+    args = parser.parse_args(argv)
+
+    migrate_database(engine)
+    ids = create_users()
+
+    counter = StatementCounter()
+    event.listen(Engine, "before_cursor_execute", counter)
+
+    def measure(name: str, call) -> int:
+        counter.reset()
+        r = call()
+        if r.status_code >= 400:
+            print(f"[ERRO] {name}: status {r.status_code}")
+            failures.append(name)
+        statements[name] = list(counter.statements)
+        return counter.count
+
+    def show(name: str) -> None:
+        if args.verbose:
+            for statement in statements.get(name, []):
+                print(f"    {statement}")
+
+    failures: list[str] = []
+    counts: dict[str, int] = {}
+    statements: dict[str, list[str]] = {}
+
+    try:
+        counter.reset()
+        master = login("mestre")
+        counts["POST /login"] = counter.count
+        statements["POST /login"] = list(counter.statements)
+        player = login("jogador")
+
+        counts["GET /me"] = measure("GET /me", lambda: master.get("/me", follow_redirects=False))
+        counts["GET /player"] = measure("GET /player", lambda: player.get("/player"))
+        counts["GET /player/{id}"] = measure("GET /player/{id}", lambda: master.get(f"/player/{ids['player']}"))
+        counts["POST /player/update"] = measure(
+            "POST /player/update",
+            lambda: player.post("/player/update", data={"name": "Jogador", "version": "1"}, follow_redirects=False),
+        )
+        counts["POST /player/{id}/items"] = measure(
+            "POST /player/{id}/items",
+            lambda: player.post(f"/player/{ids['player']}/items", data={"name": "Corda", "quantity": "2"},
+                                follow_redirects=False),
+        )
+        counts["PATCH /api/player/character"] = measure(
+            "PATCH /api/player/character",
+            lambda: player.patch("/api/player/character", json={"version": 2, "changes": {"hp": 7}}),
+        )
+        counts["GET /master"] = measure("GET /master", lambda: master.get("/master"))
+        counts["GET /api/party"] = measure("GET /api/party", lambda: master.get("/api/party"))
+        counts["GET /cards"] = measure("GET /cards", lambda: master.get("/cards"))
+        counts["GET /api/cards"] = measure("GET /api/cards", lambda: master.get("/api/cards?sort=za"))
+        counts["POST /api/roll"] = measure(
+            "POST /api/roll",
+            lambda: master.post("/api/roll", json={
+                "rolls": [{"expr": "2d6+1", "times": 10}],
+                "checks": [{"attribute": "agility"}, {"attribute": "vigor", "modifier": -20}],
+            }),
+        )
+
+        for name, budget in BUDGETS.items():
+            count = counts[name]
+            ok = count <= budget
+            print(f"[{'OK' if ok else 'FALHA'}] {name}: {count} queries (máximo {budget})")
+            show(name)
+            if not ok:
+                failures.append(name)
+
+        # N+1: o painel não pode crescer com o grupo, nem a ficha com o inventário
+        add_players(EXTRA_PLAYERS)
+        add_items(ids["player"], EXTRA_ITEMS)
+        for name, client, path, extra in (
+            ("GET /master", master, "/master", f"+{EXTRA_PLAYERS} jogadores"),
+            ("GET /api/party", master, "/api/party", f"+{EXTRA_PLAYERS} jogadores"),
+            ("GET /player", player, "/player", f"+{EXTRA_ITEMS} itens/habilidades"),
+        ):
+            count = measure(name, lambda: client.get(path))
+            # <=: a checagem da sessão pode vir do cache (app/auth.py)
+            ok = count <= counts[name]
+            print(f"[{'OK' if ok else 'FALHA'}] {name} com {extra}: {count} queries (antes {counts[name]})")
+            show(name)
+            if not ok:
+                failures.append(f"{name} (N+1)")
+    finally:
+        event.remove(Engine, "before_cursor_execute", counter)
+        kdf.shutdown()
+
+    if failures:
+        print(f"[FALHA] {len(failures)} rota(s) fora do orçamento: {', '.join(failures)}")
+        return 1
+    print(f"[OK] {len(BUDGETS)} rotas dentro do orçamento")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# check_query_plans.py
+# Executar: python check_query_plans.py [--database-url URL] [-v]
+#
+# Roda EXPLAIN para toda combinação de filtros que /cards e /api/cards podem
+# gerar (tipo x classe x raridade x ordenação x com/sem cursor) e termina com
+# exit 1 se alguma cair em table scan ou ordenação em memória:
+#   - SQLite:   "SCAN cards" sem índice ou "USE TEMP B-TREE"
+#   - Postgres: nó "Seq Scan" ou "Sort" (com enable_seqscan=off, senão tabela
+#               pequena sempre vira seq scan)
+#
+# Sem --database-url usa um SQLite em memória criado a partir dos models,
+# ou seja, confere os índices declarados em Card.__table_args__. O mesmo
+# SQLite roda no pytest, um teste por combinação (tests/test_query_plans.py).
+
+import argparse
+import os
+import sys
+
+os.environ.setdefault("APP_SECRET", "check-query-plans")
+
+from sqlalchemy import create_engine, text
+
+from app.db import Base
+from app.catalog import build_cards_query
+from app.routers.cards import RARITY_OPTIONS, CLASS_OPTIONS, TYPE_OPTIONS, PAGE_SIZE
+
+SAMPLE_CURSOR = ("m", 1)
+
+
+def filter_combinations():
+    rarities = [None] + [r for r, _ in RARITY_OPTIONS]
+    for card_type in [None] + [t for t, _ in TYPE_OPTIONS]:
+        # classe só é aplicada quando o tipo é "arma" (ver _parse_filters)
+        classes = [None] + [c for c, _ in CLASS_OPTIONS] if card_type == "arma" else [None]
+        for class_type in classes:
+            for rarity in rarities:
+                for sort in ("az", "za"):
+                    for after in (None, SAMPLE_CURSOR):
+                        yield {
+                            "card_type": card_type,
+                            "rarity": rarity,
+                            "class_type": class_type,
+                            "sort": sort,
+                            "after": after,
+                            "limit": PAGE_SIZE + 1,
+                        }
+
+
+def filter_label(filters: dict) -> str:
+    return ", ".join(f"{k}={v}" for k, v in filters.items() if k != "limit")
+
+
+def compile_sql(engine, filters: dict) -> str:
+    q = build_cards_query(**filters)
+    return str(q.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def sqlite_problems(conn, sql: str) -> tuple[list[str], list[str]]:
+    details = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+    problems = []
+    for detail in details:
+        if "TEMP B-TREE" in detail:
+            problems.append(detail)
+        elif detail.startswith("SCAN") and "USING" not in detail:
+            problems.append(detail)
+    return details, problems
+
+
+def _walk_pg_plan(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk_pg_plan(child)
+
+
+def postgres_problems(conn, sql: str) -> tuple[list[str], list[str]]:
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql).scalar()
+    nodes = list(_walk_pg_plan(plan[0]["Plan"]))
+    details = [f"{n['Node Type']} {n.get('Index Name', '')}".strip() for n in nodes]
+    problems = [d for d in details if d.startswith(("Seq Scan", "Sort"))]
+    return details, problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Confere os planos das queries do catálogo")
+    parser.add_argument("--database-url", default=None, help="banco a conferir (padrão: SQLite em memória)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="mostra o plano de cada query")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        engine = create_engine(args.database_url, future=True)
+    else:
+        engine = create_engine("sqlite://", future=True)
+        Base.metadata.create_all(bind=engine)
+
+    dialect = engine.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        print(f"[ERRO] Dialeto sem suporte: {dialect}")
+        return 2
+
+    failures = 0
+    total = 0
+    with engine.connect() as conn:
+        if dialect == "postgresql":
+            conn.execute(text("SET enable_seqscan = off"))
+
+        for filters in filter_combinations():
+            total += 1
+            sql = compile_sql(engine, filters)
+            if dialect == "sqlite":
+                details, problems = sqlite_problems(conn, sql)
+            else:
+                details, problems = postgres_problems(conn, sql)
+
+            label = filter_label(filters)
+            if problems:
+                failures += 1
+                print(f"[FALHA] {label}")
+                for detail in details:
+                    print(f"        {detail}")
+            elif args.verbose:
+                print(f"[OK] {label}: {' | '.join(details)}")
+
+    print(f"[{'OK' if not failures else 'ERRO'}] {total - failures}/{total} planos sem table scan/sort ({dialect})")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
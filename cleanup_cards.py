@@ -1,11 +1,7 @@
-from app.db import SessionLocal
-from app.models import Card
+# cleanup_cards.py
+# Mantido por compatibilidade: a remoção de cartas sem arquivo (ex: sobras .jpg)
+# agora acontece no próprio import incremental. Equivale a: python import_cards.py
+from import_cards import main
 
-db = SessionLocal()
-
-deleted = db.query(Card).filter(Card.image_path.like("%.jpg")).delete()
-db.commit()
-
-print(f"[OK] Registros removidos: {deleted}")
-
-db.close()
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,34 @@
 # import_cards.py
-# Executar: python import_cards.py
+# Executar: python import_cards.py [--dry-run] [--force] [--workers N]
 # Objetivo: Popular/atualizar a tabela "cards" apontando imagens .png no /static
+#
+# Import incremental:
+#   1. varre as pastas (os.scandir, um stat por arquivo)
+#   2. compara size/mtime com o manifest (tabela card_sources) e pula o que não mudou
+#   3. hash + miniaturas dos arquivos novos/alterados em um pool de processos
+#   4. aplica inserts/updates (INSERT ... ON CONFLICT em uq_card_identity) e
+#      deletes (cartas sem arquivo, ex: sobras .jpg) em uma única transação
+#
+# Também substitui o antigo cleanup_cards.py: linhas órfãs saem no mesmo passo.
 
-from sqlalchemy.orm import Session
-from app.db import SessionLocal, Base, engine
-from app.models import Card
-
+import argparse
+import hashlib
 import os
-import re
-import unicodedata
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
 
-# Garante que as tabelas existam (incluindo cards)
-Base.metadata.create_all(bind=engine)
+from app.db import SessionLocal, engine
+from app.models import Card, CardSource, CharacterItem
+from app.bootstrap import init_lock, migrate_database
+from app.thumbnails import build_thumbnails, avif_supported
+from app.assets import build_manifest
+from app.catalog import bump_catalog_version
+from app.text import order_key
+from app import search
 
 # === CONFIG ===
 STATIC_ROOT = os.path.join("app", "static", "cards")  # app/static/cards
@@ -20,66 +37,54 @@ IMAGE_EXT = ".png"  # <<<<<< PADRÃO DEFINIDO AQUI
 RARITY_ORDER = ["comum", "incomum", "rara", "epica", "lendaria", "mitica"]
 WEAPON_CLASSES = ["combatente", "potencializador", "estrategico", "especialista"]
 
+# Linhas por INSERT (limite de parâmetros do SQLite); tudo na mesma transação
+BATCH_SIZE = 500
 
-def strip_accents(s: str) -> str:
-    return "".join(
-        c for c in unicodedata.normalize("NFD", s)
-        if unicodedata.category(c) != "Mn"
-    )
+# Campos que o import controla (o resto do Card fica como está)
+CARD_FIELDS = (
+    "name", "order_name", "image_path",
+    "thumb_path", "srcset_webp", "srcset_avif", "image_width", "image_height",
+)
 
 
-def slugify(name: str) -> str:
-    s = strip_accents(name).lower().strip()
-    s = re.sub(r"[^\w\s-]", "", s, flags=re.UNICODE)
-    s = re.sub(r"[\s-]+", "_", s)
-    return s
+@dataclass(frozen=True)
+class SourceFile:
+    rel_path: str       # relativo a STATIC_ROOT
+    full_path: str
+    size: int
+    mtime_ns: int
+    type_: str
+    rarity: str
+    class_type: str | None
+    slug: str
 
+    @property
+    def identity(self) -> tuple:
+        return (self.type_, self.rarity, self.class_type, self.slug)
 
-def order_key(name: str) -> str:
-    return strip_accents(name).lower().strip()
 
+class Timer:
+    def __init__(self):
+        self.phases: list[tuple[str, float]] = []
+        self._t = time.perf_counter()
 
-def upsert_card(db: Session, *, type_: str, rarity: str, class_type: str | None,
-                name: str, slug: str, image_path: str):
-    """
-    Upsert simples baseado na constraint lógica (type, rarity, class_type, slug).
-    """
-    existing = (
-        db.query(Card)
-        .filter(Card.type == type_)
-        .filter(Card.rarity == rarity)
-        .filter(Card.class_type == class_type)
-        .filter(Card.slug == slug)
-        .first()
-    )
-    if existing:
-        existing.name = name
-        existing.order_name = order_key(name)
-        existing.image_path = image_path
-        return False
-    else:
-        c = Card(
-            type=type_,
-            rarity=rarity,
-            class_type=class_type,
-            name=name,
-            order_name=order_key(name),
-            slug=slug,
-            image_path=image_path,
-        )
-        db.add(c)
-        return True
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._t))
+        self._t = now
+
+    def report(self) -> str:
+        total = sum(t for _, t in self.phases)
+        parts = [f"{name}={t * 1000:.0f}ms" for name, t in self.phases]
+        return f"{' '.join(parts)} total={total * 1000:.0f}ms"
 
 
-def import_weapons_from_folders(db: Session) -> int:
+def scan_weapon_files() -> list[SourceFile]:
     """
     Lê estrutura:
       app/static/cards/armas/<classe>/<raridade>/<slug>.png
-    e popula tabela cards com type="arma".
     """
-    created = 0
-    updated = 0
-
+    found: list[SourceFile] = []
     base_dir = os.path.join(STATIC_ROOT, "armas")
 
     for class_type in WEAPON_CLASSES:
@@ -88,44 +93,233 @@ def import_weapons_from_folders(db: Session) -> int:
             if not os.path.isdir(folder):
                 continue
 
-            for fname in os.listdir(folder):
-                # só PNG
-                if not fname.lower().endswith(IMAGE_EXT):
-                    continue
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    # só PNG
+                    if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXT):
+                        continue
+
+                    st = entry.stat()
+                    found.append(SourceFile(
+                        rel_path=f"armas/{class_type}/{rarity}/{entry.name}",
+                        full_path=entry.path,
+                        size=st.st_size,
+                        mtime_ns=st.st_mtime_ns,
+                        type_="arma",
+                        rarity=rarity,
+                        class_type=class_type,
+                        slug=os.path.splitext(entry.name)[0],
+                    ))
+    return found
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def process_file(full_path: str, with_avif: bool) -> tuple[str, dict]:
+    """
+    Roda no pool de processos: hash do conteúdo + miniaturas.
+    """
+    return _hash_file(full_path), build_thumbnails(full_path, with_avif=with_avif)
+
+
+def card_row(src: SourceFile, media: dict) -> dict:
+    slug = src.slug
+
+    # Nome exibido: tenta "humanizar" o slug
+    # Ex: "escudo_de_metal" -> "Escudo de metal"
+    display_name = slug.replace("_", " ").strip().title()
+
+    return {
+        "type": src.type_,
+        "rarity": src.rarity,
+        "class_type": src.class_type,
+        "slug": slug,
+        "name": display_name,
+        "order_name": order_key(display_name),
+        # Path público
+        "image_path": f"/static/cards/{src.rel_path}",
+        **media,
+    }
+
+
+def _dialect_insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Banco sem suporte a INSERT ... ON CONFLICT: {dialect}")
+    return insert
+
 
-                slug = os.path.splitext(fname)[0]
+def bulk_upsert_cards(db: Session, rows: list[dict]) -> None:
+    """
+    INSERT ... ON CONFLICT (type, rarity, class_type, slug) DO UPDATE em lote.
+    """
+    if not rows:
+        return
+    insert = _dialect_insert(db)
+    for i in range(0, len(rows), BATCH_SIZE):
+        stmt = insert(Card).values(rows[i:i + BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Card.type, Card.rarity, Card.class_type, Card.slug],
+            set_={field: stmt.excluded[field] for field in CARD_FIELDS},
+        )
+        db.execute(stmt)
 
-                # Nome exibido: tenta "humanizar" o slug
-                # Ex: "escudo_de_metal" -> "Escudo de metal"
-                display_name = slug.replace("_", " ").strip().title()
 
-                # Path público
-                image_path = f"/static/cards/armas/{class_type}/{rarity}/{slug}{IMAGE_EXT}"
+def bulk_upsert_sources(db: Session, rows: list[dict]) -> None:
+    if not rows:
+        return
+    insert = _dialect_insert(db)
+    for i in range(0, len(rows), BATCH_SIZE):
+        stmt = insert(CardSource).values(rows[i:i + BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CardSource.path],
+            set_={field: stmt.excluded[field] for field in ("size", "mtime_ns", "content_hash")},
+        )
+        db.execute(stmt)
+
+
+def import_weapons_from_folders(db: Session, *, dry_run: bool = False, force: bool = False,
+                                workers: int | None = None) -> dict:
+    """
+    Import incremental das armas. Retorna contadores + timings.
+    """
+    timer = Timer()
+
+    files = scan_weapon_files()
+    timer.mark("scan")
+
+    known = {
+        row.path: row
+        for row in db.execute(select(CardSource.path, CardSource.size, CardSource.mtime_ns))
+    }
+    existing_ids = {
+        tuple(row): card_id
+        for card_id, *row in db.execute(
+            select(Card.id, Card.type, Card.rarity, Card.class_type, Card.slug).where(Card.type == "arma")
+        )
+    }
+    timer.mark("load")
+
+    changed: list[SourceFile] = []
+    for src in files:
+        prev = known.get(src.rel_path)
+        unchanged = (
+            prev is not None
+            and prev.size == src.size
+            and prev.mtime_ns == src.mtime_ns
+            and src.identity in existing_ids
+        )
+        if force or not unchanged:
+            changed.append(src)
 
-                is_created = upsert_card(
-                    db,
-                    type_="arma",
-                    rarity=rarity,
-                    class_type=class_type,
-                    name=display_name,
-                    slug=slug,
-                    image_path=image_path,
-                )
-                if is_created:
-                    created += 1
-                else:
-                    updated += 1
+    seen_identities = {src.identity for src in files}
+    seen_paths = {src.rel_path for src in files}
+    stale_ids = [card_id for ident, card_id in existing_ids.items() if ident not in seen_identities]
+    stale_paths = [path for path in known if path not in seen_paths]
 
-    print(f"[INFO] Armas: criadas={created}, atualizadas={updated}")
-    return created + updated
+    stats = {
+        "scanned": len(files),
+        "created": sum(1 for src in changed if src.identity not in existing_ids),
+        "updated": sum(1 for src in changed if src.identity in existing_ids),
+        "unchanged": len(files) - len(changed),
+        "deleted": len(stale_ids),
+    }
+    timer.mark("diff")
 
+    if dry_run:
+        stats["timings"] = timer.report()
+        return stats
+
+    # Hash + miniaturas em paralelo (CPU-bound: Pillow + sha256)
+    results: list[tuple[str, dict]] = []
+    if changed:
+        with_avif = avif_supported()
+        if len(changed) == 1 or workers == 1:
+            results = [process_file(src.full_path, with_avif) for src in changed]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(
+                    process_file,
+                    [src.full_path for src in changed],
+                    [with_avif] * len(changed),
+                    chunksize=max(1, len(changed) // (4 * (workers or os.cpu_count() or 1))),
+                ))
+    timer.mark("process")
+
+    card_rows = []
+    source_rows = []
+    for src, (content_hash, media) in zip(changed, results):
+        card_rows.append(card_row(src, media))
+        source_rows.append({
+            "path": src.rel_path,
+            "size": src.size,
+            "mtime_ns": src.mtime_ns,
+            "content_hash": content_hash,
+        })
+
+    bulk_upsert_cards(db, card_rows)
+    bulk_upsert_sources(db, source_rows)
+    if stale_ids:
+        db.execute(delete(Card).where(Card.id.in_(stale_ids)))
+        # itens de ficha ligados a cartas removidas continuam, sem o vínculo
+        db.execute(update(CharacterItem).where(CharacterItem.card_id.in_(stale_ids)).values(card_id=None))
+    if stale_paths:
+        db.execute(delete(CardSource).where(CardSource.path.in_(stale_paths)))
+    if card_rows or stale_ids:
+        # invalida o cache do /cards nos workers do app
+        bump_catalog_version(db)
+    timer.mark("write")
+
+    if card_rows or stale_ids:
+        # índice da busca (app/search.py), na mesma transação
+        search.rebuild_cards(db)
+    timer.mark("search")
+
+    stats["timings"] = timer.report()
+    return stats
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Importa cartas a partir de app/static/cards")
+    parser.add_argument("--dry-run", action="store_true", help="só mostra o que mudaria (com timings)")
+    parser.add_argument("--force", action="store_true", help="reprocessa todos os arquivos")
+    parser.add_argument("--workers", type=int, default=None, help="processos do pool (padrão: nº de CPUs)")
+    args = parser.parse_args(argv)
+
+    # Garante que as tabelas existam (incluindo cards)
+    with init_lock(engine):
+        migrate_database(engine)
 
-def main():
     db = SessionLocal()
     try:
-        total = import_weapons_from_folders(db)
+        stats = import_weapons_from_folders(db, dry_run=args.dry_run, force=args.force, workers=args.workers)
+        prefix = "[DRY-RUN] " if args.dry_run else ""
+        print(
+            f"[INFO] {prefix}Armas: lidas={stats['scanned']}, criadas={stats['created']}, "
+            f"atualizadas={stats['updated']}, inalteradas={stats['unchanged']}, removidas={stats['deleted']}"
+        )
+        print(f"[INFO] {prefix}Tempos: {stats['timings']}")
+
+        if args.dry_run:
+            db.rollback()
+            return
+
         db.commit()
-        print(f"[OK] Import concluído. Cartas (armas) processadas: {total}")
+        print(f"[OK] Import concluído. Cartas (armas) processadas: {stats['created'] + stats['updated']}")
+
+        # URLs com hash de conteúdo para imagens/miniaturas novas
+        files = build_manifest()
+        print(f"[OK] manifest.json atualizado: {len(files)} arquivos")
     except Exception as e:
         db.rollback()
         print("[ERRO] Falha no import:", e)
@@ -0,0 +1,63 @@
+# tests/conftest.py
+# Executar (da raiz do projeto): pip install -r requirements-dev.txt && pytest
+#
+# Banco SQLite em memória compartilhada (threads do threadpool e o engine
+# async veem o mesmo banco; nada vai para o disco), com mestre e jogador já
+# criados, e um contador de statements para os orçamentos de queries
+# (mesmos números e helpers do check_query_counts.py).
+
+import os
+import sys
+
+os.environ.setdefault("APP_SECRET", "tests")
+# o mesmo banco que o check_query_counts.py força ao ser importado
+os.environ["DATABASE_URL"] = "sqlite:///file:rpg_query_counts?mode=memory&cache=shared&uri=true"
+os.environ["DB_AUTO_INIT"] = "0"
+os.environ["SERVER_TIMING"] = "0"
+# orçamentos contam com a sessão no cache (app/auth.py): sem expirar no meio
+os.environ["SESSION_CACHE_TTL"] = "3600"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from check_query_counts import StatementCounter, create_users, login
+
+
+@pytest.fixture(scope="session")
+def ids():
+    """
+    Schema + mestre e jogador (senha check_query_counts.PASSWORD) -> ids.
+    """
+    from app.db import engine
+    from app.bootstrap import migrate_database
+    from app import kdf
+
+    migrate_database(engine)
+    yield create_users()
+    kdf.shutdown()
+
+
+@pytest.fixture(scope="session")
+def clients(ids):
+    """
+    {"master": TestClient, "player": TestClient}, já logados e com a sessão
+    no cache (como no check_query_counts.py, que mede depois do login).
+    """
+    clients = {"master": login("mestre"), "player": login("jogador")}
+    for client in clients.values():
+        client.get("/me", follow_redirects=False)
+    return clients
+
+
+@pytest.fixture
+def statements():
+    """
+    Conta os statements executados em qualquer engine durante o teste
+    (.count, .statements; .reset() antes da parte medida).
+    """
+    counter = StatementCounter()
+    event.listen(Engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(Engine, "before_cursor_execute", counter)
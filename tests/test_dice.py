@@ -0,0 +1,156 @@
+# tests/test_dice.py
+# Dados (app/dice.py): seed reprodutível, chances exatas e limites do parser.
+
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from app import dice
+
+BATCH = {
+    "rolls": [{"expr": "2d6+1", "times": 10}, {"expr": "4d6kh3", "times": 5}],
+    "checks": [{"attribute": "agility"}, {"attribute": "vigor", "modifier": -20}],
+}
+
+
+def _pmf(counts, total):
+    return [float(Fraction(c, total)) for c in counts]
+
+
+# =========================
+# Seed
+# =========================
+def test_same_seed_same_rolls():
+    expr = dice.parse("3d6+2d20kh1-1")
+    first = dice.roll(expr, dice.make_rng(42)[0], times=100)
+    second = dice.roll(expr, dice.make_rng(42)[0], times=100)
+    assert np.array_equal(first, second)
+
+    rolls, outcomes = dice.resolve_checks(np.arange(1, 101), dice.make_rng(7)[0])
+    again = dice.resolve_checks(np.arange(1, 101), dice.make_rng(7)[0])
+    assert np.array_equal(rolls, again[0]) and np.array_equal(outcomes, again[1])
+
+
+def test_same_seed_same_body_same_response(clients):
+    first = clients["master"].post("/api/roll", json={**BATCH, "seed": 123})
+    second = clients["master"].post("/api/roll", json={**BATCH, "seed": 123})
+    assert first.status_code == 200
+    assert first.json() == second.json()
+    assert first.json()["seed"] == 123
+    assert first.json()["checks"][0]["results"]
+
+
+def test_seed_is_returned_when_drawn(clients):
+    first = clients["master"].post("/api/roll", json=BATCH).json()
+    replay = clients["master"].post("/api/roll", json={**BATCH, "seed": first["seed"]}).json()
+    assert replay == first
+
+
+def test_seed_out_of_range():
+    with pytest.raises(dice.DiceError):
+        dice.make_rng(2**63)
+
+
+# =========================
+# Distribuições exatas
+# =========================
+def test_distribution_2d6():
+    dist = dice.distribution("2d6")
+    assert dist.minimum == 2
+    assert dist.pmf.tolist() == pytest.approx(_pmf([1, 2, 3, 4, 5, 6, 5, 4, 3, 2, 1], 36))
+    assert dist.mean == pytest.approx(7)
+    assert dist.stdev == pytest.approx((35 / 6) ** 0.5)
+    assert dice.chance_at_least(dist, 7) == pytest.approx(21 / 36)
+    assert dice.chance_at_least(dist, 2) == 1.0
+    assert dice.chance_at_least(dist, 13) == 0.0
+
+
+def test_distribution_4d6kh3():
+    dist = dice.distribution("4d6kh3")
+    assert dist.minimum == 3
+    # contagens das 6^4 = 1296 combinações, totais 3..18
+    counts = [1, 4, 10, 21, 38, 62, 91, 122, 148, 167, 172, 160, 131, 94, 54, 21]
+    assert dist.pmf.tolist() == pytest.approx(_pmf(counts, 1296))
+    assert dist.mean == pytest.approx(15869 / 1296)
+    assert dice.chance_at_least(dist, 18) == pytest.approx(21 / 1296)
+
+
+def test_distribution_negative_term():
+    dist = dice.distribution("d6-d4")
+    assert dist.minimum == -3
+    # -3..5
+    assert dist.pmf.tolist() == pytest.approx(_pmf([1, 2, 3, 4, 4, 4, 3, 2, 1], 24))
+    assert dist.mean == pytest.approx(1)
+
+
+def test_check_odds_cutoffs():
+    # alvo 1: crítico só no 1, desastre 96–100, o resto falha
+    assert dice.check_odds(1) == pytest.approx(
+        {"fumble": 0.05, "failure": 0.94, "success": 0.0, "critical": 0.01})
+    # alvo 100: crítico até 20, sucesso até 99, o 100 é sempre desastre
+    assert dice.check_odds(100) == pytest.approx(
+        {"fumble": 0.01, "failure": 0.0, "success": 0.79, "critical": 0.20})
+    # fora de 1–100 é limitado
+    assert dice.check_odds(0) == dice.check_odds(1)
+    assert dice.check_odds(150) == dice.check_odds(100)
+
+
+def test_check_odds_match_resolve_checks():
+    # todas as faces contra o alvo 50: mesma regra do teste rolado
+    outcomes = dice._outcomes(np.arange(1, 101), 50)
+    counts = np.bincount(outcomes, minlength=len(dice.OUTCOMES)) / 100
+    assert dice.check_odds(50) == pytest.approx(dict(zip(dice.OUTCOMES, counts.tolist())))
+
+
+# =========================
+# Parser
+# =========================
+@pytest.mark.parametrize("text, canonical", [
+    ("2d6 + 1", "2d6+1"),
+    ("d20", "1d20"),
+    ("d%", "1d100"),
+    ("4D6KH3", "4d6kh3"),
+    ("3d6kh3", "3d6"),
+    ("2d20kl1 - 2", "2d20kl1-2"),
+    ("5", "5"),
+])
+def test_parse_canonical(text, canonical):
+    assert dice.parse(text).text == canonical
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "   ",
+    "abc",
+    "2d6 3",
+    "+".join(["1"] * (dice.MAX_TERMS + 1)),
+    f"{dice.MAX_DICE + 1}d6",
+    "0d6",
+    f"d{dice.MAX_SIDES + 1}",
+    "d0",
+    "3d6kh4",
+    "3d6kl0",
+])
+def test_parse_rejects(text):
+    with pytest.raises(dice.DiceError):
+        dice.parse(text)
+
+
+def test_parse_limits_are_inclusive():
+    dice.parse("+".join(["1"] * dice.MAX_TERMS))
+    dice.parse(f"{dice.MAX_DICE}d{dice.MAX_SIDES}")
+
+
+def test_distribution_too_large():
+    with pytest.raises(dice.DiceError):
+        dice.distribution(f"{dice.MAX_DICE}d{dice.MAX_SIDES}")
+    with pytest.raises(dice.DiceError):
+        dice.distribution("10d20kh1")
+
+
+def test_batch_limits(clients):
+    too_many = {"rolls": [{"expr": f"{dice.MAX_DICE}d6", "times": dice.MAX_TIMES}] * 2}
+    assert clients["master"].post("/api/roll", json=too_many).status_code == 422
+    assert clients["master"].post("/api/roll", json={"rolls": [{"expr": "2d6 3"}]}).status_code == 422
+    assert clients["master"].post("/api/roll", json={}).status_code == 422
@@ -0,0 +1,92 @@
+# tests/test_query_budgets.py
+# Orçamento de queries por rota (BUDGETS do check_query_counts.py) e
+# conferência de N+1: painel e ficha não podem crescer com o grupo/inventário.
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from check_query_counts import (
+    BUDGETS, EXTRA_ITEMS, EXTRA_PLAYERS, StatementCounter, add_items, add_players,
+)
+
+# rota -> (cliente, requisição). Sem "version" nas gravações: cada teste roda
+# sozinho, sem depender da versão da ficha deixada pelo anterior.
+ROUTES = {
+    "POST /login": ("anonymous", lambda c, ids: c.post(
+        "/login", data={"username": "mestre", "password": "senha-de-teste"}, follow_redirects=False)),
+    "GET /me": ("master", lambda c, ids: c.get("/me", follow_redirects=False)),
+    "GET /player": ("player", lambda c, ids: c.get("/player")),
+    "GET /player/{id}": ("master", lambda c, ids: c.get(f"/player/{ids['player']}")),
+    "POST /player/update": ("player", lambda c, ids: c.post(
+        "/player/update", data={"name": "Jogador"}, follow_redirects=False)),
+    "POST /player/{id}/items": ("player", lambda c, ids: c.post(
+        f"/player/{ids['player']}/items", data={"name": "Corda", "quantity": "2"}, follow_redirects=False)),
+    "PATCH /api/player/character": ("player", lambda c, ids: c.patch(
+        "/api/player/character", json={"changes": {"hp": 7}})),
+    "GET /master": ("master", lambda c, ids: c.get("/master")),
+    "GET /api/party": ("master", lambda c, ids: c.get("/api/party")),
+    "GET /cards": ("master", lambda c, ids: c.get("/cards")),
+    "GET /api/cards": ("master", lambda c, ids: c.get("/api/cards?sort=za")),
+    "POST /api/roll": ("master", lambda c, ids: c.post("/api/roll", json={
+        "rolls": [{"expr": "2d6+1", "times": 10}],
+        "checks": [{"attribute": "agility"}, {"attribute": "vigor", "modifier": -20}],
+    })),
+}
+
+
+def _client(clients, name):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app) if name == "anonymous" else clients[name]
+
+
+def test_every_budget_has_a_route():
+    assert set(ROUTES) == set(BUDGETS)
+
+
+@pytest.mark.parametrize("route", list(BUDGETS))
+def test_query_budget(route, ids, clients, statements):
+    client, call = ROUTES[route]
+    client = _client(clients, client)
+    statements.reset()
+    r = call(client, ids)
+    assert r.status_code < 400, r.text
+    assert statements.count <= BUDGETS[route], "\n".join(statements.statements)
+
+
+GROWTH_ROUTES = ["GET /master", "GET /api/party", "GET /player"]
+
+
+@pytest.fixture(scope="module")
+def baseline(ids, clients):
+    """
+    Queries de cada rota de GROWTH_ROUTES antes de crescer o grupo e o
+    inventário; o crescimento acontece uma vez só, depois da medição.
+    """
+    counter = StatementCounter()
+    counts = {}
+    event.listen(Engine, "before_cursor_execute", counter)
+    try:
+        for route in GROWTH_ROUTES:
+            client, call = ROUTES[route]
+            call(clients[client], ids)
+            counter.reset()
+            call(clients[client], ids)
+            counts[route] = counter.count
+    finally:
+        event.remove(Engine, "before_cursor_execute", counter)
+
+    add_players(EXTRA_PLAYERS)
+    add_items(ids["player"], EXTRA_ITEMS)
+    return counts
+
+
+@pytest.mark.parametrize("route", GROWTH_ROUTES)
+def test_no_n_plus_one(route, ids, clients, baseline, statements):
+    client, call = ROUTES[route]
+    statements.reset()
+    call(clients[client], ids)
+    # <=: a checagem da sessão pode vir do cache (app/auth.py)
+    assert statements.count <= baseline[route], "\n".join(statements.statements)
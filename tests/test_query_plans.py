@@ -0,0 +1,33 @@
+# tests/test_query_plans.py
+# Planos das queries do catálogo (check_query_plans.py): toda combinação de
+# filtros de /cards e /api/cards usa índice, sem table scan nem TEMP B-TREE.
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.db import Base
+from check_query_plans import compile_sql, filter_combinations, filter_label, sqlite_problems
+
+COMBINATIONS = list(filter_combinations())
+
+
+@pytest.fixture(scope="module")
+def plan_conn():
+    # SQLite próprio a partir dos models: confere os índices de Card.__table_args__
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+@pytest.mark.parametrize("filters", COMBINATIONS, ids=[filter_label(f) for f in COMBINATIONS])
+def test_catalog_query_uses_index(filters, plan_conn):
+    details, problems = sqlite_problems(plan_conn, compile_sql(plan_conn.engine, filters))
+    assert not problems, "\n".join(details)
+
+
+def test_checker_flags_scan_and_sort(plan_conn):
+    # sem isso um sqlite_problems quebrado passaria em tudo acima
+    _, problems = sqlite_problems(plan_conn, "SELECT id FROM cards WHERE image_path = 'x' ORDER BY thumb_path")
+    assert problems
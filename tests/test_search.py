@@ -0,0 +1,45 @@
+# tests/test_search.py
+# Ranking da busca (app/search.py) num SQLite próprio, fora do banco dos
+# orçamentos: muitos documentos casando não podem esconder o melhor.
+
+import pytest
+from sqlalchemy import create_engine, insert
+
+from app import search
+from app.db import Base
+from app.models import Card
+
+# mais que os 200 candidatos que a versão com teto olhava
+BODY_MATCHES = 250
+
+
+@pytest.fixture(scope="module")
+def conn():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # a carta com o termo no título é a MAIS ANTIGA (menor rowid)
+        cards = [{"type": "local", "rarity": "comum", "name": "Rara"}]
+        # as outras só têm o termo no corpo (raridade)
+        cards += [{"type": "arma", "rarity": "rara", "name": f"Item {i}"} for i in range(BODY_MATCHES)]
+        conn.execute(insert(Card), [
+            {**card, "class_type": None, "order_name": card["name"].lower(),
+             "slug": card["name"].lower().replace(" ", "_"), "image_path": "/static/x.png"}
+            for card in cards
+        ])
+        search.ensure_search_index(conn)
+        yield conn
+    engine.dispose()
+
+
+def test_title_match_first_among_many_matches(conn):
+    hits = search.search(conn, "rara", limit=5)
+    assert [(h.kind, h.ref_id) for h in hits][:1] == [("card", 1)]
+    assert len(hits) == 5
+
+
+def test_body_matches_fill_the_limit(conn):
+    hits = search.search(conn, "arma rara", limit=search.MAX_RESULTS)
+    assert len(hits) == search.MAX_RESULTS
+    assert ("card", 1) not in [(h.kind, h.ref_id) for h in hits]
+    assert [h.rank for h in hits] == sorted((h.rank for h in hits), reverse=True)
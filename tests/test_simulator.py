@@ -0,0 +1,33 @@
+# tests/test_simulator.py
+# Simulador de encontros (app/simulator.py): a mesma seed dá o mesmo
+# relatório no próprio processo e espalhada num pool de processos (spawn,
+# como o da rota). Encontro e comparação do bench_simulator.py.
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app import simulator
+from bench_simulator import SEED, comparable, encounter
+
+# vários pedaços e um incompleto no fim
+SIMS = simulator.CHUNK_SIZE * 3 + 100
+
+
+def test_same_seed_same_report_in_process_and_pool():
+    e = encounter()
+    local = simulator.run(e, SIMS, SEED, executor=None)
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pooled = simulator.run(e, SIMS, SEED, executor=pool, workers=2)
+
+    assert local.stats._fields == pooled.stats._fields
+    for field, a, b in zip(local.stats._fields, local.stats, pooled.stats):
+        assert np.array_equal(a, b), field
+    assert comparable(local) == comparable(pooled)
+    assert local.stats.sims == SIMS
+
+
+def test_different_seed_different_report():
+    e = encounter()
+    assert comparable(simulator.run(e, SIMS, SEED)) != comparable(simulator.run(e, SIMS, SEED + 1))